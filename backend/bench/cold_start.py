@@ -0,0 +1,75 @@
+"""
+Cold-start benchmark: for each run a fresh interpreter imports main.py, starts the
+app's lifespan and serves its first requests. Reports the median import time and
+time to first response (health check, then a route that touches the datastore).
+
+    python bench/cold_start.py --runs 10
+    python bench/cold_start.py --runs 10 --warmup     # build shared clients in the lifespan
+
+Uses the local fakes by default; pass --real to use the configured services.
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r"""
+import sys, time, json, asyncio
+t0 = time.perf_counter()
+import main
+t_import = time.perf_counter() - t0
+
+import httpx
+
+async def first_requests():
+    app = main.create_app()
+    async with app.router.lifespan_context(app):
+        t_started = time.perf_counter() - t0
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://coldstart") as client:
+            await client.get("/api/health")
+            t_health = time.perf_counter() - t0
+            await client.get("/api/practice-plan/saved", headers={"Authorization": "Bearer user-0"})
+            t_data = time.perf_counter() - t0
+    return t_started, t_health, t_data
+
+t_started, t_health, t_data = asyncio.run(first_requests())
+print(json.dumps({"import": t_import, "lifespan": t_started, "first_health": t_health, "first_data": t_data}))
+"""
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--warmup", action="store_true", help="set WARMUP=1")
+    parser.add_argument("--real", action="store_true", help="don't switch to the local fakes")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if not args.real:
+        env.update({"LLM_PROVIDER": "fake", "SPOTIFY_PROVIDER": "fake", "DATA_BACKEND": "memory", "JOB_STORE": "memory"})
+        env.setdefault("FRONTEND_URL", "http://localhost")
+    if args.warmup:
+        env["WARMUP"] = "1"
+
+    results = []
+    for _ in range(args.runs):
+        out = subprocess.run(
+            [sys.executable, "-c", CHILD], cwd=BACKEND_DIR, env=env,
+            capture_output=True, text=True, check=True,
+        )
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    print(f"{args.runs} runs, median time since the start of `import main`")
+    for key, label in [("import", "import main"), ("lifespan", "lifespan started"),
+                       ("first_health", "first /api/health"), ("first_data", "first datastore route")]:
+        values = [r[key] * 1000 for r in results]
+        print(f"  {label:24} {statistics.median(values):8.1f} ms   (min {min(values):.1f}, max {max(values):.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Dashboard load benchmark: what it costs a client to show every saved plan with its
+completed tasks and the totals, for one user with --plans plans.
+
+  per-plan (sequential)  GET /saved, then GET /completions/{id} for each plan, then /completion-stats
+  per-plan (parallel)    the same requests, with the per-plan ones issued concurrently
+  dashboard              GET /api/practice-plan/dashboard
+  active plan            GET /completions/{id} for one plan
+
+The first three are ways to build an all-plans view; the app has no such page yet. The
+dashboard and schedule pages only show the active plan, which is the last row, so
+/dashboard is not meant to replace that request.
+
+Runs in-process against the in-memory store. Each auth check and each datastore query
+sleeps for --auth-latency-ms / --query-latency-ms to stand in for the Supabase round trips
+that dominate in production.
+
+    python bench/dashboard.py --plans 20 --auth-latency-ms 40 --query-latency-ms 15
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.update({"LLM_PROVIDER": "fake", "SPOTIFY_PROVIDER": "fake", "DATA_BACKEND": "memory", "JOB_STORE": "memory"})
+os.environ.setdefault("FRONTEND_URL", "http://localhost")
+
+import httpx
+
+import store
+from main import create_app
+from fakes import fake_plan
+
+USER = "dashboard-user"
+
+
+class LatencyStore(store.MemoryStore):
+    def __init__(self, auth_latency: float, query_latency: float):
+        super().__init__()
+        self.auth_latency = auth_latency
+        self.query_latency = query_latency
+        self.queries = 0
+
+    async def get_user(self, token):
+        await asyncio.sleep(self.auth_latency)
+        return await super().get_user(token)
+
+    async def _query(self):
+        self.queries += 1
+        await asyncio.sleep(self.query_latency)
+
+    async def list_plans(self, user_id):
+        await self._query()
+        return await super().list_plans(user_id)
+
+    async def list_completions(self, user_id, plan_id):
+        await self._query()
+        return await super().list_completions(user_id, plan_id)
+
+    async def list_user_completions(self, user_id):
+        await self._query()
+        return await super().list_user_completions(user_id)
+
+    async def list_plans_with_completions(self, user_id):
+        await self._query()
+        return await super().list_plans_with_completions(user_id)
+
+
+async def seed(db: LatencyStore, plans: int) -> None:
+    rng = random.Random(0)
+    for p in range(plans):
+        await db.insert_plan(USER, fake_plan({"song_title": f"Song {p}", "artist": "Artist",
+                                              "minutes_per_day": 30, "start_day": "Monday"}))
+    for saved in db.plans:
+        for day in saved["plan"]["days"]:
+            for i, task in enumerate(day["tasks"]):
+                if rng.random() < 0.5:
+                    await db.upsert_completion(USER, {
+                        "practice_plan_id": saved["id"], "day_name": day["day"], "task_index": i,
+                        "task_title": task["title"], "technique": task["technique"],
+                        "duration_minutes": task["duration_minutes"],
+                    })
+
+
+async def per_plan(client, parallel: bool):
+    responses = [await client.get("/api/practice-plan/saved")]
+    ids = [p["id"] for p in responses[0].json()]
+    urls = [f"/api/practice-plan/completions/{i}" for i in ids] + ["/api/practice-plan/completion-stats"]
+    if parallel:
+        responses += await asyncio.gather(*(client.get(u) for u in urls))
+    else:
+        for u in urls:
+            responses.append(await client.get(u))
+    return responses
+
+
+async def joined(client):
+    return [await client.get("/api/practice-plan/dashboard")]
+
+
+async def active_plan(client, plan_id: str):
+    return [await client.get(f"/api/practice-plan/completions/{plan_id}")]
+
+
+async def run(args) -> None:
+    db = LatencyStore(args.auth_latency_ms / 1000, args.query_latency_ms / 1000)
+    store._store = db
+    await seed(db, args.plans)
+
+    app = create_app()
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        headers = {"Authorization": f"Bearer {USER}", "Accept-Encoding": "gzip"}
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+            print(f"{args.plans} plans, auth {args.auth_latency_ms} ms, query {args.query_latency_ms} ms, "
+                  f"median of {args.repeat} loads")
+            print(f"  {'flow':24} {'requests':>8} {'queries':>8} {'total ms':>9} {'bytes':>9}")
+            for label, flow in [
+                ("per-plan (sequential)", lambda: per_plan(client, parallel=False)),
+                ("per-plan (parallel)", lambda: per_plan(client, parallel=True)),
+                ("dashboard", lambda: joined(client)),
+                ("active plan", lambda: active_plan(client, db.plans[0]["id"])),
+            ]:
+                samples = []
+                for _ in range(args.repeat):
+                    db.queries = 0
+                    start = time.perf_counter()
+                    responses = await flow()
+                    samples.append((time.perf_counter() - start) * 1000)
+                assert all(r.status_code == 200 for r in responses)
+                size = sum(int(r.headers.get("content-length", len(r.content))) for r in responses)
+                print(f"  {label:24} {len(responses):8d} {db.queries:8d} {statistics.median(samples):9.1f} {size:9,d}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--plans", type=int, default=20)
+    parser.add_argument("--auth-latency-ms", type=float, default=40)
+    parser.add_argument("--query-latency-ms", type=float, default=15)
+    parser.add_argument("--repeat", type=int, default=5)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
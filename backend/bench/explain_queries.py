@@ -0,0 +1,178 @@
+"""
+Seeds a local Postgres at scale and captures EXPLAIN ANALYZE for each route's query
+before and after the index migration in supabase/migrations.
+
+    createdb guitarcoach_bench
+    python bench/explain_queries.py --database-url postgresql://localhost/guitarcoach_bench \\
+        --users 2000 --plans-per-user 20 --out explain/
+
+Steps: apply the table migration, seed users/plans/completions (with some duplicate
+completions, as complete-task used to write), EXPLAIN every query, apply the index
+migration, EXPLAIN again. Plans are written to <out>/before/ and <out>/after/ and the
+execution times are printed side by side.
+
+Uses psql, so the only requirement is a Postgres client on PATH. The database is
+dropped and recreated table by table; point it at a scratch database. On a plain
+Postgres (not a local Supabase stack) the parts of Supabase the migrations refer to -
+the auth schema with auth.users and auth.uid(), and the API roles - are created first.
+Queries run as the connecting superuser, which bypasses row level security like the
+backend's service_role connection does.
+"""
+import os
+import re
+import sys
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+MIGRATIONS = os.path.join(ROOT, "supabase", "migrations")
+TABLES_MIGRATION = "20261019000000_practice_tables.sql"
+INDEX_MIGRATION = "20261019000100_completion_key_and_indexes.sql"
+
+# what a Supabase project already provides; each part is skipped when it exists
+SUPABASE_STANDIN = """
+do $$
+begin
+    if not exists (select 1 from pg_roles where rolname = 'anon') then create role anon nologin; end if;
+    if not exists (select 1 from pg_roles where rolname = 'authenticated') then create role authenticated nologin; end if;
+    if not exists (select 1 from pg_roles where rolname = 'service_role') then create role service_role nologin bypassrls; end if;
+end
+$$;
+create schema if not exists auth;
+create table if not exists auth.users (id uuid primary key);
+create or replace function auth.uid() returns uuid language sql stable as $f$
+    select nullif(current_setting('request.jwt.claim.sub', true), '')::uuid
+$f$;
+"""
+
+SEED = """
+insert into auth.users (id)
+select md5('user' || g)::uuid from generate_series(1, {users}) g
+on conflict do nothing;
+
+insert into practice_plans (user_id, song_title, artist, plan, created_at)
+select u.id, 'Song ' || p, 'Artist',
+       jsonb_build_object('song_title', 'Song ' || p, 'artist', 'Artist', 'days', jsonb_build_array()),
+       now() - (p || ' hours')::interval
+from (select md5('user' || g)::uuid as id from generate_series(1, {users}) g) u
+cross join generate_series(1, {plans}) p;
+
+-- 7 days x 3 tasks per plan, about half completed
+insert into task_completions (user_id, practice_plan_id, day_name, task_index, task_title, technique, duration_minutes)
+select pp.user_id, pp.id, d.name, t.i, 'Task ' || t.i, (array['bends', 'vibrato', 'chord changes'])[t.i + 1], 10
+from practice_plans pp
+cross join unnest(array['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']) d(name)
+cross join generate_series(0, 2) t(i)
+where random() < 0.5;
+
+-- duplicates from repeated clicks
+insert into task_completions (user_id, practice_plan_id, day_name, task_index, task_title, technique, duration_minutes)
+select user_id, practice_plan_id, day_name, task_index, task_title, technique, duration_minutes
+from task_completions
+where random() < 0.05;
+
+analyze practice_plans;
+analyze task_completions;
+"""
+
+# route -> query as PostgREST / the Store issues it; :user, :plan are filled in
+QUERIES = {
+    "saved": "select id, song_title, artist, plan, created_at from practice_plans "
+             "where user_id = :user order by created_at desc",
+    "get_plan": "select id, song_title, artist, plan, created_at from practice_plans "
+                "where id = :plan and user_id = :user limit 1",
+    "completions": "select * from task_completions where user_id = :user and practice_plan_id = :plan",
+    "completion_stats": "select technique, duration_minutes from task_completions where user_id = :user",
+    "dashboard": "select p.id, p.song_title, p.artist, p.plan, p.created_at, "
+                 "coalesce((select json_agg(json_build_object('day_name', c.day_name, 'task_index', c.task_index, "
+                 "'technique', c.technique, 'duration_minutes', c.duration_minutes)) "
+                 "from task_completions c where c.practice_plan_id = p.id and c.user_id = :user), '[]') as completions "
+                 "from practice_plans p where p.user_id = :user order by p.created_at desc",
+    "uncomplete_task": "delete from task_completions where user_id = :user and practice_plan_id = :plan "
+                       "and day_name = 'Monday' and task_index = 1",
+}
+
+COMPLETE_TASK = {
+    "before": "insert into task_completions (user_id, practice_plan_id, day_name, task_index, task_title) "
+              "values (:user, :plan, 'Monday', 1, 'Task 1')",
+    "after": "insert into task_completions (user_id, practice_plan_id, day_name, task_index, task_title) "
+             "values (:user, :plan, 'Monday', 1, 'Task 1') "
+             "on conflict (user_id, practice_plan_id, day_name, task_index) do update set task_title = excluded.task_title",
+}
+
+
+def psql(url: str, sql: str) -> str:
+    out = subprocess.run(
+        ["psql", url, "-v", "ON_ERROR_STOP=1", "-X", "-q", "-At"],
+        input=sql, capture_output=True, text=True,
+    )
+    if out.returncode != 0:
+        sys.exit(out.stderr)
+    return out.stdout
+
+
+def explain(url: str, sql: str) -> str:
+    # writes are rolled back so before/after run against the same data
+    return psql(url, f"begin;\nexplain (analyze, buffers) {sql};\nrollback;\n")
+
+
+def execution_ms(plan: str) -> float:
+    match = re.search(r"Execution Time: ([\d.]+) ms", plan)
+    return float(match.group(1)) if match else float("nan")
+
+
+def capture(url: str, phase: str, params: dict, out_dir: str) -> dict:
+    os.makedirs(os.path.join(out_dir, phase), exist_ok=True)
+    queries = {**QUERIES, "complete_task": COMPLETE_TASK[phase]}
+    times = {}
+    for name, sql in queries.items():
+        for key, value in params.items():
+            sql = sql.replace(f":{key}", f"'{value}'")
+        plan = explain(url, sql)
+        with open(os.path.join(out_dir, phase, f"{name}.txt"), "w") as f:
+            f.write(sql + "\n\n" + plan)
+        times[name] = execution_ms(plan)
+    return times
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL", "postgresql://localhost/guitarcoach_bench"))
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--plans-per-user", type=int, default=20)
+    parser.add_argument("--out", default="explain")
+    args = parser.parse_args()
+    url = args.database_url
+
+    print("Resetting tables and applying", TABLES_MIGRATION)
+    psql(url, SUPABASE_STANDIN)
+    psql(url, "drop table if exists task_completions; drop table if exists practice_plans;")
+    with open(os.path.join(MIGRATIONS, TABLES_MIGRATION)) as f:
+        psql(url, f.read())
+
+    print(f"Seeding {args.users} users x {args.plans_per_user} plans")
+    psql(url, SEED.format(users=args.users, plans=args.plans_per_user))
+    counts = psql(url, "select (select count(*) from practice_plans), (select count(*) from task_completions);")
+    print("  practice_plans | task_completions:", counts.strip())
+
+    # a user in the middle of the table, and their newest plan
+    user, plan = psql(url, f"select user_id, id from practice_plans where user_id = md5('user{args.users // 2}')::uuid "
+                           "order by created_at desc limit 1;").strip().split("|")
+    params = {"user": user, "plan": plan}
+
+    before = capture(url, "before", params, args.out)
+
+    print("Applying", INDEX_MIGRATION)
+    with open(os.path.join(MIGRATIONS, INDEX_MIGRATION)) as f:
+        psql(url, f.read() + "\nanalyze practice_plans;\nanalyze task_completions;\n")
+
+    after = capture(url, "after", params, args.out)
+
+    print(f"\nEXPLAIN ANALYZE execution time (plans in {args.out}/before, {args.out}/after)")
+    print(f"  {'query':20} {'before ms':>10} {'after ms':>10}")
+    for name in before:
+        print(f"  {name:20} {before[name]:10.2f} {after[name]:10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""
+Drives every route in main.py against the local fakes (fake LLM, mock Spotify,
+in-memory store) and reports throughput and p50/p95/p99 latency per route.
+
+    python bench/load.py --concurrency 20 --requests 200 --llm-latency-ms 800
+
+The /events scenario opens the completion stream, ticks a task over plain HTTP and
+measures until the pushed frame arrives, then disconnects. httpx's ASGI transport
+buffers whole responses, so streams are driven through the raw ASGI interface.
+
+This is the baseline every performance change should be measured against.
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+from typing import Callable, Dict, List, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def configure_env(args) -> None:
+    os.environ.update({
+        "LLM_PROVIDER": "fake",
+        "SPOTIFY_PROVIDER": "fake",
+        "DATA_BACKEND": "memory",
+        "JOB_STORE": "memory",
+        "FAKE_LLM_LATENCY_MS": str(args.llm_latency_ms),
+        "FAKE_LLM_JITTER_MS": str(args.llm_jitter_ms),
+    })
+    for key in ("FRONTEND_URL", "SPOTIFY_CLIENT_ID", "SPOTIFY_CLIENT_SECRET", "SPOTIFY_REDIRECT_URI"):
+        os.environ.setdefault(key, "http://localhost")
+    sys.path.insert(0, BACKEND_DIR)
+
+
+QUESTIONNAIRE = {
+    "practicing": "30 minutes",
+    "play_style": ["Strumming", "Fingerpicking"],
+    "techniques": {"Bends": 2, "Vibrato": 1, "Hammer-ons": 3},
+    "technical skills": ["Open chords", "Power chords"],
+    "goal": "Playing songs for fun",
+}
+
+
+async def seed(store, users: int) -> Dict[str, str]:
+    from fakes import fake_plan
+
+    plan_ids = {}
+    for u in range(users):
+        user_id = f"user-{u}"
+        await store.update_profile(user_id, {
+            "questionnaire_answers": QUESTIONNAIRE,
+            "spotify_access_token": "fake-access",
+            "spotify_refresh_token": "fake-refresh",
+            "spotify_token_expires_at": "2999-01-01T00:00:00+00:00",
+        })
+        # the first plan has real days so regenerate and complete-task have something to work on
+        await store.insert_plan(user_id, fake_plan({"song_title": "Song 0", "artist": "Artist"}))
+        for p in range(1, 3):
+            await store.insert_plan(user_id, {"song_title": f"Song {p}", "artist": "Artist", "days": []})
+        plans = await store.list_plans(user_id)
+        plan_ids[user_id] = next(plan["id"] for plan in plans if plan["song_title"] == "Song 0")
+    return plan_ids
+
+
+WEEK = ["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
+
+
+def tick(plan_id: str, day_name: str, task_index: int) -> dict:
+    return {"plan_id": plan_id, "day_name": day_name, "task_index": task_index,
+            "task_title": "Task", "technique": "Bends", "duration_minutes": 10}
+
+
+def scenarios(plan_ids: Dict[str, str], job_ids: Dict[str, str]) -> List[Tuple[str, Callable[[int, str], dict]]]:
+    # each scenario builds the request for iteration i as user `user`;
+    # "stream" requests go through event_round_trip instead of the client
+    song = {"name": "Wonderwall", "artist": "Oasis"}
+    return [
+        ("GET /api/health", lambda i, u: {"method": "GET", "url": "/api/health"}),
+        ("GET /api/me", lambda i, u: {"method": "GET", "url": "/api/me"}),
+
+        ("POST /api/recommendation/generate-song", lambda i, u: {
+            "method": "POST", "url": "/api/recommendation/generate-song",
+            "json": {"top_tracks": [{"name": "Wonderwall", "artists": [{"name": "Oasis"}]}],
+                     "top_artists": [{"name": "Oasis", "genres": ["britpop"]}],
+                     "current_difficulty": 1 + i % 5, "previous_songs": []}}),
+        ("POST /api/recommendation/generate-similar", lambda i, u: {
+            "method": "POST", "url": "/api/recommendation/generate-similar",
+            "json": {"type": "track", "name": "Wonderwall", "artist_name": "Oasis",
+                     "current_difficulty": 1 + i % 5, "previous_songs": []}}),
+        ("POST /api/recommendation/search-spotify", lambda i, u: {
+            "method": "POST", "url": "/api/recommendation/search-spotify",
+            "params": {"song_name": song["name"], "artist_name": song["artist"]}}),
+        ("GET /api/recommendation/stats", lambda i, u: {"method": "GET", "url": "/api/recommendation/stats"}),
+
+        ("GET /api/spotify/login", lambda i, u: {"method": "GET", "url": "/api/spotify/login"}),
+        ("GET /api/spotify/callback", lambda i, u: {
+            "method": "GET", "url": "/api/spotify/callback", "params": {"code": f"code{i}", "state": u}}),
+        ("GET /api/spotify/top-tracks", lambda i, u: {"method": "GET", "url": "/api/spotify/top-tracks"}),
+        ("GET /api/spotify/top-artists", lambda i, u: {"method": "GET", "url": "/api/spotify/top-artists"}),
+        ("GET /api/spotify/recently-played", lambda i, u: {"method": "GET", "url": "/api/spotify/recently-played"}),
+        ("POST /api/spotify/save-stats", lambda i, u: {"method": "POST", "url": "/api/spotify/save-stats"}),
+
+        ("POST /api/practice-plan", lambda i, u: {
+            "method": "POST", "url": "/api/practice-plan",
+            "json": {"song_title": f"Song {i}", "artist": "Artist"}}),
+        ("POST /api/practice-plan/save", lambda i, u: {
+            "method": "POST", "url": "/api/practice-plan/save",
+            "json": {"plan": {"song_title": f"Song {i}", "artist": "Artist", "days": []}}}),
+        ("GET /api/practice-plan/saved", lambda i, u: {"method": "GET", "url": "/api/practice-plan/saved"}),
+        ("DELETE /api/practice-plan/saved/{id}", lambda i, u: {
+            "method": "DELETE", "url": "/api/practice-plan/saved/does-not-exist"}),
+        ("POST /api/practice-plan/complete-task", lambda i, u: {
+            "method": "POST", "url": "/api/practice-plan/complete-task",
+            "json": tick(plan_ids[u], "Monday", i % 3)}),
+        ("DELETE /api/practice-plan/complete-task", lambda i, u: {
+            "method": "DELETE", "url": "/api/practice-plan/complete-task",
+            "params": {"plan_id": plan_ids[u], "day_name": "Monday", "task_index": i % 3}}),
+        ("POST /api/practice-plan/saved/{id}/regenerate", lambda i, u: {
+            "method": "POST", "url": f"/api/practice-plan/saved/{plan_ids[u]}/regenerate",
+            "json": {"day_name": WEEK[i % 7]}}),
+        ("GET /api/practice-plan/events", lambda i, u: {
+            "stream": True, "url": "/api/practice-plan/events",
+            "tick": tick(plan_ids[u], "Tuesday", i % 3)}),
+        ("GET /api/practice-plan/completions/{id}", lambda i, u: {
+            "method": "GET", "url": f"/api/practice-plan/completions/{plan_ids[u]}"}),
+        ("GET /api/practice-plan/completion-stats", lambda i, u: {
+            "method": "GET", "url": "/api/practice-plan/completion-stats"}),
+        ("GET /api/practice-plan/dashboard", lambda i, u: {
+            "method": "GET", "url": "/api/practice-plan/dashboard"}),
+
+        ("POST /api/practice-plan/jobs", lambda i, u: {
+            "method": "POST", "url": "/api/practice-plan/jobs",
+            "json": {"song_title": f"Song {i}", "artist": "Artist"}}),
+        ("GET /api/jobs/{id}", lambda i, u: {"method": "GET", "url": f"/api/jobs/{job_ids[u]}"}),
+        ("GET /api/jobs/{id}/result", lambda i, u: {"method": "GET", "url": f"/api/jobs/{job_ids[u]}/result"}),
+        ("GET /api/jobs/{id}/events", lambda i, u: {"method": "GET", "url": f"/api/jobs/{job_ids[u]}/events"}),
+    ]
+
+
+def percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def read_until(chunks: asyncio.Queue, marker: bytes) -> bool:
+    buffer = b""
+    while marker not in buffer:
+        chunk = await chunks.get()
+        if chunk is None:
+            return False
+        buffer += chunk
+    return True
+
+
+async def event_round_trip(app, client, user: str, url: str, tick: dict, timeout: float = 10) -> int:
+    # opens the stream, waits for "ready", ticks a task over HTTP and waits for the pushed
+    # completion frame, then disconnects. Returns the status to count as an error or not.
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": url, "raw_path": url.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"authorization", f"Bearer {user}".encode())],
+        "server": ("loadtest", 80), "client": ("127.0.0.1", 0),
+    }
+    chunks: asyncio.Queue = asyncio.Queue()
+    disconnected = asyncio.Event()
+    status = 0
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            await chunks.put(message.get("body", b""))
+            if not message.get("more_body", False):
+                await chunks.put(None)
+
+    response = asyncio.create_task(app(scope, receive, send))
+    try:
+        if not await asyncio.wait_for(read_until(chunks, b"event: ready"), timeout):
+            return status or 500
+        r = await client.post("/api/practice-plan/complete-task", json=tick,
+                              headers={"Authorization": f"Bearer {user}"})
+        if r.status_code >= 400:
+            return r.status_code
+        if not await asyncio.wait_for(read_until(chunks, b"event: completion"), timeout):
+            return 500
+        return status
+    except asyncio.TimeoutError:
+        return 504
+    finally:
+        disconnected.set()
+        await response
+
+
+async def run_scenario(app, client, build, requests: int, concurrency: int, users: int):
+    latencies: List[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        nonlocal errors
+        user = f"user-{i % users}"
+        req = build(i, user)
+        async with semaphore:
+            start = time.perf_counter()
+            if req.pop("stream", False):
+                status = await event_round_trip(app, client, user, **req)
+            else:
+                status = (await client.request(headers={"Authorization": f"Bearer {user}"}, **req)).status_code
+            latencies.append((time.perf_counter() - start) * 1000)
+        if status >= 400:
+            errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    return latencies, errors, elapsed
+
+
+async def main(args) -> None:
+    configure_env(args)
+
+    import httpx
+    import main as app_module
+    from store import get_store
+
+    app = app_module.app
+    plan_ids = await seed(get_store(), args.users)
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+            job_ids = {}
+            for u in plan_ids:
+                r = await client.post("/api/practice-plan/jobs", json={"song_title": "Seed", "artist": "Artist"},
+                                      headers={"Authorization": f"Bearer {u}"})
+                job_ids[u] = r.json()["job_id"]
+
+            print(f"{args.requests} requests per route, concurrency {args.concurrency}, "
+                  f"{args.users} users, fake LLM latency {args.llm_latency_ms}ms")
+            print(f"{'route':48} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+
+            for name, build in scenarios(plan_ids, job_ids):
+                if args.route and args.route not in name:
+                    continue
+                latencies, errors, elapsed = await run_scenario(
+                    app, client, build, args.requests, args.concurrency, args.users
+                )
+                print(f"{name:48} {len(latencies) / elapsed:9.1f} {statistics.median(latencies):9.2f} "
+                      f"{percentile(latencies, 95):9.2f} {percentile(latencies, 99):9.2f} {errors:7d}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=100, help="requests per route")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--llm-latency-ms", type=float, default=50)
+    parser.add_argument("--llm-jitter-ms", type=float, default=0)
+    parser.add_argument("--route", default="", help="only run routes containing this text")
+    asyncio.run(main(parser.parse_args()))
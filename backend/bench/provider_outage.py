@@ -0,0 +1,139 @@
+"""
+Scripted LLM outage against the fake provider, to see how the routes behave with the
+provider guard (circuit breaker, call timeouts, load shedding, fallbacks) and without it.
+
+Phases, each --requests requests per route at --concurrency:
+  healthy    normal latency; fills the recent-song caches used as fallbacks
+  slow       every LLM call takes --spike-ms longer (past the call timeout)
+  failing    every LLM call raises
+  recovered  back to normal
+Each phase after the first starts once the breaker's open period has passed.
+
+    python bench/provider_outage.py
+    python bench/provider_outage.py --no-guard        # LLM_GUARD=off for comparison
+
+Times are scaled down (call timeout, deadlines, breaker open period) so a run takes
+seconds; the ratios match the production settings.
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def configure_env(args) -> None:
+    os.environ.update({
+        "LLM_PROVIDER": "fake",
+        "SPOTIFY_PROVIDER": "fake",
+        "DATA_BACKEND": "memory",
+        "JOB_STORE": "memory",
+        "FAKE_LLM_LATENCY_MS": str(args.llm_latency_ms),
+        "LLM_GUARD": "off" if args.no_guard else "on",
+        "LLM_CALL_TIMEOUT_SECONDS": str(args.call_timeout),
+        "LLM_MAX_CONCURRENCY": str(args.max_concurrency),
+    })
+    os.environ.setdefault("FRONTEND_URL", "http://localhost")
+
+
+ROUTES = {
+    "generate-song": lambda i: ("/api/recommendation/generate-song", {
+        "top_tracks": [{"name": "Wonderwall", "artists": [{"name": "Oasis"}]}],
+        "top_artists": [{"name": "Oasis", "genres": ["britpop"]}],
+        "current_difficulty": 1 + i % 5, "previous_songs": []}),
+    "generate-similar": lambda i: ("/api/recommendation/generate-similar", {
+        "type": "track", "name": "Wonderwall", "artist_name": "Oasis",
+        "current_difficulty": 1 + i % 5, "previous_songs": []}),
+    "practice-plan": lambda i: ("/api/practice-plan", {"song_title": f"Song {i}", "artist": "Artist"}),
+}
+
+
+async def run_phase(client, route: str, requests: int, concurrency: int, offset: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    outcomes = Counter()
+    latencies = []
+
+    async def one(i: int):
+        url, body = ROUTES[route](i)
+        async with semaphore:
+            start = time.perf_counter()
+            # a different user per request so fallback songs are new to them
+            r = await client.post(url, json=body, headers={"Authorization": f"Bearer user-{offset + i}"})
+            latencies.append((time.perf_counter() - start) * 1000)
+        if r.status_code == 200 and r.headers.get("x-degraded"):
+            outcomes["200 cached"] += 1
+        else:
+            outcomes[str(r.status_code)] += 1
+
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return outcomes, latencies
+
+
+async def main(args) -> None:
+    configure_env(args)
+
+    import httpx
+    import provider_guard
+    from main import create_app
+    from providers import get_llm
+
+    # scale the budgets to the shortened call timeout
+    scale = args.call_timeout / 30
+    for endpoint in provider_guard.DEADLINES:
+        provider_guard.DEADLINES[endpoint] *= scale
+    for endpoint in provider_guard.ENDPOINT_SLOW_CALL_SECONDS:
+        provider_guard.ENDPOINT_SLOW_CALL_SECONDS[endpoint] *= scale
+    provider_guard.SLOW_CALL_SECONDS *= scale
+    provider_guard.OPEN_SECONDS = args.open_seconds
+
+    app = create_app()
+    async with app.router.lifespan_context(app):
+        llm = get_llm()
+        fake = getattr(llm, "inner", llm)
+
+        phases = [
+            ("healthy", dict(failure_rate=0, spike_rate=0)),
+            ("slow", dict(failure_rate=0, spike_rate=1, spike_ms=args.spike_ms)),
+            ("failing", dict(failure_rate=1, spike_rate=0)),
+            ("recovered", dict(failure_rate=0, spike_rate=0)),
+        ]
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://outage", timeout=None) as client:
+            print(f"guard {'off' if args.no_guard else 'on'}, {args.requests} requests per route per phase, "
+                  f"concurrency {args.concurrency}, LLM latency {args.llm_latency_ms}ms, "
+                  f"call timeout {args.call_timeout}s, spikes +{args.spike_ms}ms")
+            print(f"{'phase':10} {'route':17} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}  outcomes")
+            offset = 0
+            for phase, settings in phases:
+                if phase != "healthy":
+                    # let an open breaker reach half-open, so each phase starts by probing the provider
+                    await asyncio.sleep(args.open_seconds)
+                for key, value in settings.items():
+                    setattr(fake, key, value)
+                for route in ROUTES:
+                    outcomes, latencies = await run_phase(client, route, args.requests, args.concurrency, offset)
+                    offset += args.requests
+                    latencies.sort()
+                    print(f"{phase:10} {route:17} {statistics.median(latencies):8.0f} "
+                          f"{latencies[int(len(latencies) * 0.95) - 1]:8.0f} {latencies[-1]:8.0f}  "
+                          f"{dict(sorted(outcomes.items()))}")
+
+        print("provider guard:", provider_guard.get_stats(llm))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--llm-latency-ms", type=float, default=50)
+    parser.add_argument("--spike-ms", type=float, default=3000)
+    parser.add_argument("--call-timeout", type=float, default=1.0)
+    parser.add_argument("--open-seconds", type=float, default=2.0)
+    parser.add_argument("--max-concurrency", type=int, default=16)
+    parser.add_argument("--no-guard", action="store_true")
+    asyncio.run(main(parser.parse_args()))
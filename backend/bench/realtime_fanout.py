@@ -0,0 +1,154 @@
+"""
+Completion push channel benchmark (completion_events.py, GET /api/practice-plan/events).
+
+  traffic      bytes another open client receives per checkbox toggle: refetching the
+               dashboard vs one pushed completion frame, for a user with --plans plans
+  fan-out      --users users with --streams open streams each; --events completions are
+               published to random users at --rate per second. Reports the publish cost,
+               publish-to-read latency and the memory held per stream
+  backpressure one stream stops reading while --events are published to it; its queue
+               never holds more than --queue-size frames and ends up as a single resync
+
+Runs in-process against the in-memory store; the fan-out part drives the hub directly,
+with one reader task per stream standing in for the SSE response loop.
+
+    python bench/realtime_fanout.py --users 2000 --streams 3 --events 20000
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import statistics
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.update({"LLM_PROVIDER": "fake", "SPOTIFY_PROVIDER": "fake", "DATA_BACKEND": "memory", "JOB_STORE": "memory"})
+os.environ.setdefault("FRONTEND_URL", "http://localhost")
+
+import httpx
+
+import completion_events
+from main import create_app
+from fakes import fake_plan
+from completion_events import CompletionHub, completion_frame
+
+USER = "realtime-user"
+
+
+async def traffic(args) -> None:
+    app = create_app()
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        headers = {"Authorization": f"Bearer {USER}", "Accept-Encoding": "gzip"}
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+            for p in range(args.plans):
+                plan = fake_plan({"song_title": f"Song {p}", "artist": "Artist", "minutes_per_day": 30})
+                await client.post("/api/practice-plan/save", json={"song_title": plan["song_title"],
+                                                                   "artist": plan["artist"], "plan": plan})
+            plans = (await client.get("/api/practice-plan/saved")).json()
+            for plan in plans:
+                for day in plan["plan"]["days"][:4]:
+                    for i, task in enumerate(day["tasks"]):
+                        await client.post("/api/practice-plan/complete-task", json={
+                            "plan_id": plan["id"], "day_name": day["day"], "task_index": i,
+                            "task_title": task["title"], "technique": task["technique"],
+                            "duration_minutes": task["duration_minutes"]})
+
+            r = await client.get("/api/practice-plan/dashboard")
+            refetch = r.num_bytes_downloaded
+            r = await client.get(f"/api/practice-plan/completions/{plans[0]['id']}")
+            per_plan = r.num_bytes_downloaded
+            push = len(completion_frame(plans[0]["id"], "Wednesday", 2, True).encode())
+
+    print(f"traffic per toggle, per other open client ({args.plans} plans, compressed body sizes)")
+    print(f"  refetch dashboard      {refetch:8d} B  1 request")
+    print(f"  refetch completions    {per_plan:8d} B  1 request")
+    print(f"  pushed delta           {push:8d} B  0 requests (on an open stream)")
+
+
+async def fan_out(args) -> None:
+    hub = CompletionHub(queue_size=args.queue_size, max_streams_per_user=args.streams)
+    users = [f"user-{u}" for u in range(args.users)]
+    sent = {}
+    latencies = []
+
+    async def reader(listener: asyncio.Queue):
+        while True:
+            frame = await listener.get()
+            latencies.append(time.perf_counter() - sent[frame])
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    listeners = [hub.subscribe(u) for u in users for _ in range(args.streams)]
+    per_stream = (tracemalloc.get_traced_memory()[0] - before) / len(listeners)
+    tracemalloc.stop()
+
+    readers = [asyncio.create_task(reader(l)) for l in listeners]
+    await asyncio.sleep(0)
+
+    publish_times = []
+    interval = 1 / args.rate
+    start = time.perf_counter()
+    for e in range(args.events):
+        user = random.choice(users)
+        frame = completion_frame("plan", "Monday", e, True)
+        t = time.perf_counter()
+        sent[frame] = t
+        hub.publish(user, frame)
+        publish_times.append(time.perf_counter() - t)
+        # pace the publishes and let the readers run
+        await asyncio.sleep(max(0.0, start + (e + 1) * interval - time.perf_counter()))
+    await asyncio.sleep(0.1)
+
+    for r in readers:
+        r.cancel()
+    await asyncio.gather(*readers, return_exceptions=True)
+
+    latencies.sort()
+    publish_times.sort()
+    print(f"fan-out: {args.users} users x {args.streams} streams, {args.events} events at {args.rate}/s")
+    print(f"  memory per idle stream  {per_stream:8.0f} B (queue + registry)")
+    print(f"  publish p50             {statistics.median(publish_times) * 1e6:8.1f} us")
+    print(f"  publish p99             {publish_times[int(len(publish_times) * 0.99)] * 1e6:8.1f} us")
+    print(f"  delivered               {len(latencies):8d} frames ({len(latencies) / args.events:.1f} per event)")
+    print(f"  publish->read p50       {statistics.median(latencies) * 1e3:8.2f} ms")
+    print(f"  publish->read p99       {latencies[int(len(latencies) * 0.99)] * 1e3:8.2f} ms")
+
+
+async def backpressure(args) -> None:
+    hub = CompletionHub(queue_size=args.queue_size, max_streams_per_user=2)
+    stalled = hub.subscribe(USER)
+    resyncs = completion_events.stats["resyncs"]
+
+    start = time.perf_counter()
+    for e in range(args.events):
+        hub.publish(USER, completion_frame("plan", "Monday", e, e % 2 == 0))
+    elapsed = time.perf_counter() - start
+
+    frames = []
+    while not stalled.empty():
+        frames.append(stalled.get_nowait())
+    print(f"backpressure: 1 stalled stream, {args.events} events, queue size {args.queue_size}")
+    print(f"  publish avg             {elapsed / args.events * 1e6:8.1f} us")
+    print(f"  queued when it resumed  {len(frames):8d} frames, first is {frames[0].split(chr(10))[0]!r}")
+    print(f"  resyncs sent            {completion_events.stats['resyncs'] - resyncs:8d}")
+
+
+async def main(args) -> None:
+    await traffic(args)
+    await fan_out(args)
+    await backpressure(args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--plans", type=int, default=10)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--streams", type=int, default=3)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--rate", type=float, default=5000)
+    parser.add_argument("--queue-size", type=int, default=64)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,82 @@
+"""
+Serialization benchmark for a GET /api/practice-plan/saved listing.
+
+Compares FastAPI's default path (jsonable_encoder + json.dumps in JSONResponse) with
+FastJSONResponse (orjson, no jsonable_encoder) and reports CPU time per response and
+bytes on the wire uncompressed, gzip and brotli (if installed).
+
+    python bench/serialization.py --plans 200
+"""
+import os
+import sys
+import gzip
+import time
+import uuid
+import argparse
+import statistics
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from fakes import fake_plan
+from serialization import FastJSONResponse, brotli
+
+
+def build_listing(count: int) -> list:
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "song_title": f"Song {i}",
+            "artist": "Artist",
+            "plan": fake_plan({"song_title": f"Song {i}", "artist": "Artist",
+                               "minutes_per_day": 60, "start_day": "Monday"}),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+        for i in range(count)
+    ]
+
+
+def time_ms(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.process_time()
+        fn()
+        samples.append((time.process_time() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--plans", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    listing = build_listing(args.plans)
+
+    default_ms = time_ms(lambda: JSONResponse(jsonable_encoder(listing)), args.repeat)
+    fast_ms = time_ms(lambda: FastJSONResponse(listing), args.repeat)
+
+    body = FastJSONResponse(listing).body
+    gzip_ms = time_ms(lambda: gzip.compress(body, compresslevel=6), args.repeat)
+
+    print(f"{args.plans}-plan listing, median CPU time per response over {args.repeat} runs")
+    print(f"  jsonable_encoder + json.dumps   {default_ms:8.2f} ms")
+    print(f"  FastJSONResponse (orjson)       {fast_ms:8.2f} ms   ({default_ms / fast_ms:.1f}x faster)")
+    print(f"  gzip level 6                    {gzip_ms:8.2f} ms")
+
+    print("bytes on the wire")
+    print(f"  default JSON                    {len(JSONResponse(jsonable_encoder(listing)).body):10,d}")
+    print(f"  orjson                          {len(body):10,d}")
+    print(f"  orjson + gzip                   {len(gzip.compress(body, compresslevel=6)):10,d}")
+    if brotli is not None:
+        br_ms = time_ms(lambda: brotli.compress(body, quality=4), args.repeat)
+        print(f"  orjson + brotli q4              {len(brotli.compress(body, quality=4)):10,d}   ({br_ms:.2f} ms)")
+    else:
+        print("  orjson + brotli                 (pip install brotli)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Similarity index (song_index.py) at catalog sizes beyond what a real deployment has
+seen yet: build cost, memory footprint and generate-similar lookup latency.
+
+For each --sizes entry a synthetic catalog is built through SongIndex.add (songs spread
+over --artists-ratio * size artists, 1-3 genres from a 300-genre vocabulary, 2-4
+skills from 200, difficulty 1-5), then --queries lookups are timed. Half are "track"
+seeds taken from the catalog and half "artist" seeds; each excludes --seen songs,
+standing in for the user's seen set and previous_songs.
+
+    python bench/song_index_scale.py --sizes 10000 100000 1000000
+
+Memory is the process RSS growth while building, so it includes the Python-side
+song records and key maps, not just the matrices.
+"""
+import os
+import sys
+import gc
+import time
+import random
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import seen_songs
+from song_index import SongIndex
+
+GENRES = [f"genre {g}" if g % 3 else f"genre {g} rock" for g in range(300)]
+SKILLS = [f"skill {s}" for s in range(200)]
+
+
+def rss_bytes() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def synthetic_songs(size: int, artists: int, rng: random.Random):
+    for i in range(size):
+        artist = rng.randrange(artists)
+        # an artist's songs share a home genre, like real catalogs
+        genres = [GENRES[artist % len(GENRES)]] + rng.sample(GENRES, rng.randint(0, 2))
+        yield {
+            "name": f"Song {i}",
+            "artist": f"Artist {artist}",
+            "difficulty": rng.randint(1, 5),
+            "skills": rng.sample(SKILLS, rng.randint(2, 4)),
+            "genres": genres,
+        }
+
+
+def run(size: int, args) -> None:
+    rng = random.Random(size)
+    artists = max(1, int(size * args.artists_ratio))
+
+    gc.collect()
+    before = rss_bytes()
+    index = SongIndex(dims=args.dims, min_score=args.min_score, max_songs=size)
+    start = time.perf_counter()
+    for song in synthetic_songs(size, artists, rng):
+        index.add(song, persist=False)
+    build = time.perf_counter() - start
+    gc.collect()
+    memory = rss_bytes() - before
+    matrix = sum(p.nbytes() for p in index.partitions.values())
+
+    latencies = []
+    served = 0
+    for q in range(args.queries):
+        difficulty = rng.randint(1, 5)
+        exclude = {seen_songs.song_key(f"Song {rng.randrange(size)}", f"Artist {rng.randrange(artists)}")
+                   for _ in range(args.seen)}
+        if q % 2 == 0:
+            partition = index.partitions[rng.randint(1, 5)]
+            seed = partition.songs[rng.randrange(partition.size)]
+            kind, name, artist_name = "track", seed["name"], seed["artist"]
+        else:
+            kind, name, artist_name = "artist", f"Artist {rng.randrange(artists)}", None
+        start = time.perf_counter()
+        song = index.find_similar(kind, name, artist_name, difficulty, exclude)
+        latencies.append((time.perf_counter() - start) * 1000)
+        served += song is not None
+
+    latencies.sort()
+    print(f"{size:>9,d} {build:8.1f} {size / build:10,.0f} {matrix / 2**20:10.1f} {memory / 2**20:10.1f} "
+          f"{memory / size:8.0f} {statistics.median(latencies):8.2f} {latencies[int(len(latencies) * 0.99)]:8.2f} "
+          f"{served / args.queries:7.0%}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dims", type=int, default=128)
+    parser.add_argument("--min-score", type=float, default=0.55)
+    parser.add_argument("--artists-ratio", type=float, default=0.1)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--seen", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"dims {args.dims}, {args.queries} lookups per size, {args.seen} excluded songs per lookup")
+    print(f"{'songs':>9} {'build s':>8} {'adds/s':>10} {'matrix MB':>10} {'RSS MB':>10} {'B/song':>8} "
+          f"{'p50 ms':>8} {'p99 ms':>8} {'served':>7}")
+    for size in args.sizes:
+        run(size, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import os
+import json
+import asyncio
+from typing import Dict, Optional, Set
+
+# Per-user push channel for task completion changes.
+# complete_task / uncomplete_task publish a small delta to every stream the user has
+# open (GET /api/practice-plan/events), so other tabs and devices update without
+# refetching the completion list.
+#
+# Each stream gets a bounded queue. A frame is encoded once per publish and the same
+# string goes to every listener. A client that stops reading fills its queue; instead
+# of growing it or blocking the publisher, the queue is emptied and replaced by a
+# single "resync" event, which tells the client to refetch once. Until the client has
+# read that event, further deltas to it are skipped (the refetch will include them).
+#
+# The hub is in-process: with several uvicorn workers a user's streams and writes can
+# land on different workers, so run one worker or pin users to a worker.
+
+# Settings (read when a stream opens):
+#   REALTIME_QUEUE_SIZE - frames buffered per stream before it is asked to resync
+#   REALTIME_MAX_STREAMS_PER_USER - open streams allowed per user
+
+# seconds between SSE keep-alive comments, so proxies don't close idle streams
+HEARTBEAT_SECONDS = 15
+
+RESYNC_FRAME = "event: resync\ndata: {}\n\n"
+
+stats = {
+    "published": 0,
+    "delivered": 0,
+    "resyncs": 0,
+    "rejected": 0,
+}
+
+
+class TooManyStreams(Exception):
+    pass
+
+
+def completion_frame(plan_id: str, day_name: str, task_index: int, done: bool) -> str:
+    # short keys: p plan id, d day, i task index, c 1 completed / 0 not
+    data = json.dumps({"p": plan_id, "d": day_name, "i": task_index, "c": int(done)}, separators=(",", ":"))
+    return f"event: completion\ndata: {data}\n\n"
+
+
+class CompletionHub:
+    def __init__(self, queue_size: Optional[int] = None, max_streams_per_user: Optional[int] = None):
+        self.queue_size = queue_size
+        self.max_streams_per_user = max_streams_per_user
+        self.listeners: Dict[str, Set[asyncio.Queue]] = {}
+        # streams holding an unread resync event
+        self.resyncing: Set[asyncio.Queue] = set()
+
+    def subscribe(self, user_id: str) -> asyncio.Queue:
+        queue_size = self.queue_size or int(os.environ.get("REALTIME_QUEUE_SIZE", "64"))
+        max_streams = self.max_streams_per_user or int(os.environ.get("REALTIME_MAX_STREAMS_PER_USER", "10"))
+
+        listeners = self.listeners.setdefault(user_id, set())
+        if len(listeners) >= max_streams:
+            stats["rejected"] += 1
+            raise TooManyStreams(f"User already has {len(listeners)} open streams")
+        listener: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        listeners.add(listener)
+        return listener
+
+    def unsubscribe(self, user_id: str, listener: asyncio.Queue) -> None:
+        listeners = self.listeners.get(user_id)
+        if listeners is None:
+            return
+        listeners.discard(listener)
+        self.resyncing.discard(listener)
+        if not listeners:
+            self.listeners.pop(user_id, None)
+
+    def publish(self, user_id: str, frame: str) -> int:
+        # never awaits: a slow stream can't hold up the request that made the change
+        stats["published"] += 1
+        listeners = self.listeners.get(user_id)
+        if not listeners:
+            return 0
+        for listener in listeners:
+            if listener in self.resyncing:
+                if not listener.empty():
+                    continue
+                # the client read the resync event, so it is refetching: deltas apply again
+                self.resyncing.discard(listener)
+            try:
+                listener.put_nowait(frame)
+            except asyncio.QueueFull:
+                # fell behind: drop what it hasn't read and have it refetch instead
+                while not listener.empty():
+                    listener.get_nowait()
+                listener.put_nowait(RESYNC_FRAME)
+                self.resyncing.add(listener)
+                stats["resyncs"] += 1
+        stats["delivered"] += len(listeners)
+        return len(listeners)
+
+    def publish_completion(self, user_id: str, plan_id: str, day_name: str, task_index: int, done: bool) -> int:
+        return self.publish(user_id, completion_frame(plan_id, day_name, task_index, done))
+
+    def get_stats(self) -> dict:
+        return {**stats, "users": len(self.listeners), "streams": sum(len(l) for l in self.listeners.values())}
+
+
+completion_hub = CompletionHub()
@@ -0,0 +1,215 @@
+import os
+import json
+import random
+import asyncio
+from typing import Dict, List
+from urllib.parse import parse_qsl
+
+from fastapi import FastAPI, Request
+
+from providers import LLMProvider
+
+# Local stand-ins for OpenAI and Spotify: deterministic, offline and with configurable
+# latency, so routes can be run, benchmarked and load tested without real accounts.
+# Select them with LLM_PROVIDER=fake and SPOTIFY_PROVIDER=fake (and DATA_BACKEND=memory).
+
+FAKE_SONGS = [
+    {"name": "Wonderwall", "artist": "Oasis", "genres": ["britpop", "rock"], "difficulty": 1, "skills": ["open chords", "strumming"]},
+    {"name": "Horse with No Name", "artist": "America", "genres": ["folk rock"], "difficulty": 1, "skills": ["two-chord vamp", "strumming"]},
+    {"name": "Knockin' on Heaven's Door", "artist": "Bob Dylan", "genres": ["folk", "rock"], "difficulty": 1, "skills": ["open chords", "chord changes"]},
+    {"name": "Wish You Were Here", "artist": "Pink Floyd", "genres": ["progressive rock"], "difficulty": 2, "skills": ["hammer-ons", "open chords", "intro riff"]},
+    {"name": "Smells Like Teen Spirit", "artist": "Nirvana", "genres": ["grunge"], "difficulty": 2, "skills": ["power chords", "palm muting"]},
+    {"name": "Seven Nation Army", "artist": "The White Stripes", "genres": ["garage rock"], "difficulty": 2, "skills": ["single-note riff", "slides"]},
+    {"name": "Blackbird", "artist": "The Beatles", "genres": ["rock", "folk"], "difficulty": 3, "skills": ["fingerpicking", "moving shapes"]},
+    {"name": "Under the Bridge", "artist": "Red Hot Chili Peppers", "genres": ["funk rock"], "difficulty": 3, "skills": ["chord embellishments", "double stops"]},
+    {"name": "Sweet Child O' Mine", "artist": "Guns N' Roses", "genres": ["hard rock"], "difficulty": 4, "skills": ["string skipping", "bends", "lead phrasing"]},
+    {"name": "Little Wing", "artist": "Jimi Hendrix", "genres": ["psychedelic rock", "blues"], "difficulty": 4, "skills": ["thumb-over chords", "embellishments"]},
+    {"name": "Eruption", "artist": "Van Halen", "genres": ["hard rock"], "difficulty": 5, "skills": ["tapping", "tremolo picking", "dive bombs"]},
+    {"name": "Cliffs of Dover", "artist": "Eric Johnson", "genres": ["instrumental rock"], "difficulty": 5, "skills": ["alternate picking", "hybrid picking"]},
+]
+
+WEEK = ["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
+
+
+###########################     Fake LLM       ###########################
+
+class FakeLLMProvider(LLMProvider):
+    # failure_rate: share of calls that raise; spike_rate / spike_ms: share of calls that
+    # take spike_ms longer. Both can be changed on a live instance to script an outage.
+    def __init__(self, latency_ms: float = 50, jitter_ms: float = 0, chunk_delay_ms: float = 5, seed: int = 0,
+                 failure_rate: float = 0, spike_rate: float = 0, spike_ms: float = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.chunk_delay_ms = chunk_delay_ms
+        self.failure_rate = failure_rate
+        self.spike_rate = spike_rate
+        self.spike_ms = spike_ms
+        self.random = random.Random(seed)
+        self.calls = 0
+
+    @classmethod
+    def from_env(cls) -> "FakeLLMProvider":
+        return cls(
+            latency_ms=float(os.environ.get("FAKE_LLM_LATENCY_MS", "50")),
+            jitter_ms=float(os.environ.get("FAKE_LLM_JITTER_MS", "0")),
+            chunk_delay_ms=float(os.environ.get("FAKE_LLM_CHUNK_DELAY_MS", "5")),
+            seed=int(os.environ.get("FAKE_LLM_SEED", "0")),
+            failure_rate=float(os.environ.get("FAKE_LLM_FAILURE_RATE", "0")),
+            spike_rate=float(os.environ.get("FAKE_LLM_SPIKE_RATE", "0")),
+            spike_ms=float(os.environ.get("FAKE_LLM_SPIKE_MS", "0")),
+        )
+
+    async def _wait(self) -> None:
+        delay = self.latency_ms + self.random.uniform(0, self.jitter_ms)
+        if self.random.random() < self.spike_rate:
+            delay += self.spike_ms
+        await asyncio.sleep(delay / 1000)
+        if self.random.random() < self.failure_rate:
+            raise RuntimeError("Fake LLM failure (injected)")
+
+    async def complete(self, messages, temperature=None, max_tokens=None, n=1):
+        self.calls += 1
+        await self._wait()
+        return [self.respond(messages) for _ in range(n)]
+
+    async def stream(self, messages, temperature=None, max_tokens=None):
+        self.calls += 1
+        await self._wait()
+        text = self.respond(messages)
+        for i in range(0, len(text), 32):
+            await asyncio.sleep(self.chunk_delay_ms / 1000)
+            yield text[i:i + 32]
+
+    def respond(self, messages: List[Dict[str, str]]) -> str:
+        system = messages[0]["content"] if messages else ""
+        user = messages[-1]["content"] if messages else ""
+
+        if "GuitarCoach" in system:
+            payload = json.loads(user)
+            if payload.get("regenerate") == "task":
+                return json.dumps(fake_task(payload, int(payload.get("total_minutes") or 10)))
+            if payload.get("regenerate") == "day":
+                return json.dumps(fake_day(payload, payload.get("day", "Sunday"), int(payload.get("total_minutes") or 15)))
+            if "skeleton" in payload:
+                return json.dumps(fake_fill(payload["skeleton"]))
+            return json.dumps(fake_plan(payload))
+
+        # songs rotate deterministically, so repeats happen and exercise the duplicate filter
+        song = FAKE_SONGS[self.random.randrange(len(FAKE_SONGS))]
+        return json.dumps({
+            "name": song["name"],
+            "artist": song["artist"],
+            "difficulty": song["difficulty"],
+            "skills": song["skills"],
+            "genres": song["genres"],
+            "description": f"A {', '.join(song['genres'])} song that builds {song['skills'][0]}.",
+        })
+
+
+def fake_task(payload: dict, minutes: int, i: int = 0, offset: int = 0) -> dict:
+    song = payload.get("song_title", "Song")
+    return {
+        "title": f"Task {i + 1}",
+        "duration_minutes": minutes,
+        "technique": "chord changes" if i == 0 else "playing along",
+        "instructions": f"Work through section {offset + 1} of {song} slowly.",
+        "why": "Builds the muscle memory the song needs.",
+        "milestone": "Play the section cleanly 3x in a row at 60 BPM.",
+    }
+
+
+def fake_fill(skeleton: dict) -> dict:
+    # song-specific text for a planner skeleton (hybrid mode)
+    song = skeleton.get("song_title", "Song")
+    return {
+        "weekly_goal": {"description": f"Play {song} from start to finish.", "milestones": ["Intro", "Verse", "Full song"]},
+        "days": [
+            {"tasks": [{"instructions": f"{t['title']}: work through it with {song} slowly.",
+                        "why": f"Needed for {song}.",
+                        "milestone": "Play it cleanly 3x in a row at 60 BPM."} for t in d["tasks"]]}
+            for d in skeleton.get("days", [])
+        ],
+    }
+
+
+def fake_day(payload: dict, day: str, minutes: int, offset: int = 0) -> dict:
+    # two tasks whose durations add up to minutes
+    first = minutes // 2
+    return {
+        "day": day,
+        "focus": f"{payload.get('song_title', 'Song')} practice, day {offset + 1}",
+        "tasks": [fake_task(payload, d, i, offset) for i, d in enumerate([first, minutes - first])],
+    }
+
+
+def fake_plan(payload: dict) -> dict:
+    minutes = int(payload.get("minutes_per_day") or 15)
+    start = WEEK.index(payload.get("start_day", "Sunday")) if payload.get("start_day") in WEEK else 0
+    song, artist = payload.get("song_title", "Song"), payload.get("artist", "Artist")
+
+    return {
+        "song_title": song,
+        "artist": artist,
+        "skill_level": payload.get("skill_level", "beginner"),
+        "weekly_goal": {
+            "description": f"Play through {song} by {artist} at a slow tempo.",
+            "milestones": ["Learn the chords", "Learn the rhythm", "Play it through"],
+        },
+        "days": [fake_day(payload, WEEK[(start + offset) % 7], minutes, offset) for offset in range(7)],
+    }
+
+
+###########################     Mock Spotify       ###########################
+
+mock_spotify_app = FastAPI()
+
+
+def _track(song: dict, i: int) -> dict:
+    return {
+        "id": f"track{i}",
+        "name": song["name"],
+        "artists": [{"id": f"artist{i}", "name": song["artist"]}],
+        "album": {"images": [{"url": f"https://example.invalid/album{i}.jpg"}]},
+        "preview_url": None,
+    }
+
+
+def _artist(song: dict, i: int) -> dict:
+    return {"id": f"artist{i}", "name": song["artist"], "genres": song["genres"]}
+
+
+@mock_spotify_app.post("/api/token")
+async def mock_token(request: Request):
+    # parsed by hand so the fake doesn't need python-multipart
+    form = dict(parse_qsl((await request.body()).decode()))
+    return {
+        "access_token": f"fake-access-{form.get('code') or form.get('refresh_token') or 'token'}",
+        "refresh_token": "fake-refresh",
+        "expires_in": 3600,
+        "token_type": "Bearer",
+    }
+
+
+@mock_spotify_app.get("/v1/me/top/tracks")
+async def mock_top_tracks(limit: int = 20, time_range: str = "medium_term"):
+    return {"items": [_track(s, i) for i, s in enumerate(FAKE_SONGS[:limit])]}
+
+
+@mock_spotify_app.get("/v1/me/top/artists")
+async def mock_top_artists(limit: int = 20, time_range: str = "medium_term"):
+    return {"items": [_artist(s, i) for i, s in enumerate(FAKE_SONGS[:limit])]}
+
+
+@mock_spotify_app.get("/v1/me/player/recently-played")
+async def mock_recently_played(limit: int = 20):
+    return {"items": [{"track": _track(s, i), "played_at": "2024-01-01T00:00:00Z"} for i, s in enumerate(FAKE_SONGS[:limit])]}
+
+
+@mock_spotify_app.get("/v1/search")
+async def mock_search(q: str = "", type: str = "track", limit: int = 5):
+    words = q.lower().split()
+    matches = [
+        _track(s, i) for i, s in enumerate(FAKE_SONGS)
+        if any(w in f"{s['name']} {s['artist']}".lower() for w in words)
+    ]
+    return {"tracks": {"items": matches[:limit]}}
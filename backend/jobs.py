@@ -0,0 +1,463 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import asyncio
+import threading
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from urllib.parse import urlparse
+
+import httpx
+
+# Background jobs for long-running generations.
+# A route submits work and returns the job id straight away; a pool of worker tasks
+# runs the jobs with bounded concurrency and records the result in a job store.
+# Clients poll GET /api/jobs/{id}, listen on the SSE stream, or get a webhook.
+#
+# The store is pluggable (JOB_STORE=memory|sqlite). With sqlite, jobs that were queued
+# or running when the process stopped are picked up again on the next start.
+#
+# Several processes (uvicorn workers) can share one sqlite file, so every unfinished job
+# carries an owner (the process's queue id) and a lease. Owners renew their leases while
+# they run; a job is only taken over - at start or while running - once its lease has
+# expired, and workers claim a job with a single conditional update before running it,
+# so a job is never run by two processes at once.
+#
+# If the store itself fails while a worker handles a job (sqlite "database is locked"),
+# the worker logs it and releases the job, which is then adopted and retried like one
+# from a stopped process. Finished jobs are deleted JOB_RETENTION_SECONDS after they end.
+
+# Settings (read when the queue starts):
+#   JOB_STORE=memory|sqlite, JOB_DB_PATH, JOB_WORKERS, JOB_LEASE_SECONDS, JOB_RETENTION_SECONDS
+#   JOB_WEBHOOK_HOSTS - comma separated hosts webhooks may be sent to; unset disables them
+
+PENDING_STATUSES = ("queued", "running")
+FINISHED_STATUSES = ("done", "failed")
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _leasable(job: dict, owner: str, now: float) -> bool:
+    return job["owner"] == owner or not job["owner"] or (job["lease_until"] or 0) < now
+
+
+###########################     Job stores       ###########################
+
+class MemoryJobStore:
+    # called from the event loop; SQLiteJobStore calls block, so they run in a thread
+    blocking = False
+
+    def __init__(self):
+        self.jobs: Dict[str, dict] = {}
+
+    def add(self, job: dict) -> None:
+        self.jobs[job["id"]] = dict(job)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        job = self.jobs.get(job_id)
+        return dict(job) if job else None
+
+    def update(self, job_id: str, **fields) -> None:
+        self.jobs[job_id].update(fields, updated_at=_now())
+
+    def claim(self, job_id: str, owner: str, lease_seconds: float) -> bool:
+        job = self.jobs.get(job_id)
+        now = time.time()
+        if not job or job["status"] not in PENDING_STATUSES or not _leasable(job, owner, now):
+            return False
+        job.update(status="running", owner=owner, lease_until=now + lease_seconds, updated_at=_now())
+        return True
+
+    def adopt(self, owner: str, lease_seconds: float) -> List[str]:
+        now = time.time()
+        adopted = []
+        for job in self.jobs.values():
+            if job["status"] in PENDING_STATUSES and job["owner"] != owner and _leasable(job, owner, now):
+                job.update(status="queued", owner=owner, lease_until=now + lease_seconds, updated_at=_now())
+                adopted.append(job["id"])
+        return adopted
+
+    def renew(self, owner: str, lease_seconds: float) -> None:
+        until = time.time() + lease_seconds
+        for job in self.jobs.values():
+            if job["owner"] == owner and job["status"] in PENDING_STATUSES:
+                job["lease_until"] = until
+
+    def release(self, owner: str) -> None:
+        for job in self.jobs.values():
+            if job["owner"] == owner and job["status"] in PENDING_STATUSES:
+                job["lease_until"] = 0
+
+    def release_job(self, job_id: str, owner: str) -> None:
+        job = self.jobs.get(job_id)
+        if job and job["owner"] == owner and job["status"] in PENDING_STATUSES:
+            job.update(owner=None, lease_until=0)
+
+    def prune(self, finished_before: str) -> int:
+        expired = [job_id for job_id, job in self.jobs.items()
+                   if job["status"] in FINISHED_STATUSES and job["updated_at"] < finished_before]
+        for job_id in expired:
+            del self.jobs[job_id]
+        return len(expired)
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteJobStore:
+    COLUMNS = ("id", "kind", "user_id", "payload", "status", "result", "error",
+               "webhook_url", "created_at", "updated_at", "owner", "lease_until")
+    JSON_COLUMNS = ("payload", "result")
+    blocking = True
+
+    def __init__(self, path: str):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                webhook_url TEXT,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                owner TEXT,
+                lease_until REAL
+            )
+        """)
+        # files created before leases existed
+        existing = {row[1] for row in self.conn.execute("PRAGMA table_info(jobs)")}
+        for column, sql_type in (("owner", "TEXT"), ("lease_until", "REAL")):
+            if column not in existing:
+                self.conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {sql_type}")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_idx ON jobs (status)")
+        self.conn.commit()
+
+    def _to_row(self, fields: dict) -> dict:
+        return {k: json.dumps(v) if k in self.JSON_COLUMNS and v is not None else v for k, v in fields.items()}
+
+    def _from_row(self, row) -> dict:
+        job = dict(zip(self.COLUMNS, row))
+        for k in self.JSON_COLUMNS:
+            if job[k] is not None:
+                job[k] = json.loads(job[k])
+        return job
+
+    def add(self, job: dict) -> None:
+        row = self._to_row(job)
+        with self.lock:
+            self.conn.execute(
+                f"INSERT INTO jobs ({', '.join(self.COLUMNS)}) VALUES ({', '.join('?' * len(self.COLUMNS))})",
+                [row.get(c) for c in self.COLUMNS],
+            )
+            self.conn.commit()
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self.lock:
+            row = self.conn.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return self._from_row(row) if row else None
+
+    def update(self, job_id: str, **fields) -> None:
+        row = self._to_row({**fields, "updated_at": _now()})
+        with self.lock:
+            self.conn.execute(
+                f"UPDATE jobs SET {', '.join(f'{k} = ?' for k in row)} WHERE id = ?",
+                [*row.values(), job_id],
+            )
+            self.conn.commit()
+
+    # each statement below checks and takes the lease in one UPDATE, which sqlite runs under
+    # its write lock, so two processes can't both take the same job
+
+    def claim(self, job_id: str, owner: str, lease_seconds: float) -> bool:
+        now = time.time()
+        with self.lock:
+            cursor = self.conn.execute(
+                """UPDATE jobs SET status = 'running', owner = ?, lease_until = ?, updated_at = ?
+                   WHERE id = ? AND status IN (?, ?)
+                     AND (owner = ? OR owner IS NULL OR coalesce(lease_until, 0) < ?)""",
+                (owner, now + lease_seconds, _now(), job_id, *PENDING_STATUSES, owner, now),
+            )
+            self.conn.commit()
+        return cursor.rowcount == 1
+
+    def adopt(self, owner: str, lease_seconds: float) -> List[str]:
+        now = time.time()
+        with self.lock:
+            rows = self.conn.execute(
+                """UPDATE jobs SET status = 'queued', owner = ?, lease_until = ?, updated_at = ?
+                   WHERE status IN (?, ?) AND (owner IS NULL OR (owner <> ? AND coalesce(lease_until, 0) < ?))
+                   RETURNING id, created_at""",
+                (owner, now + lease_seconds, _now(), *PENDING_STATUSES, owner, now),
+            ).fetchall()
+            self.conn.commit()
+        return [job_id for job_id, _ in sorted(rows, key=lambda r: r[1])]
+
+    def renew(self, owner: str, lease_seconds: float) -> None:
+        with self.lock:
+            self.conn.execute(
+                "UPDATE jobs SET lease_until = ? WHERE owner = ? AND status IN (?, ?)",
+                (time.time() + lease_seconds, owner, *PENDING_STATUSES),
+            )
+            self.conn.commit()
+
+    def release(self, owner: str) -> None:
+        with self.lock:
+            self.conn.execute(
+                "UPDATE jobs SET lease_until = 0 WHERE owner = ? AND status IN (?, ?)",
+                (owner, *PENDING_STATUSES),
+            )
+            self.conn.commit()
+
+    def release_job(self, job_id: str, owner: str) -> None:
+        # no owner: the next adopt() in any process, this one included, picks it up
+        with self.lock:
+            self.conn.execute(
+                "UPDATE jobs SET owner = NULL, lease_until = 0 WHERE id = ? AND owner = ? AND status IN (?, ?)",
+                (job_id, owner, *PENDING_STATUSES),
+            )
+            self.conn.commit()
+
+    def prune(self, finished_before: str) -> int:
+        with self.lock:
+            cursor = self.conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (*FINISHED_STATUSES, finished_before),
+            )
+            self.conn.commit()
+        return cursor.rowcount
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
+
+
+def make_job_store():
+    kind = os.environ.get("JOB_STORE", "sqlite")
+    if kind == "memory":
+        return MemoryJobStore()
+    if kind == "sqlite":
+        return SQLiteJobStore(os.environ.get("JOB_DB_PATH", "jobs.sqlite3"))
+    raise ValueError(f"Unknown JOB_STORE: {kind}")
+
+
+###########################     Queue and workers       ###########################
+
+class JobQueue:
+    def __init__(self, store=None, concurrency: Optional[int] = None):
+        self.store = store
+        self.concurrency = concurrency
+        self.handlers: Dict[str, Callable[[dict], Awaitable[Any]]] = {}
+        self.queue: Optional[asyncio.Queue] = None
+        self.workers: List[asyncio.Task] = []
+        self.listeners: Dict[str, List[asyncio.Queue]] = {}
+        # this process, as the owner of the jobs it leases
+        self.owner = str(uuid.uuid4())
+        self.lease_seconds = 60.0
+        self.retention_seconds = 86400.0
+        self.lease_task: Optional[asyncio.Task] = None
+        self.webhooks: Set[asyncio.Task] = set()
+
+    def register(self, kind: str, handler: Callable[[dict], Awaitable[Any]]) -> None:
+        self.handlers[kind] = handler
+
+    async def start(self) -> None:
+        if self.store is None:
+            self.store = make_job_store()
+        concurrency = self.concurrency or int(os.environ.get("JOB_WORKERS", "4"))
+        self.lease_seconds = float(os.environ.get("JOB_LEASE_SECONDS", "60"))
+        self.retention_seconds = float(os.environ.get("JOB_RETENTION_SECONDS", "86400"))
+        self.queue = asyncio.Queue()
+
+        # resume anything a stopped process didn't finish (but not jobs another live process holds)
+        await self._adopt()
+
+        self.workers = [asyncio.create_task(self._worker()) for _ in range(concurrency)]
+        self.lease_task = asyncio.create_task(self._keep_leases())
+
+    async def stop(self) -> None:
+        if self.lease_task:
+            self.lease_task.cancel()
+        # a handler can swallow the cancellation (asyncio.wait_for on Python 3.11 does when its
+        # inner call finishes at the same moment), leaving the worker back on queue.get(),
+        # so keep cancelling until every worker has exited
+        while self.workers:
+            for worker in self.workers:
+                worker.cancel()
+            _, pending = await asyncio.wait(self.workers, timeout=1)
+            self.workers = list(pending)
+        for webhook in self.webhooks:
+            webhook.cancel()
+        # unfinished jobs can be taken over straight away instead of when the lease runs out
+        await self._call("release", self.owner)
+        await self._call("close")
+
+    async def _call(self, method: str, *args, **kwargs):
+        # sqlite calls block (and can wait on another process's write lock), so keep them
+        # off the event loop
+        if self.store.blocking:
+            return await asyncio.to_thread(getattr(self.store, method), *args, **kwargs)
+        return getattr(self.store, method)(*args, **kwargs)
+
+    async def _adopt(self) -> None:
+        for job_id in await self._call("adopt", self.owner, self.lease_seconds):
+            print(f"Requeueing job {job_id}")
+            self.queue.put_nowait(job_id)
+
+    async def _keep_leases(self) -> None:
+        # renew this process's leases, pick up jobs from processes that stopped renewing,
+        # and delete finished jobs past their retention
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                await self._call("renew", self.owner, self.lease_seconds)
+                await self._adopt()
+                cutoff = datetime.fromtimestamp(time.time() - self.retention_seconds, timezone.utc)
+                await self._call("prune", cutoff.isoformat())
+            except Exception as e:
+                print(f"Could not renew job leases: {e!r}")
+
+    async def submit(self, kind: str, user_id: str, payload: dict, webhook_url: Optional[str] = None) -> dict:
+        if kind not in self.handlers:
+            raise ValueError(f"No handler registered for job kind {kind}")
+
+        now = _now()
+        job = {
+            "id": str(uuid.uuid4()),
+            "kind": kind,
+            "user_id": user_id,
+            "payload": payload,
+            "status": "queued",
+            "result": None,
+            "error": None,
+            "webhook_url": webhook_url,
+            "created_at": now,
+            "updated_at": now,
+            "owner": self.owner,
+            "lease_until": time.time() + self.lease_seconds,
+        }
+        await self._call("add", job)
+        self.queue.put_nowait(job["id"])
+        return job
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        return await self._call("get", job_id)
+
+    def subscribe(self, job_id: str) -> asyncio.Queue:
+        listener: asyncio.Queue = asyncio.Queue()
+        self.listeners.setdefault(job_id, []).append(listener)
+        return listener
+
+    def unsubscribe(self, job_id: str, listener: asyncio.Queue) -> None:
+        listeners = self.listeners.get(job_id, [])
+        if listener in listeners:
+            listeners.remove(listener)
+        if not listeners:
+            self.listeners.pop(job_id, None)
+
+    async def _set_status(self, job_id: str, **fields) -> None:
+        await self._call("update", job_id, **fields)
+        self._notify(job_id, fields["status"])
+
+    def _notify(self, job_id: str, status: str) -> None:
+        for listener in self.listeners.get(job_id, []):
+            listener.put_nowait(status)
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self.queue.get()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                # shutting down: leave the job as running so the next start requeues it
+                raise
+            except Exception as e:
+                # the job store failed, not the job (the handler's errors are recorded in _run)
+                print(f"Job {job_id} interrupted by a job store error: {e!r}")
+                await self._release(job_id)
+
+    async def _run(self, job_id: str) -> None:
+        # finished, or taken over by another process
+        if not await self._call("claim", job_id, self.owner, self.lease_seconds):
+            return
+        job = await self._call("get", job_id)
+
+        self._notify(job_id, "running")
+        try:
+            result = await self.handlers[job["kind"]](job)
+            fields = {"status": "done", "result": result}
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Job {job_id} failed: {e!r}")
+            # HTTPException details are written for clients; anything else stays in the log
+            fields = {"status": "failed", "error": str(getattr(e, "detail", "Job failed"))}
+        await self._set_status(job_id, **fields)
+
+        if job.get("webhook_url"):
+            # sent from its own task, so a slow receiver doesn't hold up the next job
+            webhook = asyncio.create_task(self._send_webhook(job_id))
+            self.webhooks.add(webhook)
+            webhook.add_done_callback(self.webhooks.discard)
+
+    async def _release(self, job_id: str) -> None:
+        try:
+            await self._call("release_job", job_id, self.owner)
+        except Exception as e:
+            # still leased to this process, so it won't be adopted; retry it here later
+            print(f"Could not release job {job_id}: {e!r}")
+            asyncio.get_running_loop().call_later(self.lease_seconds / 3, self.queue.put_nowait, job_id)
+
+    async def _send_webhook(self, job_id: str) -> None:
+        try:
+            job = await self._call("get", job_id)
+        except Exception as e:
+            print(f"Webhook for job {job_id} failed: {e!r}")
+            return
+        await send_webhook(job)
+
+
+def webhook_allowed(url: Optional[str]) -> bool:
+    if not url:
+        return False
+    allowed = {h.strip() for h in os.environ.get("JOB_WEBHOOK_HOSTS", "").split(",") if h.strip()}
+    parsed = urlparse(url)
+    return parsed.scheme in ("http", "https") and parsed.hostname in allowed
+
+
+async def send_webhook(job: dict) -> None:
+    if not webhook_allowed(job.get("webhook_url")):
+        return
+    try:
+        async with httpx.AsyncClient(timeout=10) as client:
+            await client.post(job["webhook_url"], json=public_job(job, include_result=True))
+    except Exception as e:
+        print(f"Webhook for job {job['id']} failed: {e}")
+
+
+def public_job(job: dict, include_result: bool = False) -> dict:
+    data = {
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
+    if include_result:
+        data["result"] = job["result"]
+    return data
+
+
+job_queue = JobQueue()
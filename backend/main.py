@@ -1,42 +1,88 @@
 import os
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Optional
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 
-from supabase_client import supabase
+from store import get_store, close_store
+from providers import get_llm, get_spotify, close_providers
 from spotify import router as spotify_router
 from recommendation import router as recommendation_router
 from routes.practice_plan import router as practice_plan_router
+from routes.jobs import router as jobs_router
+from jobs import job_queue
+from serialization import FastJSONResponse, CompressionMiddleware
 
 from dotenv import load_dotenv
 
-load_dotenv()
+# Nothing here talks to Supabase, OpenAI or Spotify at import time. The shared clients
+# are created on first use (see store.py / providers.py) and closed when the app shuts
+# down, so workers start fast. Run with `uvicorn main:app` or `uvicorn main:create_app --factory`.
 
-app = FastAPI()
 
-FRONTEND_URL = os.environ["FRONTEND_URL"]
+async def warm_up() -> None:
+    # build the shared clients before the first request instead of during it
+    get_store()
+    get_llm()
+    get_spotify()
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=[FRONTEND_URL],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 
-app.include_router(recommendation_router)
-app.include_router(spotify_router)
-app.include_router(practice_plan_router)
+def create_app(warmup: Optional[Callable[[], Awaitable[None]]] = None) -> FastAPI:
+    load_dotenv()
+
+    if warmup is None and os.environ.get("WARMUP") == "1":
+        warmup = warm_up
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        if warmup:
+            await warmup()
+        # background workers for queued generations (see jobs.py)
+        await job_queue.start()
+        yield
+        await job_queue.stop()
+        await close_providers()
+        await close_store()
+
+    # orjson for every response; plans/completions/recommendations also skip jsonable_encoder
+    app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
+
+    # gzip (or brotli when installed) for responses over COMPRESS_MIN_BYTES
+    app.add_middleware(CompressionMiddleware, minimum_size=int(os.environ.get("COMPRESS_MIN_BYTES", "1024")))
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=[os.environ["FRONTEND_URL"]],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    app.include_router(recommendation_router)
+    app.include_router(spotify_router)
+    app.include_router(practice_plan_router)
+    app.include_router(jobs_router)
+
+    app.get("/api/health")(health_check)
+    app.get("/api/me")(get_current_user)
+
+    return app
+
 
-@app.get("/api/health")
 def health_check():
     return {"status": "ok"}
 
-@app.get("/api/me")
 async def get_current_user(request: Request):
     token = request.headers.get("authorization", "").replace("Bearer ", "")
     if not token:
         raise HTTPException(status_code=401, detail="Missing token")
-    user = supabase.auth.get_user(token)
+    try:
+        user = await get_store().get_user(token)
+    except Exception:
+        raise HTTPException(status_code=401, detail="Unauthorized")
     if not user:
         raise HTTPException(status_code=401, detail="Unauthorized")
     return user
+
+
+app = create_app()
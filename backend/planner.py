@@ -0,0 +1,283 @@
+from typing import Dict, List, Optional
+
+# Deterministic weekly practice plan builder.
+# Lays out the week (day order, daily focus, which techniques to drill, and exactly how
+# minutes_per_day is split across tasks) from the questionnaire answers, without an LLM.
+# The practice plan route uses it three ways (PLANNER_MODE / PracticePlanRequest.mode):
+#   local  - return this plan as is (milliseconds, works offline)
+#   hybrid - build this skeleton, then one small LLM call rewrites the song-specific text
+#   llm    - the original full generation, with this plan as the fallback if the LLM fails
+
+WEEK = ["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
+
+# target tempo for milestones, by the song's difficulty
+TEMPO = {"beginner": 60, "intermediate": 80, "advanced": 100}
+
+# the arc of the week: what the song block of each day works on
+SONG_ARC = [
+    {"focus": "Map out {song} and learn the main chords or riff", "section": "main chords and riff"},
+    {"focus": "Learn the verse of {song}", "section": "verse"},
+    {"focus": "Learn the chorus of {song}", "section": "chorus"},
+    {"focus": "Connect verse and chorus, clean up transitions", "section": "verse-to-chorus transition"},
+    {"focus": "Learn the bridge or solo section of {song}", "section": "bridge / solo"},
+    {"focus": "Slow full play-through of {song}", "section": "whole song"},
+    {"focus": "Play {song} through at target tempo", "section": "whole song"},
+]
+
+# technique name (as in the questionnaire) -> drill
+TECHNIQUES: Dict[str, Dict[str, str]] = {
+    "Palm muting": {
+        "instructions": "Rest the side of your picking hand on the strings by the bridge. Play steady eighth notes on a power chord, alternating 4 muted and 4 open strums.",
+        "why": "Palm muting controls sustain and gives the chugging rhythm many rock parts rely on.",
+    },
+    "Hammer-ons": {
+        "instructions": "On each string, pick a fretted note and hammer onto the note two frets higher without picking. Go slowly and keep both notes the same volume.",
+        "why": "Hammer-ons make fast phrases smoother and are common in riffs and fills.",
+    },
+    "Pull-offs": {
+        "instructions": "Fret two notes on one string, pick the higher one and pull the finger off slightly downward to sound the lower note. Repeat across all strings.",
+        "why": "Pull-offs let you play legato lines without picking every note.",
+    },
+    "Slides": {
+        "instructions": "Pick a note and slide it up two frets keeping pressure on the string, then slide back. Aim to land exactly on the target fret.",
+        "why": "Slides connect positions on the neck and add expression to melodies.",
+    },
+    "Bends": {
+        "instructions": "Play the target note first, then bend from two frets below up to it using three fingers. Check the pitch against the target note each time.",
+        "why": "In-tune bends are essential for lead lines and solos.",
+    },
+    "Vibrato": {
+        "instructions": "Hold a note and rock the string up and down slightly in an even rhythm. Try slow and then faster vibrato on each finger.",
+        "why": "Vibrato makes sustained notes sing and is a big part of a player's sound.",
+    },
+    "Tapping": {
+        "instructions": "Fret a note with your fretting hand, tap a note 5 frets higher with a picking-hand finger and pull off. Keep a steady triplet rhythm.",
+        "why": "Tapping reaches wide intervals quickly and is used in many lead parts.",
+    },
+}
+
+# technical skill (as in the questionnaire) -> drill for the day's warm-up
+SKILL_WARMUPS: Dict[str, Dict[str, str]] = {
+    "Open chords": {
+        "title": "Open chord changes",
+        "technique": "chord changes",
+        "instructions": "Pick two open chords from the song and switch between them for one minute, counting clean changes. Repeat with another pair.",
+        "why": "Fast, clean changes are what make a song flow instead of stopping between chords.",
+    },
+    "Barre chords": {
+        "title": "Barre chord strength",
+        "technique": "barre chords",
+        "instructions": "Hold an F or Bm barre shape, pick each string one at a time, and adjust until every note rings. Release and re-grip 10 times.",
+        "why": "Builds the grip and placement barre chords need to sound clean.",
+    },
+    "Power chords": {
+        "title": "Power chord shifts",
+        "technique": "power chords",
+        "instructions": "Move a power chord shape up and down the low E and A strings in time with a metronome, shifting every beat.",
+        "why": "Quick, accurate shifts are the core of most rock rhythm parts.",
+    },
+    "Basic strumming": {
+        "title": "Strumming pattern",
+        "technique": "strumming",
+        "instructions": "Strum down-down-up-up-down-up on one chord with a metronome, keeping your arm moving even on the missed strums.",
+        "why": "A steady strumming hand keeps time for the whole song.",
+    },
+    "Fingerpicking": {
+        "title": "Fingerpicking pattern",
+        "technique": "fingerpicking",
+        "instructions": "Thumb on the bass string, then index, middle, ring on the top three strings. Play the pattern over each chord of the song.",
+        "why": "Independent fingers let you play bass and melody at the same time.",
+    },
+}
+
+DEFAULT_WARMUP = {
+    "title": "Chromatic warm-up",
+    "technique": "finger dexterity",
+    "instructions": "Play frets 1-2-3-4 on each string with one finger per fret, up and back down, with a metronome.",
+    "why": "Warms up both hands and builds the finger independence every song needs.",
+}
+
+GOAL_FINALE = {
+    "Performing or recording": "Record a full take of {song} and listen back for mistakes.",
+    "Playing confidently with others": "Play {song} along with the original recording without stopping.",
+    "Becoming an advanced player": "Play {song} through at full tempo with every technique clean.",
+    "Playing songs for fun": "Play {song} from start to finish for fun, without stopping for mistakes.",
+}
+
+
+def profile_from_answers(answers: dict) -> dict:
+    # the questionnaire saves technical_skills / preference; older rows used other keys
+    return {
+        "techniques": answers.get("techniques") or {},
+        "technical_skills": answers.get("technical_skills") or answers.get("technical skills") or [],
+        "play_style": answers.get("preference") or answers.get("play_style") or [],
+        "goal": answers.get("goal") or "",
+    }
+
+
+def allocate(minutes: int, weights: List[float]) -> List[int]:
+    # split minutes across tasks in proportion to weights; always sums to exactly `minutes`
+    total = sum(weights)
+    shares = [minutes * w / total for w in weights]
+    result = [int(s) for s in shares]
+    leftovers = sorted(range(len(shares)), key=lambda i: (result[i] - shares[i], i))
+    for i in leftovers[:minutes - sum(result)]:
+        result[i] += 1
+    return result
+
+
+def task_weights(minutes: int) -> List[float]:
+    # warm-up / technique drill / song work, with more song blocks on longer days
+    if minutes <= 15:
+        return [1, 1, 2]
+    if minutes <= 30:
+        return [1, 2, 3]
+    return [1, 2, 3, 2]
+
+
+def weak_techniques(techniques: Dict[str, int], count: int = 3) -> List[str]:
+    # lowest rated first, so the week spends time where the player is weakest
+    rated = [(int(r or 0), name) for name, r in techniques.items() if name in TECHNIQUES]
+    rated.sort()
+    picked = [name for _, name in rated[:count]]
+    return picked or ["Hammer-ons", "Slides", "Bends"][:count]
+
+
+def match_skill(skills: List[str]) -> List[Dict[str, str]]:
+    # questionnaire options are like "Open chords (C, G, D, A, E, Am, etc.)"
+    warmups = []
+    for skill in skills:
+        for name, drill in SKILL_WARMUPS.items():
+            if skill.lower().startswith(name.lower()) and drill not in warmups:
+                warmups.append(drill)
+    return warmups or [DEFAULT_WARMUP]
+
+
+def build_plan(
+    song_title: str,
+    artist: str,
+    skill_level: str,
+    minutes_per_day: int,
+    start_day: str,
+    answers: Optional[dict] = None,
+) -> dict:
+    profile = profile_from_answers(answers or {})
+    tempo = TEMPO.get(skill_level, 60)
+    techniques = weak_techniques(profile["techniques"])
+    warmups = match_skill(profile["technical_skills"])
+    first = WEEK.index(start_day) if start_day in WEEK else 0
+
+    # whole 5-minute blocks when the day allows it, otherwise single minutes
+    step = 5 if minutes_per_day % 5 == 0 else 1
+    durations = [d * step for d in allocate(minutes_per_day // step, task_weights(minutes_per_day))]
+
+    days = []
+    for offset in range(7):
+        arc = SONG_ARC[offset]
+        technique = techniques[offset % len(techniques)]
+        warmup = warmups[offset % len(warmups)]
+        section = arc["section"]
+        # tempo builds up over the week towards the song's target
+        day_tempo = tempo - 20 + round(20 * offset / 6)
+
+        tasks = [
+            {
+                "title": warmup["title"],
+                "technique": warmup["technique"],
+                "instructions": warmup["instructions"],
+                "why": warmup["why"],
+                "milestone": f"3 clean repetitions at {day_tempo} BPM.",
+            },
+            {
+                "title": f"{technique} drill",
+                "technique": technique.lower(),
+                "instructions": TECHNIQUES[technique]["instructions"],
+                "why": TECHNIQUES[technique]["why"],
+                "milestone": f"10 clean {technique.lower()} in a row at {day_tempo} BPM.",
+            },
+            {
+                "title": f"{section.capitalize()} of {song_title}",
+                "technique": section,
+                "instructions": f"Loop the {section} of {song_title} at {day_tempo} BPM. Play it slowly, fix any mistakes, then play it 3 times without stopping.",
+                "why": f"Breaking {song_title} into sections makes the whole song manageable.",
+                "milestone": f"Play the {section} cleanly 3x in a row at {day_tempo} BPM.",
+            },
+        ]
+        if len(durations) == 4:
+            finale = GOAL_FINALE.get(profile["goal"], "Play {song} from the top as far as you can.")
+            tasks.append({
+                "title": "Play-through",
+                "technique": "playing along",
+                "instructions": finale.format(song=song_title),
+                "why": "Putting the sections together builds stamina and shows what still needs work.",
+                "milestone": "Get one step further through the song without stopping than yesterday.",
+            })
+
+        for task, minutes in zip(tasks, durations):
+            task["duration_minutes"] = minutes
+
+        days.append({
+            "day": WEEK[(first + offset) % 7],
+            "focus": arc["focus"].format(song=song_title),
+            "tasks": [
+                {k: t[k] for k in ("title", "duration_minutes", "technique", "instructions", "why", "milestone")}
+                for t in tasks
+            ],
+        })
+
+    return {
+        "song_title": song_title,
+        "artist": artist,
+        "skill_level": skill_level,
+        "weekly_goal": {
+            "description": f"Play {song_title} by {artist} from start to finish at {tempo} BPM.",
+            "milestones": [
+                f"Main chords and riff of {song_title} clean at {tempo - 20} BPM",
+                f"Verse and chorus connected at {tempo - 10} BPM",
+                f"Full song at {tempo} BPM",
+            ],
+        },
+        "days": days,
+    }
+
+
+# fields the LLM may rewrite in hybrid mode; structure and durations stay as planned
+TEXT_FIELDS = ("instructions", "why", "milestone")
+
+
+def skeleton_for_llm(plan: dict) -> dict:
+    return {
+        "song_title": plan["song_title"],
+        "artist": plan["artist"],
+        "skill_level": plan["skill_level"],
+        "days": [
+            {
+                "day": d["day"],
+                "focus": d["focus"],
+                "tasks": [{"title": t["title"], "technique": t["technique"], "duration_minutes": t["duration_minutes"]}
+                          for t in d["tasks"]],
+            }
+            for d in plan["days"]
+        ],
+    }
+
+
+def merge_text(plan: dict, filled: dict) -> dict:
+    # copy the model's song-specific text onto the planned structure, ignoring anything malformed
+    if isinstance(filled.get("weekly_goal"), dict):
+        goal = filled["weekly_goal"]
+        if isinstance(goal.get("description"), str):
+            plan["weekly_goal"]["description"] = goal["description"]
+        if isinstance(goal.get("milestones"), list) and all(isinstance(m, str) for m in goal["milestones"]):
+            plan["weekly_goal"]["milestones"] = goal["milestones"]
+
+    for day, filled_day in zip(plan["days"], filled.get("days") or []):
+        if not isinstance(filled_day, dict):
+            continue
+        for task, filled_task in zip(day["tasks"], filled_day.get("tasks") or []):
+            if not isinstance(filled_task, dict):
+                continue
+            for field in TEXT_FIELDS:
+                if isinstance(filled_task.get(field), str) and filled_task[field].strip():
+                    task[field] = filled_task[field]
+    return plan
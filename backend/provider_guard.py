@@ -0,0 +1,259 @@
+import os
+import time
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+from providers import LLMProvider
+
+# Keeps a slow or failing LLM provider from taking the API down with it.
+#
+# get_llm() returns the provider wrapped in GuardedLLM, which
+#   - caps concurrent calls (LLM_MAX_CONCURRENCY) and sheds calls beyond a short wait
+#     queue (LLM_MAX_WAITING) instead of piling them up,
+#   - gives every call a timeout (LLM_CALL_TIMEOUT_SECONDS),
+#   - feeds each outcome to a circuit breaker that opens when too many recent calls
+#     failed or were slow. While open, calls fail immediately; after OPEN_SECONDS a
+#     single probe call decides whether to close it again.
+#     Each endpoint has its own breaker and its own idea of slow, so long practice plan
+#     calls can't open the breaker the song routes depend on (and the other way round).
+# Routes also give their whole operation a deadline budget (within_budget) and
+# catch ProviderUnavailable to serve a fallback: spare or recent songs for the
+# recommendation routes, the local planner for practice plans.
+
+T = TypeVar("T")
+
+# seconds each endpoint may spend on LLM work, including duplicate retries
+DEADLINES = {
+    "generate-song": 20,
+    "generate-similar": 20,
+    "practice-plan": 30,
+    "regenerate": 20,
+}
+
+# circuit breaker
+WINDOW_SIZE = 20            # recent calls considered
+MIN_CALLS = 5               # don't judge on fewer calls than this
+ERROR_THRESHOLD = 0.5       # open when this share of the window failed...
+SLOW_CALL_SECONDS = 10
+SLOW_THRESHOLD = 0.5        # ...or was slower than its endpoint's slow call seconds
+OPEN_SECONDS = 30
+
+# seconds after which an endpoint's call counts as slow (SLOW_CALL_SECONDS otherwise);
+# plan calls write a whole week and routinely take longer than a song
+ENDPOINT_SLOW_CALL_SECONDS = {
+    "generate-song": 10,
+    "generate-similar": 10,
+    "practice-plan": 25,
+    "regenerate": 15,
+}
+
+# endpoint whose budget the current call runs in (set by within_budget)
+current_endpoint: ContextVar[str] = ContextVar("current_endpoint", default="other")
+
+stats = {
+    "calls": 0,
+    "failures": 0,
+    "timeouts": 0,
+    "rejected_open": 0,
+    "shed": 0,
+    "deadline_exceeded": 0,
+    "fallbacks": 0,
+    "breaker_opened": 0,
+}
+
+
+class ProviderUnavailable(Exception):
+    # the LLM can't be used for this request right now; serve a fallback or a 503
+    pass
+
+
+class CircuitOpenError(ProviderUnavailable):
+    pass
+
+
+class LoadShedError(ProviderUnavailable):
+    pass
+
+
+class CallTimeout(ProviderUnavailable):
+    pass
+
+
+class ProviderError(ProviderUnavailable):
+    pass
+
+
+class DeadlineExceeded(ProviderUnavailable):
+    pass
+
+
+###########################     Circuit breaker       ###########################
+
+class CircuitBreaker:
+    def __init__(self, window_size: int = WINDOW_SIZE, min_calls: int = MIN_CALLS,
+                 error_threshold: float = ERROR_THRESHOLD, slow_call_seconds: float = SLOW_CALL_SECONDS,
+                 slow_threshold: float = SLOW_THRESHOLD, open_seconds: float = OPEN_SECONDS, name: str = "llm"):
+        self.name = name
+        self.window: Deque[Tuple[bool, float]] = deque(maxlen=window_size)
+        self.min_calls = min_calls
+        self.error_threshold = error_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_threshold = slow_threshold
+        self.open_seconds = open_seconds
+        self.state = "closed"
+        self.opened_at = 0.0
+        self.probing = False
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.open_seconds:
+            self.state = "half_open"
+        # half open: one probe at a time
+        if self.state == "half_open" and not self.probing:
+            self.probing = True
+            return True
+        return False
+
+    def record(self, ok: bool, seconds: float) -> None:
+        if self.state == "half_open":
+            self.probing = False
+            if ok and seconds < self.slow_call_seconds:
+                self.state = "closed"
+                self.window.clear()
+            else:
+                self._open()
+            return
+
+        self.window.append((ok, seconds))
+        if len(self.window) < self.min_calls:
+            return
+        failed = sum(1 for ok, _ in self.window if not ok) / len(self.window)
+        slow = sum(1 for _, s in self.window if s >= self.slow_call_seconds) / len(self.window)
+        if failed >= self.error_threshold or slow >= self.slow_threshold:
+            self._open()
+
+    def _open(self) -> None:
+        if self.state != "open":
+            stats["breaker_opened"] += 1
+            print(f"LLM circuit breaker ({self.name}) opened for {self.open_seconds}s")
+        self.state = "open"
+        self.opened_at = time.monotonic()
+        self.window.clear()
+
+
+###########################     Guarded provider       ###########################
+
+class GuardedLLM(LLMProvider):
+    def __init__(self, inner: LLMProvider, max_concurrency: int = 16, max_waiting: int = 32, call_timeout: float = 30):
+        self.inner = inner
+        # endpoint -> its breaker, created on the endpoint's first call
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.max_concurrency = max_concurrency
+        self.max_waiting = max_waiting
+        self.call_timeout = call_timeout
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.waiting = 0
+        self.in_flight = 0
+
+    @classmethod
+    def from_env(cls, inner: LLMProvider) -> "GuardedLLM":
+        return cls(
+            inner,
+            max_concurrency=int(os.environ.get("LLM_MAX_CONCURRENCY", "16")),
+            max_waiting=int(os.environ.get("LLM_MAX_WAITING", "32")),
+            call_timeout=float(os.environ.get("LLM_CALL_TIMEOUT_SECONDS", "30")),
+        )
+
+    def breaker_for(self, endpoint: str) -> CircuitBreaker:
+        breaker = self.breakers.get(endpoint)
+        if breaker is None:
+            breaker = self.breakers[endpoint] = CircuitBreaker(
+                slow_call_seconds=ENDPOINT_SLOW_CALL_SECONDS.get(endpoint, SLOW_CALL_SECONDS),
+                open_seconds=OPEN_SECONDS,
+                name=endpoint,
+            )
+        return breaker
+
+    @asynccontextmanager
+    async def _slot(self):
+        breaker = self.breaker_for(current_endpoint.get())
+        if not breaker.allow():
+            stats["rejected_open"] += 1
+            raise CircuitOpenError(f"LLM circuit breaker for {breaker.name} is open")
+        if self.semaphore.locked() and self.waiting >= self.max_waiting:
+            stats["shed"] += 1
+            breaker.probing = False
+            raise LoadShedError("Too many LLM calls waiting")
+
+        self.waiting += 1
+        try:
+            await self.semaphore.acquire()
+        except BaseException:
+            breaker.probing = False
+            raise
+        finally:
+            self.waiting -= 1
+
+        stats["calls"] += 1
+        self.in_flight += 1
+        start = time.monotonic()
+        ok = False
+        try:
+            yield
+            ok = True
+        except Exception:
+            stats["failures"] += 1
+            raise
+        finally:
+            # cancelled calls (a route's deadline ran out) count as failures too
+            breaker.record(ok, time.monotonic() - start)
+            self.in_flight -= 1
+            self.semaphore.release()
+
+    async def complete(self, messages, temperature=None, max_tokens=None, n=1):
+        async with self._slot():
+            try:
+                return await asyncio.wait_for(
+                    self.inner.complete(messages, temperature=temperature, max_tokens=max_tokens, n=n),
+                    self.call_timeout,
+                )
+            except asyncio.TimeoutError:
+                stats["timeouts"] += 1
+                raise CallTimeout(f"LLM call took longer than {self.call_timeout}s")
+            except Exception as e:
+                raise ProviderError(f"LLM call failed: {e!r}") from e
+
+    async def stream(self, messages, temperature=None, max_tokens=None):
+        async with self._slot():
+            try:
+                async for chunk in self.inner.stream(messages, temperature=temperature, max_tokens=max_tokens):
+                    yield chunk
+            except Exception as e:
+                raise ProviderError(f"LLM stream failed: {e!r}") from e
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+async def within_budget(endpoint: str, fn: Callable[[], Awaitable[T]]) -> T:
+    # LLM calls made inside fn (including tasks it starts) use the endpoint's breaker
+    token = current_endpoint.set(endpoint)
+    try:
+        return await asyncio.wait_for(fn(), DEADLINES[endpoint])
+    except asyncio.TimeoutError:
+        stats["deadline_exceeded"] += 1
+        raise DeadlineExceeded(f"{endpoint} ran past its {DEADLINES[endpoint]}s budget")
+    finally:
+        current_endpoint.reset(token)
+
+
+def get_stats(llm: Optional[LLMProvider] = None) -> dict:
+    data = dict(stats)
+    if isinstance(llm, GuardedLLM):
+        data.update(breakers={name: b.state for name, b in llm.breakers.items()},
+                    in_flight=llm.in_flight, waiting=llm.waiting)
+    return data
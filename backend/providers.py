@@ -0,0 +1,166 @@
+import os
+from typing import AsyncIterator, Dict, List, Optional
+
+import httpx
+
+# External services behind small interfaces so they can be swapped for local fakes
+# (see fakes.py) in development, benchmarks and load tests.
+#   LLM_PROVIDER     = openai | fake
+#   SPOTIFY_PROVIDER = spotify | fake
+# SPOTIFY_API_BASE / SPOTIFY_ACCOUNTS_BASE can also point the real client at a mock
+# server started with `uvicorn fakes:mock_spotify_app`.
+
+# Nothing is built at import time: each client is created on first use and shared
+# by every router, and main.create_app() closes them on shutdown.
+
+DEFAULT_MODEL = "gpt-4o-mini"
+
+
+###########################     LLM       ###########################
+
+class LLMProvider:
+    async def complete(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        n: int = 1,
+    ) -> List[str]:
+        # returns the text of n independent completions
+        raise NotImplementedError
+
+    async def stream(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+    ) -> AsyncIterator[str]:
+        # yields a single completion as text chunks
+        raise NotImplementedError
+        yield
+
+    async def aclose(self) -> None:
+        pass
+
+
+class OpenAIProvider(LLMProvider):
+    def __init__(self, api_key: Optional[str] = None, model: str = DEFAULT_MODEL):
+        from openai import AsyncOpenAI
+        self.client = AsyncOpenAI(api_key=api_key or os.environ.get("OPENAI_API_KEY"))
+        self.model = model
+
+    async def complete(self, messages, temperature=None, max_tokens=None, n=1):
+        kwargs = {"model": self.model, "messages": messages, "n": n}
+        if temperature is not None:
+            kwargs["temperature"] = temperature
+        if max_tokens is not None:
+            kwargs["max_tokens"] = max_tokens
+
+        response = await self.client.chat.completions.create(**kwargs)
+        return [(choice.message.content or "") for choice in response.choices]
+
+    async def stream(self, messages, temperature=None, max_tokens=None):
+        kwargs = {"model": self.model, "messages": messages, "stream": True}
+        if temperature is not None:
+            kwargs["temperature"] = temperature
+        if max_tokens is not None:
+            kwargs["max_tokens"] = max_tokens
+
+        response = await self.client.chat.completions.create(**kwargs)
+        async for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    async def aclose(self) -> None:
+        await self.client.close()
+
+
+###########################     Spotify       ###########################
+
+class SpotifyClient:
+    # one pooled http client for every Spotify call instead of a new connection per request
+
+    def __init__(self, api_base: str = "https://api.spotify.com/v1",
+                 accounts_base: str = "https://accounts.spotify.com",
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.api_base = api_base.rstrip("/")
+        self.accounts_base = accounts_base.rstrip("/")
+        self.http = httpx.AsyncClient(transport=transport, timeout=10)
+
+    async def api_get(self, path: str, spotify_token: str, params: Optional[dict] = None) -> httpx.Response:
+        return await self.http.get(
+            f"{self.api_base}{path}",
+            params=params,
+            headers={"Authorization": f"Bearer {spotify_token}"}
+        )
+
+    async def request_token(self, data: dict) -> httpx.Response:
+        return await self.http.post(
+            f"{self.accounts_base}/api/token",
+            data=data,
+            headers={"Content-Type": "application/x-www-form-urlencoded"}
+        )
+
+    def authorize_url(self, params: str) -> str:
+        return f"{self.accounts_base}/authorize?{params}"
+
+    async def aclose(self) -> None:
+        await self.http.aclose()
+
+
+###########################     Lazily created shared instances       ###########################
+
+_llm: Optional[LLMProvider] = None
+_spotify: Optional[SpotifyClient] = None
+
+
+def get_llm() -> LLMProvider:
+    global _llm
+    if _llm is None:
+        provider = os.environ.get("LLM_PROVIDER", "openai")
+        if provider == "fake":
+            from fakes import FakeLLMProvider
+            llm = FakeLLMProvider.from_env()
+        elif provider == "openai":
+            llm = OpenAIProvider()
+        else:
+            raise ValueError(f"Unknown LLM_PROVIDER: {provider}")
+
+        # circuit breaker, timeouts and load shedding (see provider_guard.py); LLM_GUARD=off to bypass
+        if os.environ.get("LLM_GUARD", "on") == "off":
+            _llm = llm
+        else:
+            from provider_guard import GuardedLLM
+            _llm = GuardedLLM.from_env(llm)
+    return _llm
+
+
+def get_spotify() -> SpotifyClient:
+    global _spotify
+    if _spotify is None:
+        provider = os.environ.get("SPOTIFY_PROVIDER", "spotify")
+        if provider == "fake":
+            from fakes import mock_spotify_app
+            # requests go straight to the mock app, no network or server needed
+            _spotify = SpotifyClient(
+                "http://mock-spotify/v1", "http://mock-spotify",
+                transport=httpx.ASGITransport(app=mock_spotify_app),
+            )
+        elif provider == "spotify":
+            _spotify = SpotifyClient(
+                os.environ.get("SPOTIFY_API_BASE", "https://api.spotify.com/v1"),
+                os.environ.get("SPOTIFY_ACCOUNTS_BASE", "https://accounts.spotify.com"),
+            )
+        else:
+            raise ValueError(f"Unknown SPOTIFY_PROVIDER: {provider}")
+    return _spotify
+
+
+async def close_providers() -> None:
+    global _llm, _spotify
+    if _llm is not None:
+        await _llm.aclose()
+        _llm = None
+    if _spotify is not None:
+        await _spotify.aclose()
+        _spotify = None
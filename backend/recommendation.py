@@ -1,17 +1,34 @@
-import os
 import json
-import httpx
-from openai import OpenAI
 from fastapi import APIRouter, Request, HTTPException
 from pydantic import BaseModel                          # pydantic models validate incoming json. fronted will send user's spotify data
                                                         #     with difficult preferences 
-from typing import List, Optional
-from supabase_client import supabase
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Set, Tuple
+from collections import deque
 from spotify import get_valid_spotify_token
+from store import get_store
+from providers import get_llm, get_spotify
+import seen_songs
+import singleflight
+import provider_guard
+import song_index
+from serialization import FastJSONResponse, SongRecommendation
 
 router = APIRouter(prefix="/api/recommendation")
 
-openai_client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+# how many times a song the user has already seen is regenerated before giving up
+MAX_DUPLICATE_RETRIES = 2
+
+# generate-similar can ask for several candidates in one call (n > 1). The first fresh
+# one is returned and the rest wait here for the user's next "another one" click.
+MAX_CANDIDATES = 4
+MAX_ALTERNATIVE_POOLS = 1000
+ready_alternatives: Dict[Tuple, List[dict]] = {}
+
+# recently generated songs by difficulty and by similar-request seed, for any user. When the
+# LLM is unavailable (provider_guard) a song from here that this user hasn't seen is served.
+MAX_RECENT_PER_KEY = 20
+MAX_RECENT_KEYS = 1000
+recent_songs: Dict[Tuple, Deque[dict]] = {}
 
 class RecommendationRequest(BaseModel):         
     top_tracks: List[dict]
@@ -26,6 +43,7 @@ class SimilarRequest(BaseModel):
     artist_name: Optional[str] = None
     current_difficulty: Optional[int] = 3
     previous_songs: Optional[List[str]] = []
+    candidates: Optional[int] = 1          # > 1 generates spare songs for instant follow-ups
 
 # main endpooint
 @router.post("/generate-song")
@@ -36,6 +54,11 @@ async def generate_recommendation(request: Request, body: RecommendationRequest)
 
     if not token:
         raise HTTPException(status_code=401, detail="Not Authenticate")
+
+    try:
+        user_id = await get_store().get_user_id(token)
+    except Exception:
+        raise HTTPException(status_code=401, detail="Invalid token")
     
     # 2. Build context strings from music data
     def format_track(track: dict) -> str:
@@ -48,6 +71,12 @@ async def generate_recommendation(request: Request, body: RecommendationRequest)
         genres = ', '.join(artist.get('genres', [])[:3])
         return f"- {name} (genres: {genres})"
 
+    # the user's Spotify data feeds the local similarity catalog (song_index.py)
+    index = song_index.get_index()
+    if index:
+        index.learn_artists(body.top_artists)
+        index.add_tracks(body.top_tracks)
+
     tracks_context = "\n".join(format_track(t) for t in body.top_tracks[:10])
     artists_context = "\n".join(format_artist(a) for a in body.top_artists[:10])
 
@@ -58,13 +87,13 @@ async def generate_recommendation(request: Request, body: RecommendationRequest)
     elif body.adjust_difficulty == "down" and target_difficulty > 1:
         target_difficulty -= 1
     
-    # build exclusion list
-    exclude_text = ""
-    if body.previous_songs:
-        exclude_text = f"\n\nDO NOT recommend these songs (they've already been suggested): {', '.join(body.previous_songs)}"
+    # 4. prompt, rebuilt with a longer exclusion list whenever the model repeats a song
+    def build_prompt(excluded: List[str]) -> str:
+        exclude_text = ""
+        if excluded:
+            exclude_text = f"\n\nDO NOT recommend these songs (they've already been suggested): {', '.join(excluded)}"
 
-    # 4. prompt
-    prompt = f"""You are a guitar teacher helping a student find songs to learn.
+        return f"""You are a guitar teacher helping a student find songs to learn.
 
         {exclude_text}
 
@@ -90,41 +119,32 @@ async def generate_recommendation(request: Request, body: RecommendationRequest)
             "artist": "Artist Name",
             "difficulty": {target_difficulty},
             "skills": ["tapping", "bar chords", "fast solo"].  /* get creative with these */
+            "genres": ["genre1", "genre2"],
              "description":  /* don't use the same format every time, every song is different */
         }} """
     
-    # 5. Call openai
+    # 5. Call openai, regenerating if the song was already recommended to this user.
+    #    Identical concurrent requests (double clicks) share one generation.
+    idempotency_key = request.headers.get("idempotency-key")
+    key = singleflight.request_key(user_id, "generate-song", body.model_dump(), idempotency_key)
+    recent_keys = [("difficulty", target_difficulty)]
     try:
-        response = openai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a guitar song expert. "},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.8,    # Higher --> more creative/varied
-            max_tokens=500      # Max output length
-        )
-
-        content = response.choices[0].message.content.strip()       # gets the first response, the actual text, and removes whitespace
-        # debug:
-        print(f"OpenAI response: {content}")
-        # Clean up if GPT wrapped it in markdown code blocks
-        if content.startswith("```"):
-            content = content.split("```")[1]
-            if content.startswith("json"):
-                content = content[4:]
-            content = content.strip()
-
-
-        recommentation = json.loads(content)
-
-        return recommentation
+        song = await provider_guard.within_budget("generate-song", lambda: singleflight.run(
+            key,
+            lambda: recommend_unseen(user_id, "You are a guitar song expert. ", build_prompt, body.previous_songs,
+                                     recent_keys=recent_keys),
+            remember=bool(idempotency_key),
+        ))
+        return FastJSONResponse(song)
+    except provider_guard.ProviderUnavailable as e:
+        print(f"LLM unavailable ({e!r}), serving a recent song")
+        return await fallback_response(user_id, recent_keys, body.previous_songs)
     except json.JSONDecodeError as e:
-        print(f"JSON parse error: {e}, content was: {content}")
+        print(f"JSON parse error: {e}")
         raise HTTPException(status_code=500, detail="Failed to parse AI response")
     except Exception as e:
-        print(f"Openai api error: {e}, content was: {content}")
-        raise HTTPException(status_code=500, detail=f"AI service error: {str(e)}")
+        print(f"Openai api error: {e!r}")
+        raise HTTPException(status_code=500, detail="AI service error")
     
 # Song generated by specific artist or other track
 @router.post("/generate-similar")
@@ -134,14 +154,20 @@ async def generate_similar(request: Request, body: SimilarRequest):
 
     if not token:
         raise HTTPException(status_code=401, detail="Not authenticated")
+
+    try:
+        user_id = await get_store().get_user_id(token)
+    except Exception:
+        raise HTTPException(status_code=401, detail="Invalid token")
     
-    exclude_text = ""
-    if body.previous_songs:
-        exclude_text = f"\n\nDO NOT recommend any of these songs (already suggested): {', '.join(body.previous_songs)}"
+    def build_prompt(excluded: List[str]) -> str:
+        exclude_text = ""
+        if excluded:
+            exclude_text = f"\n\nDO NOT recommend any of these songs (already suggested): {', '.join(excluded)}"
     
-    # Two different prompts for artists / songs
-    if body.type == "track":
-        prompt = f"""You are a guitar teacher helping a student find songs to learn.
+        # Two different prompts for artists / songs
+        if body.type == "track":
+            return f"""You are a guitar teacher helping a student find songs to learn.
         The student wants to learn a song similar to "{body.name}" by {body.artist_name}
 
         Recommend ONE guitar song that:
@@ -161,10 +187,11 @@ async def generate_similar(request: Request, body: SimilarRequest):
             "artist": "Artist Name",
             "difficulty": {body.current_difficulty},
             "skills": ["skill1", "skill2", "skill3"].  /* get creative with these */
+            "genres": ["genre1", "genre2"],
              "description":  /* don't use the same format every time, every song is different */
         }} """
-    else: # artist
-        prompt = f"""You are a guitar teacher helping a student find songs to learn.
+        else: # artist
+            return f"""You are a guitar teacher helping a student find songs to learn.
         The student loves {body.artist_name} and wants to learn one of their songs on guitar
 
         Recommend ONE guitar song that:
@@ -184,21 +211,87 @@ async def generate_similar(request: Request, body: SimilarRequest):
             "artist": "Artist Name",
             "difficulty": {body.current_difficulty},
             "skills": ["skill1", "skill2", "skill3"].  /* get creative with these */
+            "genres": ["genre1", "genre2"],
              "description":  /* don't use the same format every time, every song is different */
         }} """
-    # 5. Call openai
+    # 5. Call openai (or serve a spare candidate from the last call with the same request)
+    pool_key = (user_id, body.type, body.name, body.artist_name, body.current_difficulty)
+    idempotency_key = request.headers.get("idempotency-key")
+    key = singleflight.request_key(user_id, "generate-similar", body.model_dump(), idempotency_key)
+    recent_keys = [("similar",) + pool_key[1:], ("difficulty", body.current_difficulty)]
+    try:
+        song = await provider_guard.within_budget("generate-similar", lambda: singleflight.run(
+            key,
+            lambda: recommend_unseen(
+                user_id,
+                "You are a guitar song expert. Always respond with valid JSON only, no markdown code blocks",
+                build_prompt,
+                body.previous_songs,
+                candidates=max(1, min(body.candidates or 1, MAX_CANDIDATES)),
+                pool_key=pool_key,
+                recent_keys=recent_keys,
+                local=lambda exclude: find_in_index(body, exclude),
+            ),
+            remember=bool(idempotency_key),
+        ))
+        return FastJSONResponse(song)
+    except provider_guard.ProviderUnavailable as e:
+        print(f"LLM unavailable ({e!r}), serving a recent song")
+        return await fallback_response(user_id, recent_keys, body.previous_songs, pool_key)
+    except json.JSONDecodeError as e:
+        print(f"JSON parse error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to parse AI response")
+    except Exception as e:
+        print(f"Openai api error: {e!r}")
+        raise HTTPException(status_code=500, detail="AI service error")
+
+
+def find_in_index(body: SimilarRequest, exclude: Set[int]) -> Optional[dict]:
+    index = song_index.get_index()
+    if not index:
+        return None
+    return index.find_similar(body.type, body.name, body.artist_name, body.current_difficulty, exclude)
+
+
+# duplicate / wasted-call rates for the seen-song filter, and de-duplicated requests
+@router.get("/stats")
+async def recommendation_stats(request: Request):
+    auth_header = request.headers.get("authorization", "")
+    token = auth_header.replace("Bearer ", "")
+
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
     try:
-        response = openai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a guitar song expert. Always respond with valid JSON only, no markdown code blocks"},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.8,    # Higher --> more creative/varied
-            max_tokens=500
-        )
-
-        content = response.choices[0].message.content.strip()
+        await get_store().get_user_id(token)
+    except Exception:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    index = song_index.get_index()
+    return {
+        **seen_songs.get_stats(),
+        "singleflight": singleflight.stats,
+        "provider_guard": provider_guard.get_stats(get_llm()),
+        "song_index": index.get_stats() if index else None,
+    }
+
+
+async def request_songs(system_prompt: str, prompt: str, n: int = 1) -> List[dict]:
+    contents = await get_llm().complete(
+        [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.8,    # Higher --> more creative/varied
+        max_tokens=500,     # Max output length
+        n=n                 # independent samples from the same prompt
+    )
+    seen_songs.stats["llm_calls"] += 1
+
+    songs = []
+    error = None
+    for content in contents:
+        content = content.strip()       # the actual text, without whitespace
         # debug:
         print(f"OpenAI response: {content}")
         # Clean up if GPT wrapped it in markdown code blocks
@@ -208,16 +301,123 @@ async def generate_similar(request: Request, body: SimilarRequest):
                 content = content[4:]
             content = content.strip()
 
-
-        recommentation = json.loads(content)
-
-        return recommentation
-    except json.JSONDecodeError as e:
-        print(f"JSON parse error: {e}, content was: {content}")
-        raise HTTPException(status_code=500, detail="Failed to parse AI response")
-    except Exception as e:
-        print(f"Openai api error: {e}, content was: {content}")
-        raise HTTPException(status_code=500, detail=f"AI service error: {str(e)}")
+        try:
+            songs.append(json.loads(content))
+        except json.JSONDecodeError as e:
+            error = e
+
+    # only fail if none of the candidates were usable
+    if not songs:
+        if error is None:
+            raise HTTPException(status_code=500, detail="AI service returned no recommendation")
+        raise error
+    seen_songs.stats["generated"] += len(songs)
+
+    index = song_index.get_index()
+    if index:
+        index.add_songs(s for s in songs if isinstance(s, dict))
+    return songs
+
+
+# The prompt only *asks* the model to skip previous songs, so every result is checked
+# against the user's seen-set (plus the songs the frontend sent) and regenerated on a repeat.
+async def recommend_unseen(
+    user_id: str,
+    system_prompt: str,
+    build_prompt,
+    previous_songs: Optional[List[str]],
+    candidates: int = 1,
+    pool_key: Optional[Tuple] = None,
+    recent_keys: Sequence[Tuple] = (),
+    local: Optional[Callable[[Set[int]], Optional[dict]]] = None,
+) -> SongRecommendation:
+    seen = await seen_songs.load_seen(user_id)
+    excluded = list(previous_songs or [])
+    excluded_keys = {seen_songs.label_key(s) for s in excluded}
+
+    def is_fresh(song: dict) -> bool:
+        return not seen_songs.is_seen(user_id, song.get("name", ""), song.get("artist", ""), excluded_keys)
+
+    # spare candidates from an earlier call cost nothing to serve
+    pool = ready_alternatives.pop(pool_key, []) if pool_key else []
+    fresh = [s for s in pool if is_fresh(s)]
+    if fresh:
+        seen_songs.stats["alternatives_served"] += 1
+    # then a confident local answer (song_index), which also skips the call
+    elif local and (song := local(seen | excluded_keys)):
+        fresh = [song]
+        seen_songs.stats["index_served"] += 1
+    else:
+        for attempt in range(MAX_DUPLICATE_RETRIES + 1):
+            songs = await request_songs(system_prompt, build_prompt(excluded), n=candidates)
+
+            for song in songs:
+                name, artist = song.get("name", ""), song.get("artist", "")
+                if is_fresh(song):
+                    fresh.append(song)
+                else:
+                    seen_songs.stats["duplicates"] += 1
+                    print(f"Duplicate recommendation '{name}' by {artist} (attempt {attempt + 1})")
+                    excluded.append(f"{name} by {artist}")
+                # candidates from the same call can repeat each other too
+                excluded_keys.add(seen_songs.song_key(name, artist))
+
+            if fresh:
+                break
+            seen_songs.stats["wasted_calls"] += 1
+
+    if not fresh:
+        # out of retries, a repeat is still better than an error
+        fresh = songs[-1:]
+
+    song = fresh[0]
+    if pool_key and len(fresh) > 1:
+        if len(ready_alternatives) >= MAX_ALTERNATIVE_POOLS:
+            ready_alternatives.pop(next(iter(ready_alternatives)))
+        ready_alternatives[pool_key] = fresh[1:]
+
+    remember_recent(recent_keys, fresh)
+    await seen_songs.mark_seen(user_id, song.get("name", ""), song.get("artist", ""))
+    seen_songs.stats["recommendations"] += 1
+    return song
+
+
+def remember_recent(keys: Sequence[Tuple], songs: List[dict]) -> None:
+    for key in keys:
+        if key not in recent_songs:
+            if len(recent_songs) >= MAX_RECENT_KEYS:
+                recent_songs.pop(next(iter(recent_songs)))
+            recent_songs[key] = deque(maxlen=MAX_RECENT_PER_KEY)
+        recent_songs[key].extendleft(songs)
+
+
+# Degraded mode: a spare candidate or a recently generated song the user hasn't seen yet,
+# most specific key first. Marked with X-Degraded so the client can tell.
+async def fallback_response(
+    user_id: str,
+    recent_keys: Sequence[Tuple],
+    previous_songs: Optional[List[str]],
+    pool_key: Optional[Tuple] = None,
+):
+    await seen_songs.load_seen(user_id)
+    excluded_keys = {seen_songs.label_key(s) for s in previous_songs or []}
+
+    candidates = list(ready_alternatives.get(pool_key, [])) if pool_key else []
+    for key in recent_keys:
+        candidates.extend(recent_songs.get(key, []))
+
+    for song in candidates:
+        name, artist = song.get("name", ""), song.get("artist", "")
+        if not seen_songs.is_seen(user_id, name, artist, excluded_keys):
+            await seen_songs.mark_seen(user_id, name, artist)
+            provider_guard.stats["fallbacks"] += 1
+            return FastJSONResponse(song, headers={"X-Degraded": "cached"})
+
+    raise HTTPException(
+        status_code=503,
+        detail="Song recommendations are busy right now. Please try again in a moment.",
+        headers={"Retry-After": str(provider_guard.OPEN_SECONDS)},
+    )
 
         
 ## Outputs the album art and artist and gets a preview URL
@@ -230,8 +430,7 @@ async def search_spotify_for_song(request: Request, song_name: str, artist_name:
         raise HTTPException(status_code=401, detail="Not Authenticated")
     
     try:
-        user_response = supabase.auth.get_user(token)
-        user_id = user_response.user.id
+        user_id = await get_store().get_user_id(token)
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid token")
     
@@ -244,12 +443,9 @@ async def search_spotify_for_song(request: Request, song_name: str, artist_name:
     # search spotify for the song
     query = f"{song_name} {artist_name}"
 
-    async with httpx.AsyncClient() as http_client:          # open an http connection to receive a response
-        response = await http_client.get(
-            "https://api.spotify.com/v1/search",
-            params={"q": query, "type": "track", "limit": 5},
-            headers={"Authorization": f"Bearer {spotify_token}"}
-        )
+    response = await get_spotify().api_get(
+        "/search", spotify_token, params={"q": query, "type": "track", "limit": 5}
+    )
 
     if response.status_code != 200 :
         return {"found": False, "preview_url": None, "album_image": None, "spotify_id": None}
@@ -257,6 +453,10 @@ async def search_spotify_for_song(request: Request, song_name: str, artist_name:
     data = response.json()
     tracks = data.get("tracks", {}).get("items", [])
 
+    index = song_index.get_index()
+    if index:
+        index.add_tracks(tracks)
+
     if not tracks:
         return {"found": False, "preview_url": None, "album_image": None, "spootify_id": None}
     
@@ -0,0 +1,121 @@
+import json
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from store import get_store
+from serialization import FastJSONResponse, PracticePlan
+from jobs import job_queue, public_job, webhook_allowed, FINISHED_STATUSES
+from routes.practice_plan import PracticePlanRequest, generate_plan
+
+router = APIRouter()
+
+# seconds between SSE keep-alive comments, so proxies don't close idle streams
+HEARTBEAT_SECONDS = 15
+
+
+class PracticePlanJobRequest(PracticePlanRequest):
+    webhook_url: Optional[str] = None
+
+
+async def run_practice_plan_job(job: dict) -> PracticePlan:
+    return await generate_plan(PracticePlanRequest(**job["payload"]), job["user_id"])
+
+job_queue.register("practice_plan", run_practice_plan_job)
+
+
+async def get_user_id(token: str) -> str:
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+    try:
+        return await get_store().get_user_id(token)
+    except Exception:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+
+async def get_user_job(job_id: str, user_id: str) -> dict:
+    job = await job_queue.get(job_id)
+    # other users' jobs look the same as missing ones
+    if not job or job["user_id"] != user_id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+# queue a practice plan generation, returns immediately with the job id
+@router.post("/api/practice-plan/jobs", status_code=202)
+async def submit_practice_plan_job(req: PracticePlanJobRequest, request: Request):
+    auth_header = request.headers.get("authorization", "")
+    user_id = await get_user_id(auth_header.replace("Bearer ", ""))
+
+    if req.webhook_url and not webhook_allowed(req.webhook_url):
+        raise HTTPException(status_code=400, detail="Webhook URL not allowed")
+
+    payload = req.model_dump(exclude={"webhook_url"})
+    job = await job_queue.submit("practice_plan", user_id, payload, webhook_url=req.webhook_url)
+    return public_job(job)
+
+
+# job status, without the result
+@router.get("/api/jobs/{job_id}")
+async def get_job(job_id: str, request: Request):
+    auth_header = request.headers.get("authorization", "")
+    user_id = await get_user_id(auth_header.replace("Bearer ", ""))
+
+    return public_job(await get_user_job(job_id, user_id))
+
+
+# finished job result: 202 while it is still queued/running
+@router.get("/api/jobs/{job_id}/result")
+async def get_job_result(job_id: str, request: Request):
+    auth_header = request.headers.get("authorization", "")
+    user_id = await get_user_id(auth_header.replace("Bearer ", ""))
+
+    job = await get_user_job(job_id, user_id)
+    if job["status"] == "failed":
+        raise HTTPException(status_code=500, detail=job["error"] or "Job failed")
+    if job["status"] != "done":
+        return JSONResponse(status_code=202, content=public_job(job))
+    return FastJSONResponse(job["result"])
+
+
+# server-sent events: one "status" event per change, ends when the job finishes
+@router.get("/api/jobs/{job_id}/events")
+async def job_events(job_id: str, request: Request):
+    auth_header = request.headers.get("authorization", "")
+    token = auth_header.replace("Bearer ", "")
+
+    # EventSource can't send headers, so the token may come as a query param
+    if not token:
+        token = request.query_params.get("token", "")
+
+    user_id = await get_user_id(token)
+    await get_user_job(job_id, user_id)
+
+    async def stream():
+        listener = job_queue.subscribe(job_id)
+        try:
+            # current state first, in case the job finished before we subscribed
+            job = await job_queue.get(job_id)
+            yield f"event: status\ndata: {json.dumps(public_job(job))}\n\n"
+
+            while job["status"] not in FINISHED_STATUSES:
+                try:
+                    await asyncio.wait_for(listener.get(), timeout=HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # listeners only hear about jobs this process runs; another worker
+                    # sharing the job store may have picked it up, so check the store too
+                    latest = await job_queue.get(job_id)
+                    if latest["status"] == job["status"]:
+                        yield ": heartbeat\n\n"
+                        continue
+                    job = latest
+                else:
+                    job = await job_queue.get(job_id)
+                yield f"event: status\ndata: {json.dumps(public_job(job))}\n\n"
+        finally:
+            job_queue.unsubscribe(job_id, listener)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
@@ -1,20 +1,32 @@
+import os
 import json
+import asyncio
+import weakref
 from typing import Optional, Literal, Dict, Any
 from datetime import datetime
 
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from openai import OpenAI
+from starlette.background import BackgroundTask
 
-from backend.supabase_client import supabase
+from store import get_store
+from serialization import FastJSONResponse, PracticePlan, Dashboard, DashboardPlan
+from providers import get_llm
+import planner
+import singleflight
+import provider_guard
+from completion_events import completion_hub, TooManyStreams, HEARTBEAT_SECONDS
 
 router = APIRouter()
-client = OpenAI()
 
 class PracticePlanRequest(BaseModel):
     song_title: str
     artist: str
     skill_level: Optional[Literal["beginner", "intermediate", "advanced"]] = None
+    # local: rule-based plan only, hybrid: local plan + LLM song text, llm: full generation
+    # (defaults to PLANNER_MODE, then hybrid)
+    mode: Optional[Literal["local", "hybrid", "llm"]] = None
 
 SYSTEM_PROMPT = """
 You are GuitarCoach, a guitar instructor/organizer. Output ONLY valid JSON with no markdown and no extra text.
@@ -58,6 +70,70 @@ Rules:
 - Do NOT include any YouTube links or external URLs.
 """
 
+# Smaller prompt for replacing one day or one task of a saved plan (see regenerate_plan_part)
+REGENERATE_PROMPT = """
+You are GuitarCoach, a guitar instructor/organizer. Output ONLY valid JSON with no markdown and no extra text.
+
+Replace one part of an existing weekly practice plan for a song. "regenerate" says whether to
+write one "day" or one "task". "current" is the version the student didn't like.
+
+For a day, return:
+{
+  "day": "string",
+  "focus": "string — one-line summary of today's focus",
+  "tasks": [ task, ... ]
+}
+
+For a task, return one task:
+{
+  "title": "string — short task name",
+  "duration_minutes": number,
+  "technique": "string — specific technique being practiced",
+  "instructions": "string — step by step instructions on what to do",
+  "why": "string — explanation of why this task helps them learn the song",
+  "milestone": "string — measurable goal to hit before moving on"
+}
+
+Rules:
+- Total duration must equal total_minutes.
+- Make it clearly different from "current" and fit between the neighboring days' focus.
+- Serve the weekly_goal. Milestones must be concrete and measurable.
+- Do NOT include any YouTube links or external URLs.
+"""
+
+# Hybrid mode: the plan's structure comes from planner.build_plan; the model only writes
+# the song-specific text, so the call is small and the durations can't drift.
+FILL_PROMPT = """
+You are GuitarCoach, a guitar instructor/organizer. Output ONLY valid JSON with no markdown and no extra text.
+
+"skeleton" is a finished weekly practice plan for a song: days, focus, task titles, techniques
+and durations are fixed. Write the song-specific text for it. Return:
+{
+  "weekly_goal": {
+    "description": "string — overarching goal for the week",
+    "milestones": ["string", "string", "string"]
+  },
+  "days": [
+    {
+      "tasks": [
+        {
+          "instructions": "string — step by step instructions on what to do, referring to parts of this song",
+          "why": "string — explanation of why this task helps them learn the song",
+          "milestone": "string — measurable goal to hit before moving on (e.g. play at 60 BPM cleanly 3x in a row)"
+        }
+      ]
+    }
+  ]
+}
+
+Rules:
+- One entry in "days" per skeleton day and one entry in "tasks" per skeleton task, in the same order.
+- Keep each task to what fits in its duration_minutes.
+- Milestones must be concrete and measurable.
+- Do NOT include any YouTube links or external URLs.
+"""
+
+
 def parse_minutes(practicing: str) -> int:
     mapping = {
         "15 minutes": 15,
@@ -78,8 +154,7 @@ async def save_practice_plan(request: Request):
         raise HTTPException(status_code=401, detail="Not authenticated")
 
     try:
-        user_resp = supabase.auth.get_user(token)
-        user_id = user_resp.user.id
+        user_id = await get_store().get_user_id(token)
     except Exception as e:
         raise HTTPException(status_code=401, detail="Invalid token")
 
@@ -93,12 +168,7 @@ async def save_practice_plan(request: Request):
         raise HTTPException(status_code=400, detail="No plan provided.")
 
     try:
-        supabase.table("practice_plans").insert({
-            "user_id": user_id,
-            "song_title": plan.get("song_title", ""),
-            "artist": plan.get("artist", ""),
-            "plan": plan,
-        }).execute()
+        await get_store().insert_plan(user_id, plan)
         return {"message": "Plan saved."}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to save plan: {e}")
@@ -114,20 +184,12 @@ async def get_saved_plans(request: Request):
         raise HTTPException(status_code=401, detail="Not authenticated")
 
     try:
-        user_resp = supabase.auth.get_user(token)
-        user_id = user_resp.user.id
+        user_id = await get_store().get_user_id(token)
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid token")
 
     try:
-        resp = (
-            supabase.table("practice_plans")
-            .select("id, song_title, artist, plan, created_at")
-            .eq("user_id", user_id)
-            .order("created_at", desc=True)
-            .execute()
-        )
-        return resp.data
+        return FastJSONResponse(await get_store().list_plans(user_id))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch plans: {e}")
 
@@ -142,18 +204,158 @@ async def delete_practice_plan(plan_id: str, request: Request):
         raise HTTPException(status_code=401, detail="Not authenticated")
 
     try:
-        user_resp = supabase.auth.get_user(token)
-        user_id = user_resp.user.id
+        user_id = await get_store().get_user_id(token)
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid token")
 
     try:
-        supabase.table("practice_plans").delete().eq("id", plan_id).eq("user_id", user_id).execute()
+        await get_store().delete_plan(user_id, plan_id)
         return {"message": "Plan deleted."}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to delete plan: {e}")
 
 
+# regenerate one day (or one task of a day) of a saved plan, patched in place
+class RegenerateRequest(BaseModel):
+    day_name: str
+    task_index: Optional[int] = None
+
+@router.post("/api/practice-plan/saved/{plan_id}/regenerate")
+async def regenerate_plan_part(plan_id: str, req: RegenerateRequest, request: Request):
+    auth_header = request.headers.get("authorization", "")
+    token = auth_header.replace("Bearer ", "")
+
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+    try:
+        user_id = await get_store().get_user_id(token)
+    except Exception:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    key = singleflight.request_key(user_id, f"regenerate/{plan_id}", req.model_dump())
+    plan = await singleflight.run(key, lambda: regenerate_fragment(user_id, plan_id, req))
+    return FastJSONResponse(plan)
+
+
+# Regenerations of one plan run one at a time: each reads the whole plan, waits for the
+# model and writes the whole plan back, so two days regenerated at once would otherwise
+# drop one of the new days. Locks are dropped once no request holds or waits on them.
+_plan_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+def plan_lock(plan_id: str) -> asyncio.Lock:
+    lock = _plan_locks.get(plan_id)
+    if lock is None:
+        lock = _plan_locks[plan_id] = asyncio.Lock()
+    return lock
+
+
+# a model-written task we can show and schedule: a title and a positive duration
+def valid_task(task: Any) -> bool:
+    if not isinstance(task, dict):
+        return False
+    title, duration = task.get("title"), task.get("duration_minutes")
+    return (
+        isinstance(title, str) and bool(title.strip())
+        and isinstance(duration, (int, float)) and not isinstance(duration, bool) and duration > 0
+    )
+
+
+async def regenerate_fragment(user_id: str, plan_id: str, req: RegenerateRequest) -> PracticePlan:
+    async with plan_lock(plan_id):
+        return await _regenerate_fragment(user_id, plan_id, req)
+
+
+async def _regenerate_fragment(user_id: str, plan_id: str, req: RegenerateRequest) -> PracticePlan:
+    saved = await get_store().get_plan(user_id, plan_id)
+    if not saved:
+        raise HTTPException(status_code=404, detail="Plan not found.")
+
+    plan = saved["plan"]
+    days = plan.get("days", [])
+    day_names = [d.get("day", "").lower() for d in days]
+    if req.day_name.lower() not in day_names:
+        raise HTTPException(status_code=404, detail=f"No {req.day_name} in this plan.")
+
+    i = day_names.index(req.day_name.lower())
+    day = days[i]
+    tasks = day.get("tasks", [])
+    if req.task_index is not None and not 0 <= req.task_index < len(tasks):
+        raise HTTPException(status_code=404, detail="Task not found.")
+
+    # only what the model needs to write a replacement that fits the rest of the week
+    payload: Dict[str, Any] = {
+        "regenerate": "day" if req.task_index is None else "task",
+        "song_title": plan.get("song_title", saved["song_title"]),
+        "artist": plan.get("artist", saved["artist"]),
+        "skill_level": plan.get("skill_level", ""),
+        "weekly_goal": (plan.get("weekly_goal") or {}).get("description", ""),
+        "previous_day_focus": days[i - 1].get("focus", "") if i > 0 else None,
+        "next_day_focus": days[i + 1].get("focus", "") if i + 1 < len(days) else None,
+    }
+    if req.task_index is None:
+        payload["day"] = day.get("day")
+        payload["current"] = {"focus": day.get("focus"), "tasks": [t.get("title") for t in tasks]}
+        payload["total_minutes"] = sum(t.get("duration_minutes") or 0 for t in tasks)
+    else:
+        task = tasks[req.task_index]
+        payload["day_focus"] = day.get("focus")
+        payload["other_tasks"] = [t.get("title") for j, t in enumerate(tasks) if j != req.task_index]
+        payload["current"] = {"title": task.get("title"), "technique": task.get("technique")}
+        payload["total_minutes"] = task.get("duration_minutes") or 0
+
+    try:
+        outputs = await provider_guard.within_budget("regenerate", lambda: get_llm().complete([
+            {"role": "system", "content": REGENERATE_PROMPT},
+            {"role": "user", "content": json.dumps(payload)},
+        ]))
+        fragment = json.loads(outputs[0].strip())
+    except provider_guard.ProviderUnavailable as e:
+        print(f"Regeneration unavailable: {e!r}")
+        raise HTTPException(
+            status_code=503,
+            detail="Plan regeneration is busy right now. Please try again in a moment.",
+            headers={"Retry-After": str(provider_guard.OPEN_SECONDS)},
+        )
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=500, detail="Model did not return valid JSON.")
+    except Exception as e:
+        print(f"Practice plan regeneration failed: {e!r}")
+        raise HTTPException(status_code=500, detail="Practice plan regeneration failed.")
+
+    if req.task_index is None:
+        new_tasks = fragment.get("tasks") if isinstance(fragment, dict) else None
+        if not isinstance(new_tasks, list) or not new_tasks or not all(valid_task(t) for t in new_tasks):
+            raise HTTPException(status_code=500, detail="Model did not return a day.")
+        # keep the day's total time unchanged, split like the model split it
+        if payload["total_minutes"] > 0:
+            minutes = planner.allocate(payload["total_minutes"], [t["duration_minutes"] for t in new_tasks])
+            for task, duration in zip(new_tasks, minutes):
+                task["duration_minutes"] = duration
+        fragment["day"] = day.get("day")
+        days[i] = fragment
+        replaced = range(max(len(tasks), len(new_tasks)))
+    else:
+        if not isinstance(fragment, dict) or not isinstance(fragment.get("title"), str) or not fragment["title"].strip():
+            raise HTTPException(status_code=500, detail="Model did not return a task.")
+        # keep the day's total time unchanged
+        fragment["duration_minutes"] = payload["total_minutes"]
+        tasks[req.task_index] = fragment
+        replaced = [req.task_index]
+
+    try:
+        await get_store().update_plan(user_id, plan_id, plan)
+        # progress on the replaced tasks no longer applies
+        for task_index in replaced:
+            await get_store().delete_completion(user_id, plan_id, day.get("day"), task_index)
+            completion_hub.publish_completion(user_id, plan_id, day.get("day"), task_index, False)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to save plan: {e}")
+
+    return plan
+
+
 # generate a practice plan
 @router.post("/api/practice-plan")
 async def practice_plan(req: PracticePlanRequest, request: Request):
@@ -164,62 +366,83 @@ async def practice_plan(req: PracticePlanRequest, request: Request):
         raise HTTPException(status_code=401, detail="Not authenticated")
 
     try:
-        user_resp = supabase.auth.get_user(token)
-        user_id = user_resp.user.id
+        user_id = await get_store().get_user_id(token)
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+    # identical concurrent requests (double clicks, re-mounts) share one generation
+    idempotency_key = request.headers.get("idempotency-key")
+    key = singleflight.request_key(user_id, "practice-plan", req.model_dump(), idempotency_key)
+    plan = await singleflight.run(key, lambda: generate_plan(req, user_id), remember=bool(idempotency_key))
+    return FastJSONResponse(plan)
+
+
+async def generate_plan(req: PracticePlanRequest, user_id: str) -> PracticePlan:
     try:
-        profile = (
-            supabase.table("profiles")
-            .select("questionnaire_answers")
-            .eq("id", user_id)
-            .single()
-            .execute()
-        )
-        answers: dict = profile.data.get("questionnaire_answers") or {}
+        profile = await get_store().get_profile(user_id, "questionnaire_answers")
+        answers: dict = profile.get("questionnaire_answers") or {}
     except Exception:
         answers = {}
 
     minutes_per_day = parse_minutes(answers.get("practicing", "15 minutes"))
     skill_level = req.skill_level or "beginner"
-
+    start_day = datetime.now().strftime("%A")
+    mode = req.mode or os.environ.get("PLANNER_MODE", "hybrid")
+
+    # the rule-based plan is the local answer and the fallback when the LLM fails, times out
+    # or is unavailable (provider_guard)
+    local_plan = planner.build_plan(req.song_title, req.artist, skill_level, minutes_per_day, start_day, answers)
+    if mode == "local":
+        return local_plan
+
+    if mode == "hybrid":
+        try:
+            outputs = await provider_guard.within_budget("practice-plan", lambda: get_llm().complete([
+                {"role": "system", "content": FILL_PROMPT},
+                {"role": "user", "content": json.dumps({"skeleton": planner.skeleton_for_llm(local_plan)})},
+            ]))
+            return planner.merge_text(local_plan, json.loads(outputs[0].strip()))
+        except Exception as e:
+            print(f"Plan text generation failed, serving local plan: {e!r}")
+            return local_plan
+
+    profile_fields = planner.profile_from_answers(answers)
     payload: Dict[str, Any] = {
         "song_title": req.song_title,
         "artist": req.artist,
         "skill_level": skill_level,
         "minutes_per_day": minutes_per_day,
-        "play_style": answers.get("play_style", []),
-        "techniques": answers.get("techniques", {}),
-        "technical_skills": answers.get("technical skills", []),
-        "goal": answers.get("goal", ""),
-        "start_day": datetime.now().strftime("%A"),
+        "play_style": profile_fields["play_style"],
+        "techniques": profile_fields["techniques"],
+        "technical_skills": profile_fields["technical_skills"],
+        "goal": profile_fields["goal"],
+        "start_day": start_day,
     }
 
     try:
-        resp = client.responses.create(
-            model="gpt-4o-mini",
-            input=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": json.dumps(payload)},
-            ],
-        )
+        outputs = await provider_guard.within_budget("practice-plan", lambda: get_llm().complete([
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": json.dumps(payload)},
+        ]))
 
-        raw = (resp.output_text or "").strip()
+        raw = outputs[0].strip()
 
         plan = json.loads(raw)
         return plan
 
-    except json.JSONDecodeError:
-        raise HTTPException(status_code=500, detail="Model did not return valid JSON.")
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Practice plan generation failed: {e}")
+        print(f"Practice plan generation failed, serving local plan: {e!r}")
+        return local_plan
 
 
 ##### PROGRESS TRACKING ENDPOINTS #####
 
 # insert a task into table
 
+# task indexes per day that can be recorded; the dashboard's completion bitmaps must stay
+# within 31 bits so clients can decode them with 32-bit bitwise operators
+MAX_TASKS_PER_DAY = 31
+
 class CompletedTaskRequest(BaseModel):
     plan_id: str
     day_name: str
@@ -237,21 +460,23 @@ async def complete_task(request: Request, req: CompletedTaskRequest):
       raise HTTPException(status_code=401, detail="Not authenticated")
 
   try:
-      user_resp = supabase.auth.get_user(token)
-      user_id = user_resp.user.id
+      user_id = await get_store().get_user_id(token)
   except Exception:
       raise HTTPException(status_code=401, detail="Invalid token")
 
+  if not 0 <= req.task_index < MAX_TASKS_PER_DAY:
+      raise HTTPException(status_code=400, detail="Invalid task index.")
+
   try:
-      supabase.table("task_completions").insert({
-          "user_id": user_id,
+      await get_store().upsert_completion(user_id, {
           "practice_plan_id": req.plan_id,
           "day_name": req.day_name,
           "task_title": req.task_title,
           "task_index": req.task_index,
           "technique": req.technique,
           "duration_minutes": req.duration_minutes
-      }).execute()
+      })
+      completion_hub.publish_completion(user_id, req.plan_id, req.day_name, req.task_index, True)
       return {"message": "Task marked as complete."}
   except Exception as e:
       raise HTTPException(status_code=500, detail=f"Failed to complete task: {e}")
@@ -266,23 +491,66 @@ async def uncomplete_task(request: Request, plan_id: str, day_name: str, task_in
       raise HTTPException(status_code=401, detail="Not authenticated")
 
   try:
-      user_resp = supabase.auth.get_user(token)
-      user_id = user_resp.user.id
+      user_id = await get_store().get_user_id(token)
   except Exception:
       raise HTTPException(status_code=401, detail="Invalid token")
 
   try:
-      supabase.table("task_completions") \
-          .delete() \
-          .eq("user_id", user_id) \
-          .eq("practice_plan_id", plan_id) \
-          .eq("day_name", day_name) \
-          .eq("task_index", task_index) \
-          .execute()
+      await get_store().delete_completion(user_id, plan_id, day_name, task_index)
+      completion_hub.publish_completion(user_id, plan_id, day_name, task_index, False)
       return {"message": "Completed task deleted."}
   except Exception as e:
       raise HTTPException(status_code=500, detail=f"Failed to delete completed task: {e}")
   
+# server-sent events: a "completion" event whenever one of the user's tasks is checked or
+# unchecked (from any tab or device), "resync" when the client fell behind and should refetch
+@router.get("/api/practice-plan/events")
+async def completion_events(request: Request):
+    auth_header = request.headers.get("authorization", "")
+    token = auth_header.replace("Bearer ", "")
+
+    # EventSource can't send headers, so the token may come as a query param
+    if not token:
+        token = request.query_params.get("token", "")
+
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+    try:
+        user_id = await get_store().get_user_id(token)
+    except Exception:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    try:
+        listener = completion_hub.subscribe(user_id)
+    except TooManyStreams:
+        raise HTTPException(status_code=429, detail="Too many open event streams")
+
+    async def stream():
+        try:
+            # anything published before this point is covered by the client's own fetch
+            yield "event: ready\ndata: {}\n\n"
+            while True:
+                try:
+                    frame = await asyncio.wait_for(listener.get(), timeout=HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+                # send whatever else is already queued in the same write
+                frames = [frame]
+                while not listener.empty():
+                    frames.append(listener.get_nowait())
+                yield "".join(frames)
+        finally:
+            completion_hub.unsubscribe(user_id, listener)
+
+    return StreamingResponse(
+        stream(), media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # also covers a client that disconnects before the stream starts
+        background=BackgroundTask(completion_hub.unsubscribe, user_id, listener),
+    )
+
 #return a list of the completed-stats
 @router.get("/api/practice-plan/completions/{plan_id}")
 async def completions(request: Request, plan_id: str):
@@ -293,18 +561,12 @@ async def completions(request: Request, plan_id: str):
         raise HTTPException(status_code=401, detail="Not authenticated")
     
     try:
-        user_resp = supabase.auth.get_user(token)
-        user_id = user_resp.user.id
+        user_id = await get_store().get_user_id(token)
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid token")
     
     try:
-        resp = supabase.table("task_completions") \
-            .select("*") \
-            .eq("user_id", user_id) \
-            .eq("practice_plan_id", plan_id) \
-            .execute()
-        return resp.data
+        return FastJSONResponse(await get_store().list_completions(user_id, plan_id))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch completions: {e}")
   
@@ -318,19 +580,13 @@ async def completion_stats(request: Request):
         raise HTTPException(status_code=401, detail="Not Authenticated")
     
     try:
-        user_resp = supabase.auth.get_user(token)
-        user_id = user_resp.user.id
+        user_id = await get_store().get_user_id(token)
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid token")
     
 
     try: 
-        resp = supabase.table("task_completions") \
-            .select("technique, duration_minutes") \
-            .eq("user_id", user_id) \
-            .execute()
-        
-        completions = resp.data
+        completions = await get_store().list_user_completions(user_id)
         total_minutes = sum(c.get("duration_minutes") or 0 for c in completions)
 
         # Group by technique
@@ -347,6 +603,70 @@ async def completion_stats(request: Request):
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch stats: {e}")
-    
 
-    
\ No newline at end of file
+
+# every saved plan with its progress in one request: a completion bitmap per plan, plus
+# the same totals as completion-stats (the pages that show one plan use /completions/{id})
+@router.get("/api/practice-plan/dashboard")
+async def dashboard(request: Request):
+    auth_header = request.headers.get("authorization", "")
+    token = auth_header.replace("Bearer ", "")
+
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+    try:
+        user_id = await get_store().get_user_id(token)
+    except Exception:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    try:
+        rows = await get_store().list_plans_with_completions(user_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch dashboard: {e}")
+
+    plans = []
+    total_completed = 0
+    total_minutes = 0
+    by_technique: Dict[str, int] = {}
+
+    for row in rows:
+        completed = completion_bitmap(row["completions"])
+        days = (row.get("plan") or {}).get("days") or []
+        plans.append(DashboardPlan(
+            id=row["id"],
+            song_title=row["song_title"],
+            artist=row["artist"],
+            plan=row["plan"],
+            created_at=row["created_at"],
+            completed=completed,
+            completed_tasks=sum(bin(mask).count("1") for mask in completed.values()),
+            total_tasks=sum(len(d.get("tasks") or []) for d in days),
+        ))
+
+        for c in row["completions"]:
+            mins = c.get("duration_minutes") or 0
+            tech = c.get("technique") or "general"
+            total_completed += 1
+            total_minutes += mins
+            by_technique[tech] = by_technique.get(tech, 0) + mins
+
+    return FastJSONResponse(Dashboard(
+        plans=plans,
+        stats={
+            "total_completed": total_completed,
+            "total_minutes": total_minutes,
+            "by_technique": by_technique,
+        },
+    ))
+
+
+def completion_bitmap(completions: list) -> Dict[str, int]:
+    completed: Dict[str, int] = {}
+    for c in completions:
+        task_index = int(c["task_index"])
+        # rows written before complete-task checked the index
+        if not 0 <= task_index < MAX_TASKS_PER_DAY:
+            continue
+        completed[c["day_name"]] = completed.get(c["day_name"], 0) | (1 << task_index)
+    return completed
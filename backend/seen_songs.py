@@ -0,0 +1,131 @@
+import re
+import time
+import hashlib
+import unicodedata
+from collections import OrderedDict
+from typing import Iterable, Optional, Set, Tuple
+
+from store import get_store
+
+# Per-user record of every song the service has already recommended.
+# Songs are normalized ("Stairway to Heaven (Remastered)" by "Led Zeppelin" ==
+# "stairway to heaven" by "led zeppelin") and stored as 64-bit hashes so the
+# in-memory set stays small, and persisted to profiles.seen_songs as hex strings.
+#
+# The sets are a cache of the stored lists: least recently used users are dropped past
+# MAX_CACHED_USERS, and a set is reloaded after SEEN_TTL_SECONDS so songs other workers
+# recorded show up. Writes append to the stored list (Store.add_seen_songs) instead of
+# replacing it, so a stale or partial cache can never remove history.
+
+MAX_CACHED_USERS = 10_000
+SEEN_TTL_SECONDS = 300
+
+# user_id -> (loaded at, seen keys), least recently used first
+_seen: "OrderedDict[str, Tuple[float, Set[int]]]" = OrderedDict()
+
+# counters for GET /api/recommendation/stats
+stats = {
+    "recommendations": 0,       # songs returned to users
+    "llm_calls": 0,             # requests sent to the model
+    "generated": 0,             # songs the model produced (several per call when n > 1)
+    "duplicates": 0,            # generated songs the user had already seen
+    "wasted_calls": 0,          # calls where every generated song was a duplicate
+    "alternatives_served": 0,   # songs served from spare candidates without a call
+    "index_served": 0,          # similar songs answered by the local index without a call
+}
+
+
+def normalize_song(name: str, artist: Optional[str] = "") -> str:
+    def clean(text: str) -> str:
+        text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode()
+        text = text.lower()
+        text = re.sub(r"\(.*?\)|\[.*?\]", " ", text)          # (Remastered 2011), [Live]
+        text = re.sub(r"\s+-\s+.*$", " ", text)               # "Song - 2015 Remaster"
+        text = re.sub(r"\bfeat\.?\b.*$|\bft\.?\b.*$", " ", text)
+        text = re.sub(r"[^a-z0-9 ]", " ", text)
+        text = re.sub(r"^the\s+", "", text.strip())
+        return " ".join(text.split())
+
+    return f"{clean(name)}|{clean(artist or '')}"
+
+
+def parse_song_label(label: str) -> Tuple[str, str]:
+    # the frontend sends previous songs as "Song Name by Artist Name"
+    name, sep, artist = label.rpartition(" by ")
+    if not sep:
+        return label, ""
+    return name, artist
+
+
+def song_key(name: str, artist: Optional[str] = "") -> int:
+    digest = hashlib.blake2b(normalize_song(name, artist).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def label_key(label: str) -> int:
+    return song_key(*parse_song_label(label))
+
+
+def _cached(user_id: str) -> Optional[Set[int]]:
+    entry = _seen.get(user_id)
+    if entry is None or time.monotonic() - entry[0] > SEEN_TTL_SECONDS:
+        return None
+    _seen.move_to_end(user_id)
+    return entry[1]
+
+
+def _cache(user_id: str, seen: Set[int]) -> None:
+    _seen[user_id] = (time.monotonic(), seen)
+    _seen.move_to_end(user_id)
+    while len(_seen) > MAX_CACHED_USERS:
+        _seen.popitem(last=False)
+
+
+async def load_seen(user_id: str) -> Set[int]:
+    seen = _cached(user_id)
+    if seen is not None:
+        return seen
+
+    try:
+        profile = await get_store().get_profile(user_id, "seen_songs")
+    except Exception as e:
+        # not cached, so the next request tries again (and mark_seen doesn't write)
+        print(f"Could not load seen songs for user {user_id}: {e}")
+        return set()
+
+    seen = {int(h, 16) for h in profile.get("seen_songs") or []}
+    _cache(user_id, seen)
+    return seen
+
+
+# load_seen() must have been awaited for this user first
+def is_seen(user_id: str, name: str, artist: Optional[str] = "", extra: Iterable[int] = ()) -> bool:
+    key = song_key(name, artist)
+    entry = _seen.get(user_id)
+    return (entry is not None and key in entry[1]) or key in extra
+
+
+async def mark_seen(user_id: str, name: str, artist: Optional[str] = "") -> None:
+    seen = await load_seen(user_id)
+    key = song_key(name, artist)
+    if key in seen:
+        return
+    seen.add(key)
+    if _seen.get(user_id, (0, None))[1] is not seen:
+        # the stored list couldn't be loaded; leave it alone until it can
+        return
+
+    try:
+        stored = await get_store().add_seen_songs(user_id, [format(key, "016x")])
+        # the stored list also has whatever other workers added since the load
+        seen.update(int(h, 16) for h in stored)
+    except Exception as e:
+        print(f"Could not persist seen songs for user {user_id}: {e}")
+
+
+def get_stats() -> dict:
+    return {
+        **stats,
+        "duplicate_rate": stats["duplicates"] / stats["generated"] if stats["generated"] else 0.0,
+        "wasted_call_rate": stats["wasted_calls"] / stats["llm_calls"] if stats["llm_calls"] else 0.0,
+    }
@@ -0,0 +1,181 @@
+import gzip
+from typing import Any, Dict, List, Optional, TypedDict
+
+import orjson
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli                   # optional: `pip install brotli` enables br encoding
+except ImportError:
+    brotli = None
+
+# Response types for the large payloads (plans, completions, recommendations).
+# Routes return FastJSONResponse(...) directly, which skips FastAPI's jsonable_encoder
+# pass and serializes with orjson. CompressionMiddleware then gzip/brotli-encodes
+# responses above a size threshold when the client accepts it.
+
+
+class PlanTask(TypedDict, total=False):
+    title: str
+    duration_minutes: int
+    technique: str
+    instructions: str
+    why: str
+    milestone: str
+
+
+class PlanDay(TypedDict, total=False):
+    day: str
+    focus: str
+    tasks: List[PlanTask]
+
+
+class PracticePlan(TypedDict, total=False):
+    song_title: str
+    artist: str
+    skill_level: str
+    weekly_goal: Dict[str, Any]
+    days: List[PlanDay]
+
+
+class SavedPlan(TypedDict):
+    id: str
+    song_title: str
+    artist: str
+    plan: PracticePlan
+    created_at: str
+
+
+class TaskCompletion(TypedDict, total=False):
+    id: str
+    user_id: str
+    practice_plan_id: str
+    day_name: str
+    task_index: int
+    task_title: str
+    technique: Optional[str]
+    duration_minutes: Optional[int]
+    created_at: str
+
+
+class DashboardPlan(TypedDict):
+    id: str
+    song_title: str
+    artist: str
+    plan: PracticePlan
+    created_at: str
+    # day name -> bitmask of completed task indexes (bit i set = task i done)
+    completed: Dict[str, int]
+    completed_tasks: int
+    total_tasks: int
+
+
+class Dashboard(TypedDict):
+    plans: List[DashboardPlan]
+    stats: Dict[str, Any]
+
+
+class SongRecommendation(TypedDict, total=False):
+    name: str
+    artist: str
+    difficulty: int
+    skills: List[str]
+    genres: List[str]
+    description: str
+    similarity: float           # set when the local similarity index picked the song
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        # OPT_NON_STR_KEYS: plans/stats can have int keys; default=str covers datetimes etc.
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS, default=str)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    # Picks the response coding from an Accept-Encoding header: the supported coding with
+    # the highest q-value, brotli on a tie. "gzip;q=0" refuses gzip, "*" stands for any
+    # coding not listed, and no header or a header naming neither means no compression.
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[coding] = q
+
+    supported = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best, best_q = None, 0.0
+    for coding in supported:
+        q = weights.get(coding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class CompressionMiddleware:
+    # Compresses complete (non-streaming) responses of at least minimum_size bytes.
+    # Streaming responses such as the SSE endpoints are passed through untouched.
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            headers = MutableHeaders(raw=start_message["headers"])
+            body = message.get("body", b"")
+            if (
+                message.get("more_body", False)
+                or "content-encoding" in headers
+                or len(body) < self.minimum_size
+            ):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            if encoding == "br":
+                body = brotli.compress(body, quality=self.brotli_quality)
+            else:
+                body = gzip.compress(body, compresslevel=self.gzip_level)
+
+            headers["content-encoding"] = encoding
+            headers["content-length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
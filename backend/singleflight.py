@@ -0,0 +1,66 @@
+import time
+import json
+import asyncio
+import hashlib
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+# In-process request de-duplication for the expensive LLM routes.
+# A double click or a React re-mount sends the same request twice; instead of paying
+# for two generations, the second caller awaits the first caller's upstream call.
+# Clients may also send an Idempotency-Key header, in which case the finished result
+# is replayed for IDEMPOTENCY_TTL_SECONDS instead of generating again.
+
+IDEMPOTENCY_TTL_SECONDS = 600
+
+_inflight: Dict[str, asyncio.Task] = {}
+_completed: Dict[str, Tuple[float, Any]] = {}
+
+stats = {
+    "upstream_calls": 0,    # calls that actually ran
+    "shared": 0,            # callers that joined an in-flight call
+    "replayed": 0,          # callers answered from a finished idempotent call
+}
+
+
+def request_key(user_id: str, route: str, body: Any, idempotency_key: Optional[str] = None) -> str:
+    if idempotency_key:
+        raw = f"{user_id}|{route}|idempotency|{idempotency_key}"
+    else:
+        # canonical form so key order / whitespace in the request body doesn't matter
+        raw = f"{user_id}|{route}|" + json.dumps(body, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+async def run(key: str, fn: Callable[[], Awaitable[Any]], remember: bool = False) -> Any:
+    now = time.monotonic()
+    if key in _completed:
+        finished_at, result = _completed[key]
+        if now - finished_at < IDEMPOTENCY_TTL_SECONDS:
+            stats["replayed"] += 1
+            return result
+        del _completed[key]
+
+    task = _inflight.get(key)
+    if task is not None:
+        stats["shared"] += 1
+    else:
+        stats["upstream_calls"] += 1
+        task = asyncio.ensure_future(fn())
+        _inflight[key] = task
+
+        def finished(t: asyncio.Task) -> None:
+            _inflight.pop(key, None)
+            if not t.cancelled() and t.exception() is None and remember:
+                _expire_completed()
+                _completed[key] = (time.monotonic(), t.result())
+
+        task.add_done_callback(finished)
+
+    # shield so one caller disconnecting doesn't cancel the call the others are waiting on
+    return await asyncio.shield(task)
+
+
+def _expire_completed() -> None:
+    now = time.monotonic()
+    for k in [k for k, (t, _) in _completed.items() if now - t >= IDEMPOTENCY_TTL_SECONDS]:
+        del _completed[k]
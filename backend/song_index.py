@@ -0,0 +1,368 @@
+import os
+import re
+import json
+import zlib
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    import numpy as np              # optional: `pip install numpy` enables the local similarity index
+except ImportError:
+    np = None
+
+import seen_songs
+
+# Local catalog of every song the service has come across, for answering
+# generate-similar without an LLM call.
+#
+# Songs come from every parsed LLM recommendation (with difficulty and skills) and from
+# Spotify data: the user's top tracks and search results (no difficulty, used as query
+# seeds) and top artists (genres, remembered per artist and given to their songs).
+#
+# Each song is a feature-hashed vector of its genres, skills and artist, L2-normalized,
+# so cosine similarity is a dot product. Rows live in one float32 matrix per difficulty:
+# the difficulty filter is choosing the matrix, and a lookup is one matrix-vector
+# product over it plus argpartition for a shortlist. Songs the user has seen or listed
+# in previous_songs are masked out before ranking. The shortlist is then rescored with
+# the exact (unhashed) cosine.
+#
+# A lookup only answers when the best exact score is at least SONG_INDEX_MIN_SCORE;
+# otherwise the route asks the LLM as before (and the answer lands in the catalog).
+# Spotify songs have no difficulty and sit in partition UNKNOWN_DIFFICULTY: they help
+# as seeds but are never served, and a request without a valid difficulty isn't answered.
+
+# Settings (read when the index is first used):
+#   SONG_INDEX=on|off, SONG_INDEX_DIMS, SONG_INDEX_MIN_SCORE, SONG_INDEX_MAX_SONGS
+#   SONG_INDEX_PATH - JSON lines file the catalog is appended to and reloaded from; unset keeps it in memory
+
+# relative weight of each feature kind in a song's vector
+WEIGHTS = {
+    "genre": 1.0,
+    "genre_word": 0.5,      # "folk rock" also counts a little towards "folk" and "rock"
+    "skill": 0.8,
+    "artist": 1.2,
+}
+TOP_K = 10
+RERANK_K = 50           # hashed-vector shortlist rescored on exact features
+MAX_ARTISTS = 100_000
+UNKNOWN_DIFFICULTY = 0
+
+stats = {
+    "songs": 0,
+    "lookups": 0,
+    "served": 0,
+    "low_confidence": 0,
+    "unknown_seed": 0,
+    "unknown_difficulty": 0,
+}
+
+
+def _clean(text: str) -> str:
+    text = re.sub(r"[^a-z0-9 ]+", " ", (text or "").lower())
+    return " ".join(text.split())
+
+
+def _clean_skill(skill: str) -> str:
+    # "Power Chords" == "power chord", "bends" == "bend"
+    return " ".join(w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith("ss") else w
+                    for w in _clean(skill).split())
+
+
+def _clean_artist(artist: str) -> str:
+    artist = _clean(artist)
+    return artist[4:] if artist.startswith("the ") else artist
+
+
+def features(song: dict, genres: Iterable[str] = ()) -> List[Tuple[str, float]]:
+    tokens = []
+    for genre in {_clean(g) for g in list(song.get("genres") or []) + list(genres)} - {""}:
+        tokens.append((f"g:{genre}", WEIGHTS["genre"]))
+        words = genre.split()
+        if len(words) > 1:
+            tokens.extend((f"g:{w}", WEIGHTS["genre_word"]) for w in words)
+    for skill in {_clean_skill(s) for s in song.get("skills") or []} - {""}:
+        tokens.append((f"s:{skill}", WEIGHTS["skill"]))
+    artist = _clean_artist(song.get("artist", ""))
+    if artist:
+        tokens.append((f"a:{artist}", WEIGHTS["artist"]))
+    return tokens
+
+
+def exact_similarity(a: List[Tuple[str, float]], b: List[Tuple[str, float]]) -> float:
+    # cosine over the weighted feature tokens themselves, without hashing
+    wa, wb = {}, {}
+    for token, weight in a:
+        wa[token] = wa.get(token, 0.0) + weight
+    for token, weight in b:
+        wb[token] = wb.get(token, 0.0) + weight
+    dot = sum(w * wb[t] for t, w in wa.items() if t in wb)
+    if not dot:
+        return 0.0
+    return dot / ((sum(w * w for w in wa.values()) * sum(w * w for w in wb.values())) ** 0.5)
+
+
+def parse_difficulty(value) -> int:
+    try:
+        difficulty = int(value)
+    except (TypeError, ValueError):
+        return UNKNOWN_DIFFICULTY
+    return difficulty if 1 <= difficulty <= 5 else UNKNOWN_DIFFICULTY
+
+
+###########################     Index       ###########################
+
+class Partition:
+    # the songs of one difficulty: rows[:size] of a matrix that doubles when full
+    def __init__(self, dims: int):
+        self.matrix = np.zeros((64, dims), dtype=np.float32)
+        self.keys: List[int] = []
+        self.songs: List[dict] = []
+
+    @property
+    def size(self) -> int:
+        return len(self.keys)
+
+    def append(self, key: int, vector, song: dict) -> int:
+        if self.size == len(self.matrix):
+            grown = np.zeros((len(self.matrix) * 2, self.matrix.shape[1]), dtype=np.float32)
+            grown[:self.size] = self.matrix
+            self.matrix = grown
+        self.matrix[self.size] = vector
+        self.keys.append(key)
+        self.songs.append(song)
+        return self.size - 1
+
+    def remove(self, row: int) -> Optional[int]:
+        # swap the last row into the gap; returns the key that moved there, if any
+        last = self.size - 1
+        moved = None
+        if row != last:
+            self.matrix[row] = self.matrix[last]
+            self.keys[row] = self.keys[last]
+            self.songs[row] = self.songs[last]
+            moved = self.keys[row]
+        self.matrix[last] = 0
+        self.keys.pop()
+        self.songs.pop()
+        return moved
+
+    def nbytes(self) -> int:
+        return self.matrix.nbytes
+
+
+class SongIndex:
+    def __init__(self, dims: int = 128, min_score: float = 0.55, max_songs: int = 1_000_000,
+                 path: Optional[str] = None):
+        self.dims = dims
+        self.min_score = min_score
+        self.max_songs = max_songs
+        self.path = path
+        self.partitions: Dict[int, Partition] = {}
+        self.rows: Dict[int, Tuple[int, int]] = {}          # song key -> (difficulty, row)
+        self.artist_genres: Dict[str, List[str]] = {}
+
+    @classmethod
+    def from_env(cls) -> "SongIndex":
+        index = cls(
+            dims=int(os.environ.get("SONG_INDEX_DIMS", "128")),
+            min_score=float(os.environ.get("SONG_INDEX_MIN_SCORE", "0.55")),
+            max_songs=int(os.environ.get("SONG_INDEX_MAX_SONGS", "1000000")),
+            path=os.environ.get("SONG_INDEX_PATH") or None,
+        )
+        index.load()
+        return index
+
+    def vector(self, tokens: List[Tuple[str, float]]):
+        vector = np.zeros(self.dims, dtype=np.float32)
+        for token, weight in tokens:
+            # signed feature hashing: collisions cancel out on average instead of adding up
+            h = zlib.crc32(token.encode())
+            vector[h % self.dims] += weight if h & 0x80000000 else -weight
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _partition(self, difficulty: int) -> Partition:
+        if difficulty not in self.partitions:
+            self.partitions[difficulty] = Partition(self.dims)
+        return self.partitions[difficulty]
+
+    def _remove(self, key: int) -> None:
+        difficulty, row = self.rows.pop(key)
+        moved = self.partitions[difficulty].remove(row)
+        if moved is not None:
+            self.rows[moved] = (difficulty, row)
+
+    ###########################     Adding songs       ###########################
+
+    def add(self, song: dict, persist: bool = True) -> bool:
+        # returns whether the catalog changed
+        name, artist = song.get("name"), song.get("artist")
+        if not name or not artist:
+            return False
+        key = seen_songs.song_key(name, artist)
+        difficulty = parse_difficulty(song.get("difficulty"))
+        entry = {
+            "name": name,
+            "artist": artist,
+            "difficulty": difficulty,
+            "skills": list(song.get("skills") or []),
+            "genres": list(song.get("genres") or []),
+        }
+
+        if key in self.rows:
+            old_difficulty, row = self.rows[key]
+            old = self.partitions[old_difficulty].songs[row]
+            # first known difficulty wins; skills and genres accumulate
+            if old_difficulty != UNKNOWN_DIFFICULTY:
+                difficulty = entry["difficulty"] = old_difficulty
+            entry["skills"] = old["skills"] + [s for s in entry["skills"] if s not in old["skills"]]
+            entry["genres"] = old["genres"] + [g for g in entry["genres"] if g not in old["genres"]]
+            if entry == old:
+                return False
+            self._remove(key)
+        elif len(self.rows) >= self.max_songs:
+            return False
+
+        vector = self.vector(features(entry, self.artist_genres.get(_clean_artist(artist), ())))
+        row = self._partition(difficulty).append(key, vector, entry)
+        self.rows[key] = (difficulty, row)
+        stats["songs"] = len(self.rows)
+        if persist:
+            self._append(entry)
+        return True
+
+    def add_songs(self, songs: Iterable[dict]) -> None:
+        for song in songs:
+            self.add(song)
+
+    def add_tracks(self, tracks: Iterable[dict]) -> None:
+        # Spotify track objects: name plus a list of artists
+        for track in tracks:
+            artists = track.get("artists") or []
+            if artists:
+                self.add({"name": track.get("name"), "artist": artists[0].get("name")})
+
+    def learn_artists(self, artists: Iterable[dict]) -> None:
+        # Spotify artist objects carry genres; songs added later by the artist use them
+        for artist in artists:
+            name, genres = _clean_artist(artist.get("name", "")), artist.get("genres") or []
+            if name and genres and (name in self.artist_genres or len(self.artist_genres) < MAX_ARTISTS):
+                self.artist_genres[name] = list(genres)
+
+    def load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    self.add(json.loads(line), persist=False)
+                except ValueError:
+                    continue
+        print(f"Loaded {len(self.rows)} songs into the similarity index")
+
+    def _append(self, entry: dict) -> None:
+        if not self.path:
+            return
+        try:
+            with open(self.path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+        except OSError as e:
+            print(f"Failed to persist song index entry: {e}")
+
+    ###########################     Lookups       ###########################
+
+    def seed_features(self, kind: str, name: str, artist_name: Optional[str]) -> List[Tuple[str, float]]:
+        # track: the song's own features when it's in the catalog, else its artist's
+        # artist: the artist and their genres
+        if kind == "track":
+            found = self.rows.get(seen_songs.song_key(name, artist_name))
+            if found:
+                difficulty, row = found
+                song = self.partitions[difficulty].songs[row]
+                return features(song, self.artist_genres.get(_clean_artist(song["artist"]), ()))
+            artist = artist_name or ""
+        else:
+            artist = name
+        return features({"artist": artist}, self.artist_genres.get(_clean_artist(artist), ()))
+
+    def search(self, query, difficulty: int, exclude: Set[int] = frozenset(), k: int = TOP_K) -> List[Tuple[float, dict]]:
+        # approximate top k by the hashed vectors, best first
+        if difficulty == UNKNOWN_DIFFICULTY:
+            return []
+        partition = self.partitions.get(difficulty)
+        if partition is None or not partition.size:
+            return []
+        scores = partition.matrix[:partition.size] @ query
+        masked = [row for d, row in filter(None, map(self.rows.get, exclude)) if d == difficulty]
+        scores[masked] = -np.inf
+        k = min(k, partition.size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), partition.songs[i]) for i in top if scores[i] > -np.inf]
+
+    def find_similar(self, kind: str, name: str, artist_name: Optional[str], difficulty,
+                     exclude: Set[int] = frozenset()) -> Optional[dict]:
+        stats["lookups"] += 1
+        difficulty = parse_difficulty(difficulty)
+        if difficulty == UNKNOWN_DIFFICULTY:
+            stats["unknown_difficulty"] += 1
+            return None
+        tokens = self.seed_features(kind, name, artist_name)
+        if not tokens:
+            stats["unknown_seed"] += 1
+            return None
+
+        seed_key = seen_songs.song_key(name, artist_name) if kind == "track" else None
+        candidates = self.search(self.vector(tokens), difficulty, set(exclude) | {seed_key},
+                                 k=RERANK_K)
+        # hashed features collide (many artists share a dimension), so the shortlist is
+        # rescored on the exact features and the confidence check uses that score
+        best_score, best = 0.0, None
+        for _, song in candidates:
+            score = exact_similarity(tokens, features(song, self.artist_genres.get(_clean_artist(song["artist"]), ())))
+            if score > best_score:
+                best_score, best = score, song
+        if best is None or best_score < self.min_score:
+            stats["low_confidence"] += 1
+            return None
+
+        stats["served"] += 1
+        return recommendation(best, kind, name, artist_name, best_score)
+
+    def get_stats(self) -> dict:
+        return {
+            **stats,
+            "dims": self.dims,
+            "by_difficulty": {d: p.size for d, p in sorted(self.partitions.items())},
+            "matrix_bytes": sum(p.nbytes() for p in self.partitions.values()),
+        }
+
+
+def recommendation(song: dict, kind: str, name: str, artist_name: Optional[str], score: float) -> dict:
+    seed = f'"{name}" by {artist_name}' if kind == "track" and artist_name else name
+    skills = song["skills"]
+    if skills:
+        description = f"Close in style to {seed}. Learning it works on {', '.join(skills[:3])}."
+    else:
+        description = f"Close in style to {seed}."
+    return {
+        "name": song["name"],
+        "artist": song["artist"],
+        "difficulty": song["difficulty"],
+        "skills": skills,
+        "genres": song["genres"],
+        "description": description,
+        "similarity": round(score, 3),
+    }
+
+
+_index: Optional[SongIndex] = None
+
+
+def get_index() -> Optional[SongIndex]:
+    # None when numpy isn't installed or SONG_INDEX=off
+    global _index
+    if np is None or os.environ.get("SONG_INDEX", "on") == "off":
+        return None
+    if _index is None:
+        _index = SongIndex.from_env()
+    return _index
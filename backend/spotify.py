@@ -1,18 +1,15 @@
 import os
-import httpx
 from datetime import datetime, timedelta, timezone
 from urllib.parse import urlencode
 from fastapi import APIRouter, Request, HTTPException
 from fastapi.responses import RedirectResponse
-from supabase_client import supabase
+from store import get_store
+from providers import get_spotify
 
 router = APIRouter(prefix="/api/spotify")
 
-CLIENT_ID = os.environ["SPOTIFY_CLIENT_ID"]
-CLIENT_SECRET = os.environ["SPOTIFY_CLIENT_SECRET"]
-REDIRECT_URI = os.environ["SPOTIFY_REDIRECT_URI"]
-FRONTEND_URL = os.environ["FRONTEND_URL"]
-
+# SPOTIFY_CLIENT_ID / SPOTIFY_CLIENT_SECRET / SPOTIFY_REDIRECT_URI / FRONTEND_URL are read
+# when a request needs them, so importing this module doesn't require the env to be loaded
 SCOPES ="user-read-recently-played user-top-read user-library-read"
 
 
@@ -21,13 +18,13 @@ SCOPES ="user-read-recently-played user-top-read user-library-read"
 async def get_valid_spotify_token(user_id: str) -> str:
 
     # Get tokens from database
-    result = supabase.table("profiles").select(
-        "spotify_access_token, spotify_refresh_token, spotify_token_expires_at"
-    ).eq("id", user_id).single().execute()
+    profile = await get_store().get_profile(
+        user_id, "spotify_access_token, spotify_refresh_token, spotify_token_expires_at"
+    )
 
-    access_token = result.data.get("spotify_access_token")
-    refresh_token = result.data.get("spotify_refresh_token")
-    expires_at_str = result.data.get("spotify_token_expires_at")
+    access_token = profile.get("spotify_access_token")
+    refresh_token = profile.get("spotify_refresh_token")
+    expires_at_str = profile.get("spotify_token_expires_at")
 
     if not access_token or not refresh_token:
         return None
@@ -42,17 +39,12 @@ async def get_valid_spotify_token(user_id: str) -> str:
     # Token expired - refresh it
     print(f"Refreshing Spotify token for user {user_id}")
 
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            "https://accounts.spotify.com/api/token",
-            data={
-                "grant_type": "refresh_token",
-                "refresh_token": refresh_token,
-                "client_id": CLIENT_ID,
-                "client_secret": CLIENT_SECRET,
-            },
-            headers={"Content-Type": "application/x-www-form-urlencoded"}
-        )
+    response = await get_spotify().request_token({
+        "grant_type": "refresh_token",
+        "refresh_token": refresh_token,
+        "client_id": os.environ["SPOTIFY_CLIENT_ID"],
+        "client_secret": os.environ["SPOTIFY_CLIENT_SECRET"],
+    })
 
     if response.status_code != 200:
         print(f"Token refresh failed: {response.text}")
@@ -66,11 +58,11 @@ async def get_valid_spotify_token(user_id: str) -> str:
     new_expires_at = datetime.now(timezone.utc) + timedelta(seconds=expires_in)
 
     # Update database with new tokens
-    supabase.table("profiles").update({
+    await get_store().update_profile(user_id, {
         "spotify_access_token": new_access_token,
         "spotify_refresh_token": new_refresh_token,
         "spotify_token_expires_at": new_expires_at.isoformat(),
-    }).eq("id", user_id).execute()
+    })
 
     print(f"Token refreshed successfully for user {user_id}")
     return new_access_token
@@ -92,41 +84,37 @@ async def spotify_login(request: Request):
         raise HTTPException(status_code=401, detail="Not authenticated")
     
     params = urlencode({
-        "client_id": CLIENT_ID,
+        "client_id": os.environ["SPOTIFY_CLIENT_ID"],
         "response_type": "code",
-        "redirect_uri": REDIRECT_URI,
+        "redirect_uri": os.environ["SPOTIFY_REDIRECT_URI"],
         "scope": SCOPES,
         "state": token,
         "show_dialog": "true",  # Force Spotify to show login screen so users can choose their own account
     })
 
-    return RedirectResponse(f"https://accounts.spotify.com/authorize?{params}")
+    return RedirectResponse(get_spotify().authorize_url(params))
 
 @router.get("/callback")
 async def spotify_callback(code: str = None, error: str = None, state: str = None): # state = supabase token
+    frontend_url = os.environ["FRONTEND_URL"]
 
     if error:
-        return RedirectResponse(f"{FRONTEND_URL}/profile?spotify_error={error}")
+        return RedirectResponse(f"{frontend_url}/profile?spotify_error={error}")
 
     if not code or not state:
-        return RedirectResponse(f"{FRONTEND_URL}/profile?spotify_error=missing_params")
+        return RedirectResponse(f"{frontend_url}/profile?spotify_error=missing_params")
 
     # Exchange code for tokens
-    async with httpx.AsyncClient() as client:  # create Http client
-        response = await client.post(
-            "https://accounts.spotify.com/api/token",
-            data={
-                "grant_type": "authorization_code",
-                "code": code,
-                "redirect_uri": REDIRECT_URI,
-                "client_id": CLIENT_ID,
-                "client_secret": CLIENT_SECRET,
-            },
-            headers={"Content-Type": "application/x-www-form-urlencoded"}
-        )
+    response = await get_spotify().request_token({
+        "grant_type": "authorization_code",
+        "code": code,
+        "redirect_uri": os.environ["SPOTIFY_REDIRECT_URI"],
+        "client_id": os.environ["SPOTIFY_CLIENT_ID"],
+        "client_secret": os.environ["SPOTIFY_CLIENT_SECRET"],
+    })
 
     if response.status_code != 200:
-        return RedirectResponse(f"{FRONTEND_URL}/profile?spotify_error=token_exchange_failed")
+        return RedirectResponse(f"{frontend_url}/profile?spotify_error=token_exchange_failed")
 
     # response token type = Bearer
     tokens = response.json()
@@ -137,26 +125,25 @@ async def spotify_callback(code: str = None, error: str = None, state: str = Non
 
     # Get user from Supabase using their auth token
     try:
-        user_response = supabase.auth.get_user(state)
-        user_id = user_response.user.id
+        user_id = await get_store().get_user_id(state)
     except Exception as e:
         print(f"Error getting user: {e}")
-        return RedirectResponse(f"{FRONTEND_URL}/profile?spotify_error=auth_failed")
+        return RedirectResponse(f"{frontend_url}/profile?spotify_error=auth_failed")
 
 
     # Store tokens in database
     try: 
-        result = supabase.table("profiles").update({
+        await get_store().update_profile(user_id, {
             "spotify_access_token": access_token,
             "spotify_refresh_token": refresh_token,
             "spotify_token_expires_at": expires_at.isoformat(),
-        }).eq("id", user_id).execute()
-        print(f"Database update result: {result}")
+        })
+        print(f"Database updated for user {user_id}")
     except Exception as e:
         print(f"Databse udpate error: {e}")
-        return RedirectResponse(f"{FRONTEND_URL}/profile?spotify_error=db_update_failed")
+        return RedirectResponse(f"{frontend_url}/profile?spotify_error=db_update_failed")
 
-    return RedirectResponse(f"{FRONTEND_URL}/profile?spotify_connected=true")
+    return RedirectResponse(f"{frontend_url}/profile?spotify_connected=true")
 
 
 ###########################     Spotify Service Functions       ########################### 
@@ -170,8 +157,7 @@ async def get_top_tracks(request: Request, limit: int = 20, time_range: str = "m
         raise HTTPException(status_code=401, detail="Not authenticated")
 
     try:
-        user_response = supabase.auth.get_user(token)
-        user_id = user_response.user.id
+        user_id = await get_store().get_user_id(token)
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid token")
 
@@ -180,12 +166,9 @@ async def get_top_tracks(request: Request, limit: int = 20, time_range: str = "m
     if not spotify_token:
         raise HTTPException(status_code=400, detail="Spotify not connected")
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            "https://api.spotify.com/v1/me/top/tracks",
-            params={"limit": limit, "time_range": time_range},
-            headers={"Authorization": f"Bearer {spotify_token}"}
-        )
+    response = await get_spotify().api_get(
+        "/me/top/tracks", spotify_token, params={"limit": limit, "time_range": time_range}
+    )
 
     if response.status_code != 200:
         print(f"Spotify API error: {response.status_code} - {response.text}")
@@ -204,8 +187,7 @@ async def get_top_artists(request: Request, limit: int = 20, time_range: str = "
         raise HTTPException(status_code=401, detail="Not authenticated")
 
     try:
-        user_response = supabase.auth.get_user(token)
-        user_id = user_response.user.id
+        user_id = await get_store().get_user_id(token)
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid token")
 
@@ -214,12 +196,9 @@ async def get_top_artists(request: Request, limit: int = 20, time_range: str = "
     if not spotify_token:
         raise HTTPException(status_code=400, detail="Spotify not connected")
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            "https://api.spotify.com/v1/me/top/artists",
-            params={"limit": limit, "time_range": time_range},
-            headers={"Authorization": f"Bearer {spotify_token}"}
-        )
+    response = await get_spotify().api_get(
+        "/me/top/artists", spotify_token, params={"limit": limit, "time_range": time_range}
+    )
 
     if response.status_code != 200:
         print(f"Spotify API error: {response.status_code} - {response.text}")
@@ -238,8 +217,7 @@ async def get_recently_played(request: Request, limit: int = 20):
         raise HTTPException(status_code=401, detail="Not authenticated")
 
     try:
-        user_response = supabase.auth.get_user(token)
-        user_id = user_response.user.id
+        user_id = await get_store().get_user_id(token)
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid token")
 
@@ -248,12 +226,9 @@ async def get_recently_played(request: Request, limit: int = 20):
     if not spotify_token:
         raise HTTPException(status_code=400, detail="Spotify not connected")
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            "https://api.spotify.com/v1/me/player/recently-played",
-            params={"limit": limit},
-            headers={"Authorization": f"Bearer {spotify_token}"}
-        )
+    response = await get_spotify().api_get(
+        "/me/player/recently-played", spotify_token, params={"limit": limit}
+    )
 
     if response.status_code != 200:
         print(f"Spotify API error: {response.status_code} - {response.text}")
@@ -271,8 +246,7 @@ async def save_spotify_stats(request: Request, time_range: str = "medium_term"):
         raise HTTPException(status_code=401, detail="Not Authenticated")
     
     try:
-        user_response = supabase.auth.get_user(token)
-        user_id = user_response.user.id
+        user_id = await get_store().get_user_id(token)
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid token")
     
@@ -282,17 +256,13 @@ async def save_spotify_stats(request: Request, time_range: str = "medium_term"):
         raise HTTPException(status_code=400, detail="Spotify not connected")
     
     # Fetch top tracks and artists
-    async with httpx.AsyncClient() as client:
-        track_res = await client.get(
-            "https://api.spotify.com/v1/me/top/tracks",
-            params={"limit": 10, "time_range": time_range},
-            headers={"Authorization": f"Bearer {spotify_token}"}
-        )
-        artists_res = await client.get(
-            "https://api.spotify.com/v1/me/top/artists",
-            params={"limit": 10, "time_range": time_range},
-            headers={"Authorization": f"Bearer {spotify_token}"}
-        )
+    spotify = get_spotify()
+    track_res = await spotify.api_get(
+        "/me/top/tracks", spotify_token, params={"limit": 10, "time_range": time_range}
+    )
+    artists_res = await spotify.api_get(
+        "/me/top/artists", spotify_token, params={"limit": 10, "time_range": time_range}
+    )
 
     if track_res.status_code != 200 or artists_res.status_code != 200:
         raise HTTPException(status_code=400, detail="Error getting Spotify data")
@@ -315,11 +285,11 @@ async def save_spotify_stats(request: Request, time_range: str = "medium_term"):
     ]
 
     # Save to database
-    supabase.table("profiles").update({
+    await get_store().update_profile(user_id, {
         "top_tracks": simplified_tracks,
         "top_artists": simplified_artists,
         "spotify_data_updated_at": datetime.now(timezone.utc).isoformat()
-    }).eq("id", user_id).execute()
+    })
 
     return {"message": "Spotify stats saved", "tracks": len(simplified_tracks), "artists": len(simplified_artists)}
 
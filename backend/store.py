@@ -0,0 +1,525 @@
+import os
+import json
+import uuid
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+from serialization import SavedPlan, TaskCompletion
+
+# Datastore used by every router. DATA_BACKEND picks the implementation:
+#   supabase - the real thing, through the Supabase PostgREST client (default)
+#   postgres - direct asyncpg pool (DATABASE_URL); needs `pip install asyncpg`
+#   memory   - in-process dicts, for local runs, benchmarks and load tests
+# Every method takes the authenticated user_id so a row is only ever read or
+# written on behalf of its owner.
+
+
+class Store:
+    async def get_user(self, token: str) -> Any:
+        raise NotImplementedError
+
+    async def get_user_id(self, token: str) -> str:
+        return (await self.get_user(token)).user.id
+
+    # profiles
+    async def get_profile(self, user_id: str, columns: str) -> dict:
+        raise NotImplementedError
+
+    async def update_profile(self, user_id: str, fields: dict) -> None:
+        raise NotImplementedError
+
+    async def add_seen_songs(self, user_id: str, songs: List[str]) -> List[str]:
+        # appends to profiles.seen_songs in one statement, skipping hashes already there,
+        # so concurrent writers (other workers) don't overwrite each other; returns the stored list
+        raise NotImplementedError
+
+    # practice_plans
+    async def insert_plan(self, user_id: str, plan: dict) -> None:
+        raise NotImplementedError
+
+    async def list_plans(self, user_id: str) -> List[SavedPlan]:
+        raise NotImplementedError
+
+    async def delete_plan(self, user_id: str, plan_id: str) -> None:
+        raise NotImplementedError
+
+    async def get_plan(self, user_id: str, plan_id: str) -> Optional[SavedPlan]:
+        raise NotImplementedError
+
+    async def update_plan(self, user_id: str, plan_id: str, plan: dict) -> None:
+        raise NotImplementedError
+
+    # task_completions
+    async def upsert_completion(self, user_id: str, completion: dict) -> None:
+        # one row per (user_id, practice_plan_id, day_name, task_index); completing twice updates it.
+        # Only for the user's own plans: anything else is ignored. The backend's service_role
+        # key bypasses row level security, so every store checks this itself.
+        raise NotImplementedError
+
+    async def delete_completion(self, user_id: str, plan_id: str, day_name: str, task_index: int) -> None:
+        raise NotImplementedError
+
+    async def list_completions(self, user_id: str, plan_id: str) -> List[TaskCompletion]:
+        raise NotImplementedError
+
+    async def list_user_completions(self, user_id: str) -> List[dict]:
+        raise NotImplementedError
+
+    async def list_plans_with_completions(self, user_id: str) -> List[dict]:
+        # saved plans, newest first, each with a "completions" list of
+        # {day_name, task_index, technique, duration_minutes}; one round trip
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class SupabaseStore(Store):
+    # the supabase client is synchronous, so calls run in a thread instead of blocking the event loop
+
+    def __init__(self, client):
+        self.client = client
+
+    async def get_user(self, token: str) -> Any:
+        return await asyncio.to_thread(self.client.auth.get_user, token)
+
+    async def get_profile(self, user_id: str, columns: str) -> dict:
+        query = self.client.table("profiles").select(columns).eq("id", user_id).single()
+        result = await asyncio.to_thread(query.execute)
+        return result.data or {}
+
+    async def update_profile(self, user_id: str, fields: dict) -> None:
+        query = self.client.table("profiles").update(fields).eq("id", user_id)
+        await asyncio.to_thread(query.execute)
+
+    async def add_seen_songs(self, user_id: str, songs: List[str]) -> List[str]:
+        # append_seen_songs() is defined in supabase/migrations
+        query = self.client.rpc("append_seen_songs", {"p_user_id": user_id, "p_songs": songs})
+        result = await asyncio.to_thread(query.execute)
+        return result.data or []
+
+    async def insert_plan(self, user_id: str, plan: dict) -> None:
+        query = self.client.table("practice_plans").insert({
+            "user_id": user_id,
+            "song_title": plan.get("song_title", ""),
+            "artist": plan.get("artist", ""),
+            "plan": plan,
+        })
+        await asyncio.to_thread(query.execute)
+
+    async def list_plans(self, user_id: str) -> List[SavedPlan]:
+        query = (
+            self.client.table("practice_plans")
+            .select("id, song_title, artist, plan, created_at")
+            .eq("user_id", user_id)
+            .order("created_at", desc=True)
+        )
+        return (await asyncio.to_thread(query.execute)).data
+
+    async def delete_plan(self, user_id: str, plan_id: str) -> None:
+        query = self.client.table("practice_plans").delete().eq("id", plan_id).eq("user_id", user_id)
+        await asyncio.to_thread(query.execute)
+
+    async def get_plan(self, user_id: str, plan_id: str) -> Optional[SavedPlan]:
+        query = (
+            self.client.table("practice_plans")
+            .select("id, song_title, artist, plan, created_at")
+            .eq("id", plan_id)
+            .eq("user_id", user_id)
+            .limit(1)
+        )
+        rows = (await asyncio.to_thread(query.execute)).data
+        return rows[0] if rows else None
+
+    async def update_plan(self, user_id: str, plan_id: str, plan: dict) -> None:
+        query = self.client.table("practice_plans").update({"plan": plan}).eq("id", plan_id).eq("user_id", user_id)
+        await asyncio.to_thread(query.execute)
+
+    async def upsert_completion(self, user_id: str, completion: dict) -> None:
+        # PostgREST can't make the insert conditional, so check the plan first. A plan deleted
+        # in between takes its completions with it (on delete cascade)
+        if not await self.get_plan(user_id, completion["practice_plan_id"]):
+            return
+        # relies on the task_completions_natural_key unique constraint (supabase/migrations)
+        query = self.client.table("task_completions").upsert(
+            {"user_id": user_id, **completion},
+            on_conflict="user_id,practice_plan_id,day_name,task_index",
+        )
+        await asyncio.to_thread(query.execute)
+
+    async def delete_completion(self, user_id: str, plan_id: str, day_name: str, task_index: int) -> None:
+        query = self.client.table("task_completions") \
+            .delete() \
+            .eq("user_id", user_id) \
+            .eq("practice_plan_id", plan_id) \
+            .eq("day_name", day_name) \
+            .eq("task_index", task_index)
+        await asyncio.to_thread(query.execute)
+
+    async def list_completions(self, user_id: str, plan_id: str) -> List[TaskCompletion]:
+        query = self.client.table("task_completions") \
+            .select("*") \
+            .eq("user_id", user_id) \
+            .eq("practice_plan_id", plan_id)
+        return (await asyncio.to_thread(query.execute)).data
+
+    async def list_user_completions(self, user_id: str) -> List[dict]:
+        query = self.client.table("task_completions") \
+            .select("technique, duration_minutes") \
+            .eq("user_id", user_id)
+        return (await asyncio.to_thread(query.execute)).data
+
+    async def list_plans_with_completions(self, user_id: str) -> List[dict]:
+        # PostgREST embeds task_completions through its practice_plan_id foreign key
+        query = (
+            self.client.table("practice_plans")
+            .select("id, song_title, artist, plan, created_at, "
+                    "completions:task_completions(day_name, task_index, technique, duration_minutes)")
+            .eq("user_id", user_id)
+            .eq("completions.user_id", user_id)
+            .order("created_at", desc=True)
+        )
+        return (await asyncio.to_thread(query.execute)).data
+
+
+class PostgresStore(Store):
+    # Talks to Postgres directly over a pooled asyncpg connection instead of one PostgREST
+    # HTTP request per query. This connects as a role that bypasses row level security,
+    # so every statement filters on the caller's user_id itself. Tokens are still checked
+    # by Supabase auth.
+    #
+    # Statements are fixed strings, so asyncpg prepares each one once per connection and
+    # reuses it from its statement cache. Behind a transaction-mode pooler (Supabase port
+    # 6543) set PG_STATEMENT_CACHE_SIZE=0.
+
+    # profiles columns the app reads and writes, with the SQL type written values are cast to
+    PROFILE_COLUMNS = {
+        "username": "text",
+        "questionnaire_answers": "jsonb",
+        "seen_songs": "text[]",
+        "spotify_access_token": "text",
+        "spotify_refresh_token": "text",
+        "spotify_token_expires_at": "timestamptz",
+        "top_tracks": "jsonb",
+        "top_artists": "jsonb",
+        "spotify_data_updated_at": "timestamptz",
+    }
+
+    LIST_PLANS = """
+        select id, song_title, artist, plan, created_at from practice_plans
+        where user_id = $1 order by created_at desc
+    """
+    GET_PLAN = """
+        select id, song_title, artist, plan, created_at from practice_plans
+        where id = $2 and user_id = $1
+    """
+    INSERT_PLAN = """
+        insert into practice_plans (user_id, song_title, artist, plan) values ($1, $2, $3, $4)
+    """
+    ADD_SEEN_SONGS = """
+        update profiles
+        set seen_songs = coalesce(seen_songs, '{}') || array(
+            select distinct s from unnest($2::text[]) s where s <> all (coalesce(seen_songs, '{}'))
+        )
+        where id = $1
+        returning seen_songs
+    """
+    UPDATE_PLAN = "update practice_plans set plan = $3 where id = $2 and user_id = $1"
+    DELETE_PLAN = "delete from practice_plans where id = $2 and user_id = $1"
+    UPSERT_COMPLETION = """
+        insert into task_completions
+            (user_id, practice_plan_id, day_name, task_index, task_title, technique, duration_minutes)
+        select $1, $2, $3, $4, $5, $6, $7
+        where exists (select 1 from practice_plans where id = $2 and user_id = $1)
+        on conflict (user_id, practice_plan_id, day_name, task_index) do update
+        set task_title = excluded.task_title,
+            technique = excluded.technique,
+            duration_minutes = excluded.duration_minutes
+    """
+    DELETE_COMPLETION = """
+        delete from task_completions
+        where user_id = $1 and practice_plan_id = $2 and day_name = $3 and task_index = $4
+    """
+    LIST_COMPLETIONS = """
+        select id, user_id, practice_plan_id, day_name, task_index, task_title, technique,
+               duration_minutes, created_at
+        from task_completions where user_id = $1 and practice_plan_id = $2
+    """
+    LIST_USER_COMPLETIONS = "select technique, duration_minutes from task_completions where user_id = $1"
+    LIST_PLANS_WITH_COMPLETIONS = """
+        select p.id, p.song_title, p.artist, p.plan, p.created_at,
+               coalesce((
+                   select json_agg(json_build_object(
+                       'day_name', c.day_name, 'task_index', c.task_index,
+                       'technique', c.technique, 'duration_minutes', c.duration_minutes))
+                   from task_completions c
+                   where c.practice_plan_id = p.id and c.user_id = $1
+               ), '[]') as completions
+        from practice_plans p
+        where p.user_id = $1
+        order by p.created_at desc
+    """
+
+    def __init__(self, dsn: str, auth, min_size: int = 2, max_size: int = 10, statement_cache_size: int = 100):
+        self.dsn = dsn
+        self.auth = auth
+        self.min_size = min_size
+        self.max_size = max_size
+        self.statement_cache_size = statement_cache_size
+        self.pool = None
+        self.pool_lock = asyncio.Lock()
+
+    @classmethod
+    def from_env(cls, auth) -> "PostgresStore":
+        return cls(
+            os.environ["DATABASE_URL"],
+            auth,
+            min_size=int(os.environ.get("PG_POOL_MIN", "2")),
+            max_size=int(os.environ.get("PG_POOL_MAX", "10")),
+            statement_cache_size=int(os.environ.get("PG_STATEMENT_CACHE_SIZE", "100")),
+        )
+
+    async def _pool(self):
+        if self.pool is None:
+            async with self.pool_lock:
+                if self.pool is None:
+                    import asyncpg
+                    self.pool = await asyncpg.create_pool(
+                        self.dsn,
+                        min_size=self.min_size,
+                        max_size=self.max_size,
+                        statement_cache_size=self.statement_cache_size,
+                        init=self._init_connection,
+                    )
+        return self.pool
+
+    @staticmethod
+    async def _init_connection(conn) -> None:
+        for pg_type in ("json", "jsonb"):
+            await conn.set_type_codec(pg_type, encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+
+    @staticmethod
+    def _row(record) -> dict:
+        # same shapes as PostgREST: ids as strings, timestamps as ISO strings
+        row = {}
+        for key, value in record.items():
+            if isinstance(value, uuid.UUID):
+                value = str(value)
+            elif isinstance(value, datetime):
+                value = value.isoformat()
+            row[key] = value
+        return row
+
+    async def _fetch(self, sql: str, *args) -> List[dict]:
+        pool = await self._pool()
+        return [self._row(r) for r in await pool.fetch(sql, *args)]
+
+    async def _execute(self, sql: str, *args) -> None:
+        pool = await self._pool()
+        await pool.execute(sql, *args)
+
+    def _profile_columns(self, columns) -> List[str]:
+        names = [c.strip() for c in columns]
+        unknown = [c for c in names if c not in self.PROFILE_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown profiles columns: {unknown}")
+        return names
+
+    async def get_user(self, token: str) -> Any:
+        return await asyncio.to_thread(self.auth.get_user, token)
+
+    async def get_profile(self, user_id: str, columns: str) -> dict:
+        names = self._profile_columns(columns.split(","))
+        rows = await self._fetch(f"select {', '.join(names)} from profiles where id = $1", user_id)
+        return rows[0] if rows else {}
+
+    async def update_profile(self, user_id: str, fields: dict) -> None:
+        names = self._profile_columns(fields)
+        # timestamps arrive as ISO strings, so cast through text
+        sets = ", ".join(
+            f"{name} = ${i}::text::timestamptz" if self.PROFILE_COLUMNS[name] == "timestamptz"
+            else f"{name} = ${i}::{self.PROFILE_COLUMNS[name]}"
+            for i, name in enumerate(names, start=2)
+        )
+        await self._execute(f"update profiles set {sets} where id = $1",
+                            user_id, *(fields[n] for n in names))
+
+    async def add_seen_songs(self, user_id: str, songs: List[str]) -> List[str]:
+        rows = await self._fetch(self.ADD_SEEN_SONGS, user_id, songs)
+        return rows[0]["seen_songs"] if rows else []
+
+    async def insert_plan(self, user_id: str, plan: dict) -> None:
+        await self._execute(self.INSERT_PLAN, user_id,
+                            plan.get("song_title", ""), plan.get("artist", ""), plan)
+
+    async def list_plans(self, user_id: str) -> List[SavedPlan]:
+        return await self._fetch(self.LIST_PLANS, user_id)
+
+    async def delete_plan(self, user_id: str, plan_id: str) -> None:
+        await self._execute(self.DELETE_PLAN, user_id, plan_id)
+
+    async def get_plan(self, user_id: str, plan_id: str) -> Optional[SavedPlan]:
+        rows = await self._fetch(self.GET_PLAN, user_id, plan_id)
+        return rows[0] if rows else None
+
+    async def update_plan(self, user_id: str, plan_id: str, plan: dict) -> None:
+        await self._execute(self.UPDATE_PLAN, user_id, plan_id, plan)
+
+    async def upsert_completion(self, user_id: str, completion: dict) -> None:
+        # the insert only happens when the plan is the caller's (see UPSERT_COMPLETION)
+        await self._execute(
+            self.UPSERT_COMPLETION, user_id, completion["practice_plan_id"],
+            completion["day_name"], completion["task_index"], completion["task_title"],
+            completion.get("technique"), completion.get("duration_minutes"),
+        )
+
+    async def delete_completion(self, user_id: str, plan_id: str, day_name: str, task_index: int) -> None:
+        await self._execute(self.DELETE_COMPLETION, user_id, plan_id, day_name, task_index)
+
+    async def list_completions(self, user_id: str, plan_id: str) -> List[TaskCompletion]:
+        return await self._fetch(self.LIST_COMPLETIONS, user_id, plan_id)
+
+    async def list_user_completions(self, user_id: str) -> List[dict]:
+        return await self._fetch(self.LIST_USER_COMPLETIONS, user_id)
+
+    async def list_plans_with_completions(self, user_id: str) -> List[dict]:
+        return await self._fetch(self.LIST_PLANS_WITH_COMPLETIONS, user_id)
+
+    async def close(self) -> None:
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+
+class MemoryStore(Store):
+    # Any non-empty bearer token is accepted and used as the user id.
+
+    def __init__(self):
+        self.profiles: Dict[str, dict] = {}
+        self.plans: List[dict] = []
+        self.completions: List[dict] = []
+
+    async def get_user(self, token: str) -> Any:
+        if not token:
+            raise ValueError("Invalid token")
+        # same shape as supabase.auth.get_user(): response.user.id
+        return SimpleNamespace(user=SimpleNamespace(id=token))
+
+    async def get_profile(self, user_id: str, columns: str) -> dict:
+        profile = self.profiles.get(user_id, {})
+        return {c.strip(): profile.get(c.strip()) for c in columns.split(",")}
+
+    async def update_profile(self, user_id: str, fields: dict) -> None:
+        self.profiles.setdefault(user_id, {"id": user_id}).update(fields)
+
+    async def add_seen_songs(self, user_id: str, songs: List[str]) -> List[str]:
+        profile = self.profiles.setdefault(user_id, {"id": user_id})
+        stored = list(profile.get("seen_songs") or [])
+        stored.extend(s for s in dict.fromkeys(songs) if s not in stored)
+        profile["seen_songs"] = stored
+        return stored
+
+    async def insert_plan(self, user_id: str, plan: dict) -> None:
+        self.plans.append({
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "song_title": plan.get("song_title", ""),
+            "artist": plan.get("artist", ""),
+            "plan": plan,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        })
+
+    def _plan_rows(self, user_id: str) -> List[SavedPlan]:
+        rows = [
+            {k: p[k] for k in ("id", "song_title", "artist", "plan", "created_at")}
+            for p in self.plans if p["user_id"] == user_id
+        ]
+        return sorted(rows, key=lambda p: p["created_at"], reverse=True)
+
+    async def list_plans(self, user_id: str) -> List[SavedPlan]:
+        return self._plan_rows(user_id)
+
+    async def delete_plan(self, user_id: str, plan_id: str) -> None:
+        self.plans = [p for p in self.plans if not (p["id"] == plan_id and p["user_id"] == user_id)]
+
+    async def get_plan(self, user_id: str, plan_id: str) -> Optional[SavedPlan]:
+        for p in self.plans:
+            if p["id"] == plan_id and p["user_id"] == user_id:
+                return {k: p[k] for k in ("id", "song_title", "artist", "plan", "created_at")}
+        return None
+
+    async def update_plan(self, user_id: str, plan_id: str, plan: dict) -> None:
+        for p in self.plans:
+            if p["id"] == plan_id and p["user_id"] == user_id:
+                p["plan"] = plan
+
+    async def upsert_completion(self, user_id: str, completion: dict) -> None:
+        if not await self.get_plan(user_id, completion["practice_plan_id"]):
+            return
+        for c in self.completions:
+            if (c["user_id"] == user_id and c["practice_plan_id"] == completion["practice_plan_id"]
+                    and c["day_name"] == completion["day_name"] and c["task_index"] == completion["task_index"]):
+                c.update(completion)
+                return
+        self.completions.append({
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            **completion,
+        })
+
+    async def delete_completion(self, user_id: str, plan_id: str, day_name: str, task_index: int) -> None:
+        self.completions = [
+            c for c in self.completions
+            if not (c["user_id"] == user_id and c["practice_plan_id"] == plan_id
+                    and c["day_name"] == day_name and c["task_index"] == task_index)
+        ]
+
+    async def list_completions(self, user_id: str, plan_id: str) -> List[TaskCompletion]:
+        return [c for c in self.completions if c["user_id"] == user_id and c["practice_plan_id"] == plan_id]
+
+    async def list_user_completions(self, user_id: str) -> List[dict]:
+        return [
+            {"technique": c.get("technique"), "duration_minutes": c.get("duration_minutes")}
+            for c in self.completions if c["user_id"] == user_id
+        ]
+
+    async def list_plans_with_completions(self, user_id: str) -> List[dict]:
+        by_plan: Dict[str, List[dict]] = {}
+        for c in self.completions:
+            if c["user_id"] == user_id:
+                by_plan.setdefault(c["practice_plan_id"], []).append(
+                    {k: c.get(k) for k in ("day_name", "task_index", "technique", "duration_minutes")}
+                )
+        return [{**p, "completions": by_plan.get(p["id"], [])} for p in self._plan_rows(user_id)]
+
+
+_store: Optional[Store] = None
+
+
+def get_store() -> Store:
+    global _store
+    if _store is None:
+        backend = os.environ.get("DATA_BACKEND", "supabase")
+        if backend == "memory":
+            _store = MemoryStore()
+        elif backend == "supabase":
+            # imported here so the Supabase client is only built when it's actually used
+            from supabase_client import supabase
+            _store = SupabaseStore(supabase)
+        elif backend == "postgres":
+            # data over the pool; tokens are still verified by Supabase auth
+            from supabase_client import supabase
+            _store = PostgresStore.from_env(supabase.auth)
+        else:
+            raise ValueError(f"Unknown DATA_BACKEND: {backend}")
+    return _store
+
+
+async def close_store() -> None:
+    global _store
+    if _store is not None:
+        await _store.close()
+        _store = None
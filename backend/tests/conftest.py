@@ -0,0 +1,31 @@
+import os
+import sys
+
+# backend modules import each other by bare name (from store import ...), as when run from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# everything offline: fake LLM and Spotify, in-memory datastore and job store
+os.environ.update({
+    "LLM_PROVIDER": "fake",
+    "SPOTIFY_PROVIDER": "fake",
+    "DATA_BACKEND": "memory",
+    "JOB_STORE": "memory",
+})
+os.environ.setdefault("FRONTEND_URL", "http://localhost")
+
+
+import pytest
+
+import store
+import providers
+import singleflight
+
+
+@pytest.fixture
+def fresh_state(monkeypatch):
+    # new fake clients and empty in-process caches for each test
+    monkeypatch.setattr(store, "_store", None)
+    monkeypatch.setattr(providers, "_llm", None)
+    monkeypatch.setattr(providers, "_spotify", None)
+    monkeypatch.setattr(singleflight, "_inflight", {})
+    monkeypatch.setattr(singleflight, "_completed", {})
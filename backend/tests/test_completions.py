@@ -0,0 +1,61 @@
+import asyncio
+
+import httpx
+
+from main import create_app
+from store import get_store
+from routes.practice_plan import completion_bitmap
+
+HEADERS = {"Authorization": "Bearer user-1"}
+
+
+def complete(task_index: int, plan_id: str) -> dict:
+    return {"plan_id": plan_id, "day_name": "Monday", "task_index": task_index, "task_title": "Task"}
+
+
+async def saved_plan(user_id: str) -> str:
+    await get_store().insert_plan(user_id, {"song_title": "Song", "artist": "Artist", "days": []})
+    return (await get_store().list_plans(user_id))[0]["id"]
+
+
+def test_complete_task_rejects_indexes_outside_the_bitmap(fresh_state):
+    app = create_app()
+
+    async def main():
+        async with app.router.lifespan_context(app):
+            plan_id = await saved_plan("user-1")
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                statuses = [
+                    (await client.post("/api/practice-plan/complete-task", json=complete(i, plan_id),
+                                       headers=HEADERS)).status_code
+                    for i in (-1, 0, 30, 31)
+                ]
+            return statuses, await get_store().list_completions("user-1", plan_id)
+
+    statuses, stored = asyncio.run(main())
+
+    assert statuses == [400, 200, 200, 400]
+    assert sorted(c["task_index"] for c in stored) == [0, 30]
+
+
+def test_completions_are_only_stored_for_the_users_own_plans(fresh_state):
+    async def main():
+        plan_id = await saved_plan("user-2")
+        await get_store().upsert_completion("user-1", {
+            "practice_plan_id": plan_id, "day_name": "Monday", "task_index": 0, "task_title": "Task",
+            "technique": None, "duration_minutes": None,
+        })
+        return await get_store().list_completions("user-1", plan_id)
+
+    assert asyncio.run(main()) == []
+
+
+def test_completion_bitmap_skips_out_of_range_rows():
+    rows = [
+        {"day_name": "Monday", "task_index": 0},
+        {"day_name": "Monday", "task_index": 30},
+        {"day_name": "Monday", "task_index": -1},
+        {"day_name": "Tuesday", "task_index": 31},
+    ]
+    assert completion_bitmap(rows) == {"Monday": (1 << 30) | 1}
@@ -0,0 +1,52 @@
+import types
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import serialization
+from serialization import CompressionMiddleware, FastJSONResponse, choose_encoding
+
+
+@pytest.fixture
+def with_brotli(monkeypatch):
+    # only its presence matters to choose_encoding
+    monkeypatch.setattr(serialization, "brotli", serialization.brotli or types.SimpleNamespace())
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("", None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("gzip, deflate, br", "br"),
+    ("br;q=0, gzip", "gzip"),
+    ("br;q=0.5, gzip;q=0.8", "gzip"),
+    ("br;q=0, gzip;q=0", None),
+    ("GZIP;Q=0.3", "gzip"),
+    ("*", "br"),
+    ("*;q=0.5, br;q=0", "gzip"),
+    ("gzip;q=bogus", None),
+    ("brotli, xgzip", None),
+])
+def test_choose_encoding(with_brotli, header, expected):
+    assert choose_encoding(header) == expected
+
+
+def test_choose_encoding_without_brotli(monkeypatch):
+    monkeypatch.setattr(serialization, "brotli", None)
+    assert choose_encoding("br") is None
+    assert choose_encoding("br, gzip;q=0.1") == "gzip"
+
+
+def test_refused_codings_are_not_used():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=10)
+    app.get("/big")(lambda: FastJSONResponse({"data": "x" * 2000}))
+    client = TestClient(app)
+
+    refused = client.get("/big", headers={"Accept-Encoding": "br;q=0, gzip;q=0"})
+    assert "content-encoding" not in refused.headers
+
+    gzipped = client.get("/big", headers={"Accept-Encoding": "br;q=0, gzip"})
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert gzipped.json() == {"data": "x" * 2000}
@@ -0,0 +1,13 @@
+import os
+from importlib import metadata
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_backend_modules_do_not_shadow_installed_packages():
+    # backend/ is first on sys.path, so a module named like an installed package
+    # (realtime, used by supabase) replaces it for every import
+    installed = set(metadata.packages_distributions())
+    modules = {name[:-3] for name in os.listdir(BACKEND) if name.endswith(".py")}
+    modules |= {name for name in os.listdir(BACKEND) if os.path.isfile(os.path.join(BACKEND, name, "__init__.py"))}
+    assert modules & installed == set()
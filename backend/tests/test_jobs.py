@@ -0,0 +1,157 @@
+import asyncio
+
+import httpx
+
+import jobs
+from jobs import JobQueue, SQLiteJobStore
+from main import create_app
+from routes import jobs as job_routes
+
+
+def make_job(job_id: str, status: str, owner=None, lease_until=None) -> dict:
+    return {
+        "id": job_id, "kind": "practice_plan", "user_id": "user-1", "payload": {}, "status": status,
+        "result": None, "error": None, "webhook_url": None,
+        "created_at": "2026-10-19T00:00:00+00:00", "updated_at": "2026-10-19T00:00:00+00:00",
+        "owner": owner, "lease_until": lease_until,
+    }
+
+
+def test_only_one_process_claims_a_job(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    first, second = SQLiteJobStore(path), SQLiteJobStore(path)
+    first.add(make_job("j1", "queued"))
+
+    assert first.claim("j1", "process-a", 60)
+    assert not second.claim("j1", "process-b", 60)
+    assert second.get("j1")["owner"] == "process-a"
+
+
+def test_start_leaves_jobs_held_by_live_processes(tmp_path, monkeypatch):
+    path = str(tmp_path / "jobs.sqlite3")
+    seed = SQLiteJobStore(path)
+    seed.add(make_job("held", "running", owner="live-process", lease_until=jobs.time.time() + 60))
+    seed.add(make_job("expired", "running", owner="crashed-process", lease_until=jobs.time.time() - 1))
+    seed.add(make_job("legacy", "queued"))
+    ran = []
+
+    async def handler(job):
+        ran.append(job["id"])
+        return {}
+
+    async def main():
+        queue = JobQueue(SQLiteJobStore(path), concurrency=1)
+        queue.register("practice_plan", handler)
+        await queue.start()
+        await asyncio.sleep(0.1)
+        await queue.stop()
+
+    asyncio.run(main())
+
+    assert sorted(ran) == ["expired", "legacy"]
+    assert seed.get("held")["status"] == "running"
+
+
+def test_event_stream_sees_changes_made_by_another_process(fresh_state, monkeypatch):
+    monkeypatch.setattr(job_routes, "HEARTBEAT_SECONDS", 0.05)
+    app = create_app()
+
+    async def main():
+        async with app.router.lifespan_context(app):
+            store = jobs.job_queue.store
+            # running in another worker: this process's listeners never hear about it
+            store.add(make_job("j1", "running", owner="other-process", lease_until=jobs.time.time() + 60))
+
+            async def finish_elsewhere():
+                await asyncio.sleep(0.2)
+                store.update("j1", status="done", result={})
+
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                _, response = await asyncio.gather(
+                    finish_elsewhere(),
+                    asyncio.wait_for(client.get("/api/jobs/j1/events", headers={"Authorization": "Bearer user-1"}), 5),
+                )
+            return response
+
+    response = asyncio.run(main())
+
+    assert response.status_code == 200
+    assert '"status":"done"' in response.text.replace(" ", "")
+
+
+class FlakyStore(jobs.MemoryJobStore):
+    # claim() fails like a locked sqlite database for the first `failures` calls
+    def __init__(self, failures: int):
+        super().__init__()
+        self.failures = failures
+
+    def claim(self, job_id, owner, lease_seconds):
+        if self.failures:
+            self.failures -= 1
+            raise jobs.sqlite3.OperationalError("database is locked")
+        return super().claim(job_id, owner, lease_seconds)
+
+
+def test_store_errors_release_the_job_and_keep_the_worker(monkeypatch):
+    monkeypatch.setenv("JOB_LEASE_SECONDS", "0.15")
+    store = FlakyStore(failures=1)
+
+    async def handler(job):
+        return {"ran": job["id"]}
+
+    async def main():
+        queue = JobQueue(store, concurrency=1)
+        queue.register("practice_plan", handler)
+        await queue.start()
+        first = await queue.submit("practice_plan", "user-1", {})
+        second = await queue.submit("practice_plan", "user-1", {})
+        await asyncio.sleep(0.3)
+        workers_alive = all(not worker.done() for worker in queue.workers)
+        await queue.stop()
+        return first["id"], second["id"], workers_alive
+
+    first, second, workers_alive = asyncio.run(main())
+
+    assert workers_alive
+    # the first job was released and adopted again on the next lease tick
+    assert store.get(first)["status"] == "done"
+    assert store.get(second)["status"] == "done"
+
+
+def test_finished_jobs_are_pruned(tmp_path):
+    store = SQLiteJobStore(str(tmp_path / "jobs.sqlite3"))
+    store.add({**make_job("old", "done"), "updated_at": "2026-10-01T00:00:00+00:00"})
+    store.add({**make_job("failed", "failed"), "updated_at": "2026-10-01T00:00:00+00:00"})
+    store.add({**make_job("recent", "done"), "updated_at": "2026-10-19T00:00:00+00:00"})
+    store.add({**make_job("pending", "queued"), "updated_at": "2026-10-01T00:00:00+00:00"})
+
+    assert store.prune("2026-10-18T00:00:00+00:00") == 2
+    assert [job_id for job_id in ("old", "failed", "recent", "pending") if store.get(job_id)] == ["recent", "pending"]
+
+
+def test_webhooks_do_not_hold_a_worker(monkeypatch):
+    delivered = []
+
+    async def slow_webhook(job):
+        await asyncio.sleep(5)
+        delivered.append(job["id"])
+
+    monkeypatch.setattr(jobs, "send_webhook", slow_webhook)
+
+    async def handler(job):
+        return {}
+
+    async def main():
+        queue = JobQueue(jobs.MemoryJobStore(), concurrency=1)
+        queue.register("practice_plan", handler)
+        await queue.start()
+        first = await queue.submit("practice_plan", "user-1", {}, webhook_url="http://hooks.test/job")
+        second = await queue.submit("practice_plan", "user-1", {})
+        await asyncio.sleep(0.1)
+        status = (await queue.get(second["id"]))["status"]
+        await queue.stop()
+        return status
+
+    assert asyncio.run(main()) == "done"
+    assert delivered == []
@@ -0,0 +1,91 @@
+import json
+import random
+import asyncio
+from datetime import datetime
+
+import pytest
+
+import fakes
+import planner
+from routes.practice_plan import PracticePlanRequest, generate_plan
+
+
+def test_allocate_sums_to_the_requested_total():
+    rng = random.Random(0)
+    for _ in range(500):
+        minutes = rng.randrange(0, 240)
+        weights = [rng.choice([0.5, 1, 2, 3, 7]) for _ in range(rng.randrange(1, 8))]
+        result = planner.allocate(minutes, weights)
+        assert sum(result) == minutes
+        # every task gets its share rounded down or up, never further off
+        assert all(abs(r - minutes * w / sum(weights)) < 1 for r, w in zip(result, weights))
+
+
+@pytest.mark.parametrize("minutes, weights, expected", [
+    (10, [1, 1, 1], [4, 3, 3]),         # the leftover minute goes to the first task
+    (7, [1, 2, 3], [1, 2, 4]),
+    (1, [1, 2, 3, 2], [0, 0, 1, 0]),
+    (45, [1, 2, 3, 2], [6, 11, 17, 11]),
+])
+def test_allocate_uneven_splits(minutes, weights, expected):
+    assert planner.allocate(minutes, weights) == expected
+
+
+@pytest.mark.parametrize("minutes", [5, 13, 15, 17, 29, 30, 45, 61])
+def test_every_day_adds_up_to_minutes_per_day(minutes):
+    plan = planner.build_plan("Wonderwall", "Oasis", "beginner", minutes, "Monday")
+
+    assert len(plan["days"]) == 7
+    for day in plan["days"]:
+        assert sum(t["duration_minutes"] for t in day["tasks"]) == minutes
+        if minutes % 5 == 0:
+            assert all(t["duration_minutes"] % 5 == 0 for t in day["tasks"])
+
+
+def test_week_starts_on_start_day_and_wraps():
+    plan = planner.build_plan("Wonderwall", "Oasis", "beginner", 30, "Thursday")
+    assert [d["day"] for d in plan["days"]] == [
+        "Thursday", "Friday", "Saturday", "Sunday", "Monday", "Tuesday", "Wednesday"]
+    # the song arc follows the order of the week, not the weekday names
+    assert plan["days"][0]["focus"] == planner.SONG_ARC[0]["focus"].format(song="Wonderwall")
+
+    plan = planner.build_plan("Wonderwall", "Oasis", "beginner", 30, "Someday")
+    assert [d["day"] for d in plan["days"]] == planner.WEEK
+
+
+def generate(mode: str) -> dict:
+    req = PracticePlanRequest(song_title="Wonderwall", artist="Oasis", mode=mode)
+    return asyncio.run(generate_plan(req, "user-1"))
+
+
+def local_plan() -> dict:
+    return planner.build_plan("Wonderwall", "Oasis", "beginner", 15, datetime.now().strftime("%A"))
+
+
+@pytest.mark.parametrize("mode", ["hybrid", "llm"])
+def test_failed_llm_falls_back_to_the_local_plan(fresh_state, monkeypatch, mode):
+    monkeypatch.setenv("FAKE_LLM_LATENCY_MS", "0")
+    monkeypatch.setenv("FAKE_LLM_FAILURE_RATE", "1")
+
+    assert generate(mode) == local_plan()
+
+
+def test_unparseable_fill_falls_back_to_the_local_plan(fresh_state, monkeypatch):
+    monkeypatch.setenv("FAKE_LLM_LATENCY_MS", "0")
+    monkeypatch.setattr(fakes.FakeLLMProvider, "respond", lambda self, messages: "Sure! Here is your plan:")
+
+    assert generate("hybrid") == local_plan()
+
+
+def test_hybrid_fill_only_rewrites_text(fresh_state, monkeypatch):
+    monkeypatch.setenv("FAKE_LLM_LATENCY_MS", "0")
+    filled = {"days": [{"tasks": [{"instructions": "Song-specific", "duration_minutes": 99, "title": "Renamed"}]}]}
+    monkeypatch.setattr(fakes.FakeLLMProvider, "respond", lambda self, messages: json.dumps(filled))
+
+    plan, expected = generate("hybrid"), local_plan()
+
+    first = plan["days"][0]["tasks"][0]
+    assert first["instructions"] == "Song-specific"
+    assert (first["title"], first["duration_minutes"]) == (expected["days"][0]["tasks"][0]["title"],
+                                                           expected["days"][0]["tasks"][0]["duration_minutes"])
+    assert plan["days"][1:] == expected["days"][1:]
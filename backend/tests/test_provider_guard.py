@@ -0,0 +1,60 @@
+import asyncio
+
+import httpx
+
+import provider_guard
+from main import create_app
+from providers import get_llm
+
+HEADERS = {"Authorization": "Bearer user-1"}
+SONG_BODY = {"top_tracks": [{"name": "Wonderwall", "artist": "Oasis"}], "top_artists": [{"name": "Oasis"}]}
+
+
+def plan_calls_then_song(plan_latency_ms: float, plan_failure_rate: float):
+    # five+ plan generations in the given conditions, then one song request on a healthy provider
+    app = create_app()
+
+    async def main():
+        async with app.router.lifespan_context(app):
+            llm = get_llm()
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                llm.inner.latency_ms, llm.inner.failure_rate = plan_latency_ms, plan_failure_rate
+                plans = await asyncio.gather(*(
+                    client.post("/api/practice-plan", json={"song_title": f"Song {i}", "artist": "A", "mode": "hybrid"},
+                                headers=HEADERS)
+                    for i in range(provider_guard.MIN_CALLS + 1)
+                ))
+                llm.inner.latency_ms, llm.inner.failure_rate = 10, 0
+                calls_before = llm.inner.calls
+                song = await client.post("/api/recommendation/generate-song", json=SONG_BODY, headers=HEADERS)
+                return plans, song, llm.inner.calls - calls_before, provider_guard.get_stats(llm)["breakers"]
+
+    return asyncio.run(main())
+
+
+def test_slow_plan_calls_do_not_trip_the_song_routes(fresh_state, monkeypatch):
+    # scaled down: songs are slow past 150 ms, plans past 1 s; plan calls take 300 ms
+    monkeypatch.setattr(provider_guard, "SLOW_CALL_SECONDS", 0.15)
+    monkeypatch.setitem(provider_guard.ENDPOINT_SLOW_CALL_SECONDS, "generate-song", 0.15)
+    monkeypatch.setitem(provider_guard.ENDPOINT_SLOW_CALL_SECONDS, "practice-plan", 1.0)
+
+    plans, song, song_calls, breakers = plan_calls_then_song(plan_latency_ms=300, plan_failure_rate=0)
+
+    assert all(r.status_code == 200 for r in plans)
+    assert breakers["practice-plan"] == "closed"
+    assert song.status_code == 200
+    assert "x-degraded" not in song.headers
+    assert song_calls >= 1     # answered by the LLM, not a cached fallback
+
+
+def test_failing_plan_calls_only_open_the_plan_breaker(fresh_state):
+    plans, song, song_calls, breakers = plan_calls_then_song(plan_latency_ms=10, plan_failure_rate=1)
+
+    # plans fall back to the local planner
+    assert all(r.status_code == 200 for r in plans)
+    assert breakers["practice-plan"] == "open"
+    assert breakers["generate-song"] == "closed"
+    assert song.status_code == 200
+    assert "x-degraded" not in song.headers
+    assert song_calls >= 1     # answered by the LLM, not a cached fallback
@@ -0,0 +1,92 @@
+import json
+import asyncio
+from collections import OrderedDict
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+import fakes
+import seen_songs
+import recommendation
+from main import create_app
+
+HEADERS = {"Authorization": "Bearer user-1"}
+SIMILAR = {"type": "artist", "name": "Oasis", "current_difficulty": 2, "candidates": 3}
+
+
+@pytest.fixture
+def recommendations(fresh_state, monkeypatch):
+    monkeypatch.setenv("FAKE_LLM_LATENCY_MS", "0")
+    monkeypatch.setenv("SONG_INDEX", "off")
+    monkeypatch.setattr(recommendation, "ready_alternatives", {})
+    monkeypatch.setattr(recommendation, "recent_songs", {})
+    monkeypatch.setattr(seen_songs, "_seen", OrderedDict())
+    monkeypatch.setitem(seen_songs.stats, "alternatives_served", 0)
+
+    # every candidate the model writes is a different song
+    answered = []
+
+    def respond(self, messages):
+        answered.append(len(answered))
+        return json.dumps({"name": f"Song {len(answered)}", "artist": "Oasis", "difficulty": 2,
+                           "skills": ["strumming"], "genres": ["britpop"], "description": "."})
+
+    monkeypatch.setattr(fakes.FakeLLMProvider, "respond", respond)
+    return answered
+
+
+def run_app(fn):
+    app = create_app()
+
+    async def main():
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await fn(client)
+
+    return asyncio.run(main())
+
+
+def test_spare_candidates_are_served_without_another_llm_call(recommendations):
+    pool_key = ("user-1", "artist", "Oasis", None, 2)
+
+    async def three_in_a_row(client):
+        songs, answered, pools = [], [], []
+        for _ in range(3):
+            r = await client.post("/api/recommendation/generate-similar", json=SIMILAR, headers=HEADERS)
+            assert r.status_code == 200
+            songs.append(r.json()["name"])
+            answered.append(len(recommendations))
+            pools.append([s["name"] for s in recommendation.ready_alternatives.get(pool_key, [])])
+        return songs, answered, pools
+
+    songs, answered, pools = run_app(three_in_a_row)
+
+    # one call wrote three candidates; the next two requests were served from the spares
+    assert songs == ["Song 1", "Song 2", "Song 3"]
+    assert answered == [3, 3, 3]
+    assert pools == [["Song 2", "Song 3"], ["Song 3"], []]
+    assert seen_songs.stats["alternatives_served"] == 2
+
+
+def test_no_candidates_is_an_http_error_not_a_type_error(recommendations, monkeypatch):
+    async def nothing(self, messages, temperature=None, max_tokens=None, n=1):
+        return []
+
+    monkeypatch.setattr(fakes.FakeLLMProvider, "complete", nothing)
+
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(recommendation.request_songs("system", "prompt"))
+    assert raised.value.status_code == 500
+
+
+def test_stats_need_a_signed_in_user(recommendations):
+    async def both(client):
+        return (await client.get("/api/recommendation/stats"),
+                await client.get("/api/recommendation/stats", headers=HEADERS))
+
+    anonymous, signed_in = run_app(both)
+
+    assert anonymous.status_code == 401
+    assert signed_in.status_code == 200
@@ -0,0 +1,125 @@
+import copy
+import json
+import asyncio
+
+import httpx
+
+import fakes
+import store
+from main import create_app
+from store import get_store
+from completion_events import completion_hub, completion_frame
+
+HEADERS = {"Authorization": "Bearer user-1"}
+
+
+def saved_plan() -> dict:
+    task = {"title": "Old task", "duration_minutes": 15, "technique": "strumming"}
+    return {
+        "song_title": "Wonderwall",
+        "artist": "Oasis",
+        "days": [{"day": day, "focus": "old focus", "tasks": [dict(task), dict(task), dict(task)]}
+                 for day in ("Monday", "Tuesday", "Wednesday")],
+    }
+
+
+def run_app(fn):
+    app = create_app()
+
+    async def main():
+        async with app.router.lifespan_context(app):
+            await get_store().insert_plan("user-1", saved_plan())
+            plan_id = (await get_store().list_plans("user-1"))[0]["id"]
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                result = await fn(client, plan_id)
+            return result, (await get_store().get_plan("user-1", plan_id))["plan"]
+
+    return asyncio.run(main())
+
+
+def regenerate(client, plan_id, day):
+    return client.post(f"/api/practice-plan/saved/{plan_id}/regenerate", json={"day_name": day}, headers=HEADERS)
+
+
+def test_concurrent_day_regenerations_are_all_kept(fresh_state, monkeypatch):
+    monkeypatch.setenv("FAKE_LLM_LATENCY_MS", "50")
+    # MemoryStore hands out the stored plan itself; a database read returns a copy
+    get_plan = store.MemoryStore.get_plan
+
+    async def get_plan_copy(self, user_id, plan_id):
+        return copy.deepcopy(await get_plan(self, user_id, plan_id))
+
+    monkeypatch.setattr(store.MemoryStore, "get_plan", get_plan_copy)
+
+    async def both(client, plan_id):
+        return await asyncio.gather(regenerate(client, plan_id, "Monday"), regenerate(client, plan_id, "Tuesday"))
+
+    responses, plan = run_app(both)
+
+    assert [r.status_code for r in responses] == [200, 200]
+    assert plan["days"][0]["focus"] != "old focus"
+    assert plan["days"][1]["focus"] != "old focus"
+    assert plan["days"][2]["focus"] == "old focus"
+
+
+def test_regenerated_day_keeps_total_minutes(fresh_state, monkeypatch):
+    monkeypatch.setenv("FAKE_LLM_LATENCY_MS", "0")
+    day = {"focus": "new", "tasks": [{"title": "A", "duration_minutes": 10}, {"title": "B", "duration_minutes": 30}]}
+    monkeypatch.setattr(fakes.FakeLLMProvider, "respond", lambda self, messages: json.dumps(day))
+
+    async def once(client, plan_id):
+        return await regenerate(client, plan_id, "Monday")
+
+    response, plan = run_app(once)
+
+    assert response.status_code == 200
+    assert [t["duration_minutes"] for t in plan["days"][0]["tasks"]] == [11, 34]
+
+
+def test_malformed_day_is_rejected(fresh_state, monkeypatch):
+    monkeypatch.setenv("FAKE_LLM_LATENCY_MS", "0")
+    bad_days = [
+        {"focus": "new", "tasks": []},
+        {"focus": "new", "tasks": ["just a string"]},
+        {"focus": "new", "tasks": [{"title": "A"}]},
+        {"focus": "new", "tasks": [{"title": "", "duration_minutes": 10}]},
+        {"focus": "new", "tasks": [{"title": "A", "duration_minutes": "10"}]},
+        {"focus": "new", "tasks": [{"title": "A", "duration_minutes": -5}]},
+    ]
+    for day in bad_days:
+        monkeypatch.setattr(fakes.FakeLLMProvider, "respond", lambda self, messages, day=day: json.dumps(day))
+
+        async def once(client, plan_id):
+            return await regenerate(client, plan_id, "Monday")
+
+        response, plan = run_app(once)
+
+        assert response.status_code == 500, day
+        assert plan == saved_plan()
+
+
+def test_regenerated_day_unticks_its_tasks_on_open_streams(fresh_state, monkeypatch):
+    monkeypatch.setenv("FAKE_LLM_LATENCY_MS", "0")
+    day = {"focus": "new", "tasks": [{"title": "A", "duration_minutes": 10}, {"title": "B", "duration_minutes": 30}]}
+    monkeypatch.setattr(fakes.FakeLLMProvider, "respond", lambda self, messages: json.dumps(day))
+
+    async def tick_then_regenerate(client, plan_id):
+        await client.post("/api/practice-plan/complete-task", headers=HEADERS, json={
+            "plan_id": plan_id, "day_name": "Monday", "task_index": 1, "task_title": "Old task"})
+        listener = completion_hub.subscribe("user-1")
+        try:
+            await regenerate(client, plan_id, "Monday")
+            frames = []
+            while not listener.empty():
+                frames.append(listener.get_nowait())
+        finally:
+            completion_hub.unsubscribe("user-1", listener)
+        completions = await get_store().list_completions("user-1", plan_id)
+        return [completion_frame(plan_id, "Monday", i, False) for i in range(3)], frames, completions
+
+    (expected, frames, completions), _ = run_app(tick_then_regenerate)
+
+    # the old day had three tasks: all three are cleared, in the store and on every open page
+    assert frames == expected
+    assert completions == []
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+import store
+import seen_songs
+
+
+@pytest.fixture
+def memory_store(monkeypatch):
+    memory = store.MemoryStore()
+    monkeypatch.setattr(store, "_store", memory)
+    seen_songs._seen.clear()
+    yield memory
+    seen_songs._seen.clear()
+
+
+def stored(memory, user_id):
+    return memory.profiles.get(user_id, {}).get("seen_songs") or []
+
+
+def hashes(*songs):
+    return [format(seen_songs.song_key(name, artist), "016x") for name, artist in songs]
+
+
+def test_failed_load_keeps_stored_history(memory_store, monkeypatch):
+    memory_store.profiles["u1"] = {"id": "u1", "seen_songs": hashes(("Song A", "X"), ("Song B", "X"))}
+
+    async def unavailable(user_id, columns):
+        raise ConnectionError("transient")
+
+    with monkeypatch.context() as m:
+        m.setattr(memory_store, "get_profile", unavailable)
+        asyncio.run(seen_songs.mark_seen("u1", "Song C", "X"))
+
+    # nothing was written from the empty set, and nothing was cached
+    assert stored(memory_store, "u1") == hashes(("Song A", "X"), ("Song B", "X"))
+    assert "u1" not in seen_songs._seen
+
+    asyncio.run(seen_songs.mark_seen("u1", "Song C", "X"))
+    assert stored(memory_store, "u1") == hashes(("Song A", "X"), ("Song B", "X"), ("Song C", "X"))
+
+
+def test_writes_merge_with_other_workers(memory_store):
+    memory_store.profiles["u1"] = {"id": "u1", "seen_songs": hashes(("Song A", "X"))}
+    asyncio.run(seen_songs.load_seen("u1"))
+
+    # another worker records a song after this one cached the list
+    asyncio.run(memory_store.add_seen_songs("u1", hashes(("Song B", "X"))))
+    asyncio.run(seen_songs.mark_seen("u1", "Song C", "X"))
+
+    assert stored(memory_store, "u1") == hashes(("Song A", "X"), ("Song B", "X"), ("Song C", "X"))
+    assert seen_songs.is_seen("u1", "Song B", "X")
+
+
+def test_cache_is_bounded(memory_store, monkeypatch):
+    monkeypatch.setattr(seen_songs, "MAX_CACHED_USERS", 2)
+    for user_id in ("u1", "u2", "u3"):
+        asyncio.run(seen_songs.load_seen(user_id))
+    assert list(seen_songs._seen) == ["u2", "u3"]
+
+
+def test_cache_expires(memory_store, monkeypatch):
+    asyncio.run(seen_songs.load_seen("u1"))
+    asyncio.run(memory_store.add_seen_songs("u1", hashes(("Song A", "X"))))
+    assert not seen_songs.is_seen("u1", "Song A", "X")
+
+    monkeypatch.setattr(seen_songs, "SEEN_TTL_SECONDS", -1)
+    asyncio.run(seen_songs.load_seen("u1"))
+    assert seen_songs.is_seen("u1", "Song A", "X")
@@ -0,0 +1,36 @@
+import asyncio
+
+import httpx
+
+from main import create_app
+from providers import get_llm
+
+BODY = {
+    "top_tracks": [{"name": "Wonderwall", "artist": "Oasis"}],
+    "top_artists": [{"name": "Oasis"}],
+    "current_difficulty": 2,
+}
+
+
+def test_concurrent_identical_requests_share_one_llm_call(fresh_state, monkeypatch):
+    # long enough that all ten requests arrive while the first call is running
+    monkeypatch.setenv("FAKE_LLM_LATENCY_MS", "200")
+    app = create_app()
+
+    async def main():
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                headers = {"Authorization": "Bearer user-1"}
+                responses = await asyncio.gather(*(
+                    client.post("/api/recommendation/generate-song", json=BODY, headers=headers)
+                    for _ in range(10)
+                ))
+            # read before shutdown, which closes the provider
+            return responses, get_llm().inner.calls
+
+    responses, calls = asyncio.run(main())
+
+    assert [r.status_code for r in responses] == [200] * 10
+    assert len({r.text for r in responses}) == 1
+    assert calls == 1
@@ -0,0 +1,72 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+import seen_songs
+import song_index
+from song_index import SongIndex, UNKNOWN_DIFFICULTY
+
+
+def song(name, artist, difficulty, genres=("grunge",), skills=("power chords",)):
+    return {"name": name, "artist": artist, "difficulty": difficulty,
+            "genres": list(genres), "skills": list(skills)}
+
+
+@pytest.fixture
+def index():
+    index = SongIndex(dims=64, min_score=0.3)
+    index.add_songs([
+        song("Smells Like Teen Spirit", "Nirvana", 2),
+        song("Come as You Are", "Nirvana", 2),
+        song("Lithium", "Nirvana", 2),
+        song("Black Hole Sun", "Soundgarden", 2),
+        song("Blackbird", "The Beatles", 2, genres=("folk",), skills=("fingerpicking",)),
+        song("Heart-Shaped Box", "Nirvana", 3),
+    ])
+    return index
+
+
+def test_add_partitions_by_difficulty_and_merges_repeats(index):
+    assert index.get_stats()["by_difficulty"] == {2: 5, 3: 1}
+
+    # a repeat keeps its first difficulty and gains the new skills
+    assert index.add(song("Lithium", "Nirvana", 4, skills=("dynamics",)))
+    assert not index.add(song("Lithium", "Nirvana", 2, skills=("dynamics",)))
+    difficulty, row = index.rows[seen_songs.song_key("Lithium", "Nirvana")]
+    assert difficulty == 2
+    assert index.partitions[2].songs[row]["skills"] == ["power chords", "dynamics"]
+
+    # songs without a name or artist aren't indexed
+    assert not index.add({"name": "Untitled", "difficulty": 2})
+
+
+def test_search_ranks_the_closest_songs_first(index):
+    query = index.vector(song_index.features(song("", "Nirvana", 2)))
+    results = index.search(query, 2)
+
+    assert [s["artist"] for _, s in results[:3]] == ["Nirvana"] * 3
+    assert results[-1][1]["name"] == "Blackbird"
+    assert [score for score, _ in results] == sorted((score for score, _ in results), reverse=True)
+    assert index.search(query, 5) == []
+
+
+def test_find_similar_skips_the_seed_and_excluded_songs(index):
+    result = index.find_similar("track", "Smells Like Teen Spirit", "Nirvana", 2)
+    assert result["artist"] == "Nirvana"
+    assert result["name"] != "Smells Like Teen Spirit"
+    assert result["difficulty"] == 2
+
+    exclude = {seen_songs.song_key("Come as You Are", "Nirvana"), seen_songs.song_key("Lithium", "Nirvana")}
+    result = index.find_similar("track", "Smells Like Teen Spirit", "Nirvana", 2, exclude)
+    assert result["name"] == "Black Hole Sun"
+
+
+@pytest.mark.parametrize("difficulty", [None, "hard", 0, 6])
+def test_unknown_difficulty_is_never_answered(index, difficulty):
+    # Spotify tracks carry no difficulty; they are seeds, not recommendations
+    index.add_tracks([{"name": "Drain You", "artists": [{"name": "Nirvana"}]}])
+    assert index.get_stats()["by_difficulty"][UNKNOWN_DIFFICULTY] == 1
+
+    assert index.find_similar("artist", "Nirvana", None, difficulty) is None
+    query = index.vector(song_index.features(song("", "Nirvana", 0)))
+    assert index.search(query, UNKNOWN_DIFFICULTY) == []
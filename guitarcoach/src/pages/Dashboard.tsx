@@ -1,6 +1,7 @@
 import { useEffect, useState } from "react"
 import { useNavigate, useSearchParams } from "react-router-dom"
 import { supabase } from "../supabaseClient"
+import { applyCompletionDelta, subscribeCompletions } from "./utils/completionEvents"
 
 import "bootstrap/dist/css/bootstrap.css"
 import "../style/Dashboard.css"
@@ -119,12 +120,22 @@ function Dashboard() {
             if (storedPlanId) {
                 setPlanId(storedPlanId)
                 fetchCompletions(storedPlanId)
+                // other tabs/devices ticking tasks arrive as pushed deltas
+                return subscribeCompletions(API_BASE, getToken, {
+                    onDelta: (delta) => setCompletedTasks(prev => applyCompletionDelta(prev, storedPlanId, delta)),
+                    onResync: () => fetchCompletions(storedPlanId)
+                })
             }
         } catch (e) {
             console.error("Failed to parse active plan:", e)
         }
     }, [])
 
+    async function getToken() {
+        const { data: sessionData } = await supabase.auth.getSession()
+        return sessionData.session?.access_token
+    }
+
     // fetching the completions for the display
     async function fetchCompletions(planId: string) {
         const { data: sessionData } = await supabase.auth.getSession()
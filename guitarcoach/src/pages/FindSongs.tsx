@@ -159,7 +159,8 @@ export default function FindSongs() {
                     name: similarTo.name,
                     artist_name: similarTo.artistName || null,
                     current_difficulty: recommendedSong?.difficulty || (Math.floor(Math.random() * 5) + 1),
-                    previous_songs: previousSongs
+                    previous_songs: previousSongs,
+                    candidates: 3   // spare songs are kept server-side for the next click
                 }
                 : {
                     top_tracks: topTracks,
@@ -3,6 +3,7 @@ import { supabase } from "../supabaseClient"
 import "bootstrap/dist/css/bootstrap.min.css"
 import "../style/SchedulePage.css"
 import { Link } from 'react-router-dom'
+import { applyCompletionDelta, subscribeCompletions } from "./utils/completionEvents"
 
 const API_BASE = "http://127.0.0.1:8000"
 
@@ -39,12 +40,22 @@ function SchedulePage() {
             if (storedPlanId) {
                 setPlanId(storedPlanId)
                 fetchCompletions(storedPlanId)
+                // other tabs/devices ticking tasks arrive as pushed deltas
+                return subscribeCompletions(API_BASE, getToken, {
+                    onDelta: (delta) => setCompletedTasks(prev => applyCompletionDelta(prev, storedPlanId, delta)),
+                    onResync: () => fetchCompletions(storedPlanId)
+                })
             }
         } catch (e) {
             console.error("Failed to parse active plan:", e)
         }
     }, [])
 
+    async function getToken() {
+        const { data: sessionData } = await supabase.auth.getSession()
+        return sessionData.session?.access_token
+    }
+
     async function fetchCompletions(planId: string) {
         const { data: sessionData } = await supabase.auth.getSession()
         const token = sessionData.session?.access_token
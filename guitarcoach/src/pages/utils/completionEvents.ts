@@ -0,0 +1,75 @@
+// Live task completion updates from GET /api/practice-plan/events, so a checkbox
+// ticked in another tab or on another device shows up without refetching.
+
+// p: plan id, d: day name, i: task index, c: 1 completed / 0 not
+export interface CompletionDelta {
+    p: string
+    d: string
+    i: number
+    c: 0 | 1
+}
+
+export interface CompletionHandlers {
+    onDelta: (delta: CompletionDelta) => void
+    // the stream missed updates (reconnected or fell behind): refetch the completions
+    onResync: () => void
+}
+
+const RECONNECT_MS = 5000
+
+// completed task keys are `${day}-${index}`; returns the same set when nothing changes
+export function applyCompletionDelta(completed: Set<string>, planId: string, delta: CompletionDelta): Set<string> {
+    if (delta.p !== planId) return completed
+    const key = `${delta.d}-${delta.i}`
+    if (completed.has(key) === (delta.c === 1)) return completed
+
+    const next = new Set(completed)
+    if (delta.c === 1) next.add(key)
+    else next.delete(key)
+    return next
+}
+
+// opens the stream and returns a function that closes it
+export function subscribeCompletions(
+    apiBase: string,
+    getToken: () => Promise<string | undefined>,
+    handlers: CompletionHandlers
+): () => void {
+    let source: EventSource | null = null
+    let retry: ReturnType<typeof setTimeout> | null = null
+    let connected = false
+    let closed = false
+
+    async function connect() {
+        const token = await getToken()
+        if (!token || closed) return
+
+        // EventSource can't send headers, so the token goes in the query string
+        source = new EventSource(`${apiBase}/api/practice-plan/events?token=${encodeURIComponent(token)}`)
+
+        source.addEventListener("ready", () => {
+            // the page fetched on load; after a reconnect anything could have changed meanwhile
+            if (connected) handlers.onResync()
+            connected = true
+        })
+        source.addEventListener("resync", () => handlers.onResync())
+        source.addEventListener("completion", (e) => {
+            handlers.onDelta(JSON.parse((e as MessageEvent).data))
+        })
+        source.onerror = () => {
+            // the browser retries dropped connections itself; a closed source was refused
+            // (e.g. expired token), so reconnect later with a fresh one
+            if (source?.readyState === EventSource.CLOSED && !closed) {
+                retry = setTimeout(connect, RECONNECT_MS)
+            }
+        }
+    }
+
+    connect()
+
+    return () => {
+        closed = true
+        if (retry) clearTimeout(retry)
+        source?.close()
+    }
+}
@@ -0,0 +1,25 @@
+import { describe, it, expect } from 'vitest'
+import { applyCompletionDelta } from '../pages/utils/completionEvents'
+
+describe('applyCompletionDelta', () => {
+    it('adds a completed task', () => {
+        const next = applyCompletionDelta(new Set(['Monday-0']), 'plan-1', { p: 'plan-1', d: 'Monday', i: 2, c: 1 })
+        expect([...next].sort()).toEqual(['Monday-0', 'Monday-2'])
+    })
+
+    it('removes an uncompleted task', () => {
+        const next = applyCompletionDelta(new Set(['Monday-0', 'Tuesday-1']), 'plan-1', { p: 'plan-1', d: 'Tuesday', i: 1, c: 0 })
+        expect([...next]).toEqual(['Monday-0'])
+    })
+
+    it('ignores other plans', () => {
+        const completed = new Set(['Monday-0'])
+        expect(applyCompletionDelta(completed, 'plan-1', { p: 'plan-2', d: 'Monday', i: 1, c: 1 })).toBe(completed)
+    })
+
+    it('returns the same set when nothing changes', () => {
+        const completed = new Set(['Monday-0'])
+        expect(applyCompletionDelta(completed, 'plan-1', { p: 'plan-1', d: 'Monday', i: 0, c: 1 })).toBe(completed)
+        expect(applyCompletionDelta(completed, 'plan-1', { p: 'plan-1', d: 'Friday', i: 3, c: 0 })).toBe(completed)
+    })
+})
@@ -0,0 +1,75 @@
+-- Tables the backend reads and writes, as the code uses them.
+-- On an existing Supabase project the tables already exist and only the owner
+-- foreign keys and row level security below are added; on a fresh local Postgres
+-- (see backend/bench/explain_queries.py) this creates them for the later migrations.
+--
+-- Rows belong to a Supabase auth user. With row level security on, the anon and
+-- authenticated roles (the browser's PostgREST access) only see their own rows; the
+-- backend connects with the service_role key or as the database owner, which bypass it
+-- and filter on user_id themselves.
+
+create table if not exists practice_plans (
+    id          uuid primary key default gen_random_uuid(),
+    user_id     uuid not null references auth.users (id) on delete cascade,
+    song_title  text not null default '',
+    artist      text not null default '',
+    plan        jsonb not null,
+    created_at  timestamptz not null default now()
+);
+
+create table if not exists task_completions (
+    id                uuid primary key default gen_random_uuid(),
+    user_id           uuid not null references auth.users (id) on delete cascade,
+    practice_plan_id  uuid not null references practice_plans (id) on delete cascade,
+    day_name          text not null,
+    task_index        integer not null,
+    task_title        text not null,
+    technique         text,
+    duration_minutes  integer,
+    created_at        timestamptz not null default now()
+);
+
+-- tables created before this migration: add the owner keys, and the plan key PostgREST
+-- needs to embed completions in their plan (Store.list_plans_with_completions), without
+-- checking old rows
+do $$
+begin
+    if not exists (select 1 from pg_constraint where conname = 'practice_plans_user_id_fkey') then
+        alter table practice_plans add constraint practice_plans_user_id_fkey
+            foreign key (user_id) references auth.users (id) on delete cascade not valid;
+    end if;
+    if not exists (select 1 from pg_constraint where conname = 'task_completions_user_id_fkey') then
+        alter table task_completions add constraint task_completions_user_id_fkey
+            foreign key (user_id) references auth.users (id) on delete cascade not valid;
+    end if;
+    if not exists (select 1 from pg_constraint
+                   where conrelid = 'task_completions'::regclass and confrelid = 'practice_plans'::regclass
+                     and contype = 'f') then
+        alter table task_completions add constraint task_completions_practice_plan_id_fkey
+            foreign key (practice_plan_id) references practice_plans (id) on delete cascade not valid;
+    end if;
+end
+$$;
+
+alter table practice_plans enable row level security;
+alter table task_completions enable row level security;
+
+-- (select auth.uid()) is evaluated once per statement instead of once per row
+drop policy if exists practice_plans_owner on practice_plans;
+create policy practice_plans_owner on practice_plans
+    for all to authenticated
+    using (user_id = (select auth.uid()))
+    with check (user_id = (select auth.uid()));
+
+-- a completion can only be recorded against one of the user's own plans
+drop policy if exists task_completions_owner on task_completions;
+create policy task_completions_owner on task_completions
+    for all to authenticated
+    using (user_id = (select auth.uid()))
+    with check (
+        user_id = (select auth.uid())
+        and exists (select 1 from practice_plans p where p.id = practice_plan_id and p.user_id = (select auth.uid()))
+    );
+
+-- hashed song keys written by seen_songs.mark_seen
+alter table if exists profiles add column if not exists seen_songs text[];
@@ -0,0 +1,25 @@
+-- Indexes for the hot queries and one row per completed task.
+--
+--   practice_plans    where user_id = ? order by created_at desc        (saved, dashboard)
+--   task_completions  where user_id = ? and practice_plan_id = ?        (completions, dashboard)
+--                     ... and day_name = ? and task_index = ?           (complete-task, delete)
+--                     where user_id = ?                                 (completion-stats)
+--
+-- The unique key on the completion's natural key is also the composite index for
+-- every task_completions query above (they all filter on a prefix of it).
+
+-- complete-task used to insert a new row on every click; keep the oldest of each set of duplicates
+delete from task_completions a
+using task_completions b
+where a.user_id = b.user_id
+  and a.practice_plan_id = b.practice_plan_id
+  and a.day_name = b.day_name
+  and a.task_index = b.task_index
+  and (a.created_at, a.id) > (b.created_at, b.id);
+
+alter table task_completions
+    add constraint task_completions_natural_key
+    unique (user_id, practice_plan_id, day_name, task_index);
+
+create index if not exists practice_plans_user_created_idx
+    on practice_plans (user_id, created_at desc);
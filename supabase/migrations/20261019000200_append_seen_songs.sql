@@ -0,0 +1,28 @@
+-- Append-only writes to profiles.seen_songs (seen_songs.mark_seen via Store.add_seen_songs).
+-- Writing the whole list from a worker's in-memory copy would let a worker with a stale
+-- or empty copy drop songs other workers had recorded. This appends the new hashes that
+-- aren't stored yet in a single update (the row lock serializes concurrent callers) and
+-- returns the stored list.
+--
+-- plpgsql so the body isn't checked until it runs; profiles is created by Supabase, not here.
+
+create or replace function append_seen_songs(p_user_id uuid, p_songs text[])
+returns text[]
+language plpgsql
+as $$
+declare
+    stored text[];
+begin
+    update profiles
+    set seen_songs = coalesce(seen_songs, '{}') || array(
+        select distinct s from unnest(p_songs) s where s <> all (coalesce(seen_songs, '{}'))
+    )
+    where id = p_user_id
+    returning seen_songs into stored;
+    return coalesce(stored, '{}');
+end;
+$$;
+
+-- only the backend (service_role) appends; PostgREST would otherwise expose it to every client
+revoke execute on function append_seen_songs(uuid, text[]) from public, anon, authenticated;
+grant execute on function append_seen_songs(uuid, text[]) to service_role;